@@ -4,6 +4,7 @@ from datetime import datetime
 from pathlib import Path
 
 import yaml
+from phx.fix_base.api import DispatchLanes
 from phx.fix_base.fix.app import App, AppRunner, FixSessionConfig
 from phx.fix_base.fix.model.auth import FixAuthenticationMethod
 from phx.fix_base.utils import make_dirs, set_file_loging_handler, setup_logger
@@ -30,7 +31,8 @@ if __name__ == "__main__":
         setup_logger("fix_service", level=logging.INFO),
         export_dir / f"test_base_strategy_{LOG_TIMESTAMP}.log"
     )
-    message_queue = queue.Queue()
+    lanes_config = config.get("dispatch_lanes", None)
+    message_queue = DispatchLanes(**lanes_config) if lanes_config else queue.Queue()
     logger.info(f"Fix schema file:{fix_schema_file()}")
     fix_configs = FixSessionConfig(
         sender_comp_id="test",
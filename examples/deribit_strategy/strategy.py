@@ -153,8 +153,8 @@ class DeribitTestStrategy:
         start_time = datetime.now(timezone.utc)
         for symbol in symbols:
             ticker = (self.exchange, symbol)
-            book = self.phx_api.order_books.get(ticker)
-            if book and book.mid_price:
+            top_of_book = self.phx_api.get_top_of_book(ticker)
+            if top_of_book and top_of_book.bid_price and top_of_book.ask_price:
                 sent_order = False
                 while not sent_order:
                     if self.phx_api.rate_limiter.has_capacity(datetime.now(timezone.utc), 1):
@@ -192,11 +192,11 @@ class DeribitTestStrategy:
         start_time = datetime.now(timezone.utc)
         for symbol in symbols:
             ticker = (self.exchange, symbol)
-            book = self.phx_api.order_books.get(ticker, None)
+            top_of_book = self.phx_api.get_top_of_book(ticker)
             min_tick_size = self.phx_api.get_security_attribute(ticker, 'min_price_increment')
-            if book and min_tick_size:
-                top_bid = book.top_bid_price
-                top_ask = book.top_ask_price
+            if top_of_book and min_tick_size:
+                top_bid = top_of_book.bid_price
+                top_ask = top_of_book.ask_price
                 if top_bid and top_ask:
                     high_ask = max(top_bid, top_ask)
                     low_bid = min(top_bid, top_ask)
@@ -1,3 +1,6 @@
 from .phx_api_types import *
 from .interface import ApiInterface
+from .lanes import DispatchLanes, Lane, Ordering
+from .scheduler import ActionType, OrderAction, OrderScheduler
 from .phx_api import DependencyAction, PhxApi
+from .async_phx_api import AsyncMessageQueue, AsyncPhxApi
@@ -0,0 +1,217 @@
+import asyncio
+import queue
+import threading
+from functools import partial
+from logging import Logger
+from typing import Callable, Dict, List, Optional, Union
+
+import eventkit as ev
+import pandas as pd
+
+from phx.fix_base.api.phx_api import PhxApi
+from phx.fix_base.fix.app.app_runner import AppRunner
+from phx.fix_base.utils.thread import aligned_repeating_task
+
+
+class AsyncMessageQueue(object):
+    """
+    Message queue for App that hands messages over from the QuickFIX threads
+    to an asyncio loop with call_soon_threadsafe. Messages put before a loop
+    is bound are kept and delivered when the loop is bound.
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        with self.lock:
+            self.queue = asyncio.Queue()
+            for msg in self.pending:
+                self.queue.put_nowait(msg)
+            self.pending = []
+            self.loop = loop
+
+    def put(self, msg, block=True, timeout=None):
+        loop = self.loop
+        if loop is None:
+            with self.lock:
+                if self.loop is None:
+                    self.pending.append(msg)
+                    return
+                loop = self.loop
+        loop.call_soon_threadsafe(self.queue.put_nowait, msg)
+
+    def put_nowait(self, msg):
+        self.put(msg, block=False)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def get_nowait(self):
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def qsize(self) -> int:
+        return self.queue.qsize() if self.queue is not None else len(self.pending)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+
+class AsyncPhxApi(PhxApi):
+    """
+    PhxApi running on an asyncio loop instead of a dispatch thread and two
+    timer threads. The App has to be created with an AsyncMessageQueue, the
+    slow and fast timers run as tasks and handlers and callbacks are called
+    on the loop.
+
+    Messages of a type, including subclasses, are available as eventkit
+    event, which supports `async for` as well as the eventkit operators:
+
+        message_queue = AsyncMessageQueue()
+        app = App(message_queue, fix_session_settings, logger, export_dir)
+        app_runner = AppRunner(app, fix_session_settings, session_id, logger)
+        api = AsyncPhxApi(app_runner, config, exchange, symbols, symbols, logger)
+        api_task = api.start()
+
+        async for report in api.stream(ExecReport):
+            ...
+    """
+
+    def __init__(
+            self,
+            app_runner: AppRunner,
+            config: dict,
+            exchange: str,
+            mkt_symbols: List[str],
+            trading_symbols: List[str],
+            logger: Logger = None,
+            callbacks: Optional[Dict[Union[str, type], Union[Callable, List[Callable]]]] = None,
+    ):
+        if not isinstance(app_runner.app.message_queue, AsyncMessageQueue):
+            raise ValueError("AsyncPhxApi requires an App created with an AsyncMessageQueue")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.timer_tasks: List[asyncio.Task] = []
+        self.message_events: Dict[type, ev.Event] = {}
+        self.blocking_calls: Dict[str, asyncio.Future] = {}
+        PhxApi.__init__(
+            self, app_runner, config, exchange, mkt_symbols, trading_symbols, logger, callbacks
+        )
+
+    def start_threads(self):
+        # nothing to start before the loop is running, timers are started in run
+        pass
+
+    def start(self) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(self.run(), name="RunApi")
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.message_queue.bind(self.loop)
+        self.start_timer_tasks()
+        self.app_runner.start()
+        await self.dispatch_async()
+
+    def start_timer_tasks(self):
+        self.timer_tasks = [
+            self.loop.create_task(
+                aligned_repeating_task(pd.Timedelta("01:00:00"), self.on_slow_timer_async, "1h"),
+                name="slow_timer"
+            ),
+            self.loop.create_task(
+                aligned_repeating_task(pd.Timedelta("00:00:20"), self.on_fast_timer, "20s"),
+                name="fast_timer"
+            ),
+        ]
+        self.timers_started = True
+
+    def stop_timer_threads(self):
+        if self.timers_started:
+            for task in self.timer_tasks:
+                task.cancel()
+            self.timer_tasks = []
+            self.timers_started = False
+            self.logger.info(f"timer tasks stopped")
+
+    async def on_slow_timer_async(self):
+        # saving the history writes files, keep it off the loop
+        await self.loop.run_in_executor(None, self.on_slow_timer)
+
+    def run_blocking(self, name: str, fn: Callable):
+        """
+        Runs fn in the default executor unless the previous call of name is still running,
+        so that repeated state evaluations do not queue it up again.
+        """
+        future = self.blocking_calls.get(name, None)
+        if future is None or future.done():
+            future = self.blocking_calls[name] = self.loop.run_in_executor(None, fn)
+            future.add_done_callback(partial(self.on_blocking_call_done, name))
+
+    def on_blocking_call_done(self, name: str, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            self.exception = future.exception()
+            self.logger.error(f"{name} failed: {future.exception()}")
+
+    def stop_app_runner(self):
+        # stopping the initiator waits for the QuickFIX threads, keep it off the loop
+        self.run_blocking("stop_app_runner", self.app_runner.stop)
+
+    def subscribe(self):
+        # the requests are sent synchronously, keep them off the loop, subscribed is set once all are sent
+        self.run_blocking("subscribe", partial(PhxApi.subscribe, self))
+
+    def stream(self, msg_type: Union[str, type]) -> ev.Event:
+        """
+        Event emitting the messages of msg_type and its subclasses, done when the api finishes.
+        """
+        event = self.message_events.get(msg_type, None)
+        if event is None:
+            name = msg_type if isinstance(msg_type, str) else msg_type.__name__
+            event = self.message_events[msg_type] = ev.Event(name)
+            self.register_callback(msg_type, lambda msg, _logger: event.emit(msg))
+        return event
+
+    async def dispatch_async(self):
+        timeout = self.queue_timeout.total_seconds()
+        carried = None
+        while not self.is_finished():
+            try:
+                if carried is not None:
+                    msg, carried = carried, None
+                else:
+                    try:
+                        msg = self.message_queue.get_nowait()
+                    except queue.Empty:
+                        async with asyncio.timeout(timeout):
+                            msg = await self.message_queue.get()
+                carried = self.dispatch_message(msg, self.message_queue)
+            except TimeoutError:
+                self.exception = TimeoutError(f"queue empty after waiting {timeout}s")
+                self.logger.info(f"queue empty after waiting {timeout}s")
+            except Exception as e:
+                self.exception = e
+                self.logger.exception(
+                    f"dispatch: exception {e}"
+                )
+            finally:
+                self.exec_state_evaluation()
+        self.logger.info("dispatch loop terminated")
+        await asyncio.gather(*self.blocking_calls.values(), return_exceptions=True)
+        for event in self.message_events.values():
+            event.set_done()
+        try:
+            self.order_scheduler.stop()
+            self.stop_timer_threads()
+            await self.loop.run_in_executor(
+                None, partial(self.fix_interface.save_fix_message_history, pre=self.file_name_prefix(), wait=True)
+            )
+            await self.loop.run_in_executor(None, self.fix_interface.close_fix_message_history)
+        except Exception as e:
+            self.logger.exception(f"failed to save fix message history: {e}")
+        await self.loop.run_in_executor(None, self.close_report_stores)
+        self.release_metrics()
@@ -0,0 +1,188 @@
+import itertools
+import queue
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from phx.fix_base.fix.model import (
+    BusinessMessageReject, Create, ExecReport, GatewayNotReady, Heartbeat, Logon, Logout,
+    MarketDataRequestReject, MassStatusExecReport, MassStatusExecReportNoOrders, NotConnected,
+    OrderBookSnapshot, OrderBookUpdate, OrderCancelReject, OrderMassCancelReport, PositionReports,
+    PositionRequestAck, Reject, SecurityReport, TradeCaptureReport, TradeCaptureReportRequestAck, Trades
+)
+
+
+class Lane(str, Enum):
+    MARKET_DATA = "market_data"
+    ORDERS = "orders"
+    ADMIN = "admin"
+    REFERENCE = "reference"
+
+
+class Ordering(str, Enum):
+    LANE = "lane"  # strict arrival order within a lane, one worker per lane
+    TICKER = "ticker"  # arrival order per ticker, lanes sharded by ticker
+
+
+LANE_OF_MESSAGE: Dict[type, Lane] = {
+    OrderBookSnapshot: Lane.MARKET_DATA,
+    OrderBookUpdate: Lane.MARKET_DATA,
+    Trades: Lane.MARKET_DATA,
+    MarketDataRequestReject: Lane.MARKET_DATA,
+    ExecReport: Lane.ORDERS,
+    MassStatusExecReport: Lane.ORDERS,
+    MassStatusExecReportNoOrders: Lane.ORDERS,
+    OrderCancelReject: Lane.ORDERS,
+    OrderMassCancelReport: Lane.ORDERS,
+    TradeCaptureReport: Lane.ORDERS,
+    PositionReports: Lane.ORDERS,
+    Create: Lane.ADMIN,
+    Logon: Lane.ADMIN,
+    Logout: Lane.ADMIN,
+    Heartbeat: Lane.ADMIN,
+    NotConnected: Lane.ADMIN,
+    GatewayNotReady: Lane.ADMIN,
+    Reject: Lane.ADMIN,
+    BusinessMessageReject: Lane.ADMIN,
+    SecurityReport: Lane.REFERENCE,
+    PositionRequestAck: Lane.REFERENCE,
+    TradeCaptureReportRequestAck: Lane.REFERENCE,
+}
+
+# lower value is dispatched first, messages of equal priority in arrival order
+ORDER_LANE_PRIORITY: Dict[type, int] = {
+    ExecReport: 0,
+    OrderCancelReject: 0,
+    OrderMassCancelReport: 0,
+    MassStatusExecReport: 1,
+    MassStatusExecReportNoOrders: 1,
+    TradeCaptureReport: 2,
+    PositionReports: 2,
+}
+DEFAULT_PRIORITY = 1
+
+
+def shard_key(msg) -> Optional[Tuple[str, str]]:
+    symbol = getattr(msg, "symbol", None)
+    if symbol is not None:
+        return getattr(msg, "exchange", None), symbol
+    if isinstance(msg, Trades) and msg.trades:
+        return msg.trades[0].key()
+    return None
+
+
+class LaneQueue(object):
+    """
+    Queue of one lane shard with the queue.Queue put/get interface.
+    With priorities given, messages are dispatched by priority of their type first.
+    """
+
+    def __init__(self, name: str, priorities: Optional[Dict[type, int]] = None):
+        self.name = name
+        self.priorities = priorities
+        self.queue = queue.PriorityQueue() if priorities is not None else queue.Queue()
+        self.sequence = itertools.count()
+
+    def put(self, msg, block=True, timeout=None):
+        if self.priorities is not None:
+            priority = self.priorities.get(type(msg), DEFAULT_PRIORITY)
+            self.queue.put((priority, next(self.sequence), msg), block, timeout)
+        else:
+            self.queue.put(msg, block, timeout)
+
+    def put_nowait(self, msg):
+        self.put(msg, block=False)
+
+    def get(self, block=True, timeout=None):
+        item = self.queue.get(block, timeout)
+        return item[2] if self.priorities is not None else item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def empty(self) -> bool:
+        return self.queue.empty()
+
+    def __str__(self):
+        return f"LaneQueue[name={self.name}, size={self.qsize()}]"
+
+
+class DispatchLanes(object):
+    """
+    Replacement of the App message queue that routes every message into a
+    lane by message type, so that PhxApi can dispatch each lane shard with
+    its own worker thread:
+
+        market_data: order book snapshots and updates, trades
+        orders: execution reports (with priority), cancel rejects, trade capture and position reports
+        admin: session messages, rejects
+        reference: security reports, request acks
+
+    With Ordering.TICKER a lane can have several shards and the messages of a
+    ticker always go to the same shard, which preserves their order. With
+    Ordering.LANE every lane has one shard and keeps strict arrival order.
+    Messages of unknown type go to the admin lane.
+
+    Usage:
+
+        message_queue = DispatchLanes({"market_data": 2})
+        app = App(message_queue, ...)
+    """
+
+    def __init__(
+            self,
+            shards: Optional[Dict[str, int]] = None,
+            ordering: str = Ordering.TICKER,
+            exec_priority: bool = True,
+    ):
+        self.ordering = Ordering(ordering)
+        shards = shards or {}
+        self.lanes: Dict[Lane, List[LaneQueue]] = {}
+        for lane in Lane:
+            num_shards = max(1, int(shards.get(lane.value, 1))) if self.ordering == Ordering.TICKER else 1
+            priorities = ORDER_LANE_PRIORITY if lane == Lane.ORDERS and exec_priority else None
+            self.lanes[lane] = [
+                LaneQueue(f"{lane.value}_{i}", priorities) for i in range(num_shards)
+            ]
+        self.lane_of_type: Dict[type, Lane] = dict(LANE_OF_MESSAGE)
+
+    def lane_of(self, msg) -> Lane:
+        msg_type = type(msg)
+        lane = self.lane_of_type.get(msg_type, None)
+        if lane is None:
+            lane = next((LANE_OF_MESSAGE[t] for t in msg_type.__mro__ if t in LANE_OF_MESSAGE), Lane.ADMIN)
+            self.lane_of_type[msg_type] = lane
+        return lane
+
+    def queue_of(self, msg) -> LaneQueue:
+        shards = self.lanes[self.lane_of(msg)]
+        if len(shards) == 1:
+            return shards[0]
+        key = shard_key(msg)
+        return shards[hash(key) % len(shards)] if key is not None else shards[0]
+
+    def put(self, msg, block=True, timeout=None):
+        self.queue_of(msg).put(msg, block, timeout)
+
+    def put_nowait(self, msg):
+        self.put(msg, block=False)
+
+    def primary(self) -> LaneQueue:
+        return self.lanes[Lane.ADMIN][0]
+
+    def queues(self) -> List[LaneQueue]:
+        return [lane_queue for shards in self.lanes.values() for lane_queue in shards]
+
+    def qsize(self) -> int:
+        return sum(lane_queue.qsize() for lane_queue in self.queues())
+
+    def sizes(self) -> Dict[str, int]:
+        return {lane_queue.name: lane_queue.qsize() for lane_queue in self.queues()}
+
+    def __str__(self):
+        return (f"DispatchLanes["
+                f"ordering={self.ordering.value}, "
+                f"sizes={self.sizes()}"
+                f"]")
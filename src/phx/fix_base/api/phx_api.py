@@ -1,37 +1,37 @@
 import abc
+import concurrent.futures
 import queue
 import threading
+import time
 from enum import Enum
 from logging import Logger
-from typing import Any, Callable, List, Set, Dict, Tuple, Union, Optional
-from collections import namedtuple
+from typing import Any, Callable, List, NamedTuple, Set, Dict, Tuple, Union, Optional
 
 import pandas as pd
 import quickfix as fix
 import eventkit as ev
 
 from phx.fix_base.api import ApiInterface, Ticker
+from phx.fix_base.api.lanes import DispatchLanes
+from phx.fix_base.api.scheduler import ActionType, OrderAction, OrderScheduler
 from phx.fix_base.fix.app.app_runner import AppRunner
 from phx.fix_base.fix.app.interface import FixInterface
 from phx.fix_base.fix.model import ExecReport, PositionReports, Security, SecurityReport, TradeCaptureReport
 from phx.fix_base.fix.model import Logon, Create, Logout, Heartbeat, NotConnected, GatewayNotReady
-from phx.fix_base.fix.model import Order, OrderBookSnapshot, OrderBookUpdate, Trades
+from phx.fix_base.fix.model import Order, OrderBookSnapshot, OrderBookUpdate, TopOfBook, Trades
 from phx.fix_base.fix.model import OrderMassCancelReport, MassStatusExecReport, MassStatusExecReportNoOrders
 from phx.fix_base.fix.model import PositionRequestAck, TradeCaptureReportRequestAck
 from phx.fix_base.fix.model import Reject, OrderCancelReject, BusinessMessageReject, MarketDataRequestReject
-from phx.fix_base.fix.model.order_book import OrderBook
+from phx.fix_base.fix.model.order_book import ArrayOrderBook, OrderBook
 from phx.fix_base.fix.tracker import OrderTracker, PositionTracker
 from phx.fix_base.fix.utils import fix_message_string
 from phx.fix_base.utils import CHECK_MARK, CROSS_MARK
 from phx.fix_base.utils.limiter import MultiPeriodLimiter
+from phx.fix_base.utils.prometheus import MessageLatency, Metrics, metrics
 from phx.fix_base.utils.thread import AlignedRepeatingTimer
-from phx.fix_base.utils.time import utcnow, dt_now_utc
+from phx.fix_base.utils.time import utcnow
 
 
-
-QueueInfo = namedtuple('QueueInfo', ['length', 'received_admin_message_size', 'received_app_message_size',
-                                     'sent_admin_message_size', 'sent_app_message_size'])
-
 # def single_task(key, target_dict, current_dict, pre="  ") -> List[str]:
 #     rows = []
 #     if key in target_dict.keys():
@@ -53,6 +53,12 @@ QueueInfo = namedtuple('QueueInfo', ['length', 'received_admin_message_size', 'r
 #     return rows
 
 
+class DispatchEntry(NamedTuple):
+    callbacks: Tuple[Callable, ...]  # client callbacks called with (msg, logger)
+    handler: Callable  # internal handler
+    queue_aware: bool  # handler called with (msg, message_queue), returns message to dispatch next
+
+
 class DependencyAction(str, Enum):
     ORDERBOOK_SNAPSHOTS = "orderbook_snapshots"  # per instrument
     POSITION_SNAPSHOTS = "position_snapshots"  # single action
@@ -71,21 +77,27 @@ class PhxApi(ApiInterface, abc.ABC):
             mkt_symbols: List[str],
             trading_symbols: List[str],
             logger: Logger = None,
-            callbacks: Optional[Dict[str, Callable]] = None,
+            callbacks: Optional[Dict[Union[str, type], Union[Callable, List[Callable]]]] = None,
     ):
         # initialize variables from the parameters
         self.logger: Logger = logger if logger is not None else app_runner.logger
         self.app_runner = app_runner
         self.fix_interface: FixInterface = app_runner.app
-        self.message_queue: queue.Queue = app_runner.app.message_queue
+        self.message_queue: Union[queue.Queue, DispatchLanes] = app_runner.app.message_queue
         self.config: dict = config or {}
         self.mkt_symbols: Set[Ticker] = set([(exchange, symbol) for symbol in mkt_symbols])
         self.trading_symbols: Set[Ticker] = set([(exchange, symbol) for symbol in trading_symbols])
         self.set_of_symbol_names = {symbol[1] for symbol in self.mkt_symbols.union(self.trading_symbols)}
         self.exchange = exchange
 
-        # algo callbacks to be called when object of specific class arrives from FIX queue
-        self.callbacks: Dict[str, Callable] = callbacks or {}
+        # algo callbacks to be called when object of specific class arrives from FIX queue,
+        # registered by class or class name, and applying to subclasses as well
+        # with DispatchLanes the callbacks of each lane shard are called from its own thread,
+        # in arrival order within the lane but concurrently with the callbacks of other lanes
+        self.callbacks: Dict[Union[str, type], List[Callable]] = {
+            msg_type: list(callback) if isinstance(callback, (list, tuple)) else [callback]
+            for msg_type, callback in (callbacks or {}).items()
+        }
         self.logger.info(
             f"PhxApi callbacks for events: {list(self.callbacks.keys())}"
         )
@@ -98,6 +110,9 @@ class PhxApi(ApiInterface, abc.ABC):
         self.rate_limiter = MultiPeriodLimiter(rate_limit_config, self.logger)
         self.logger.info(f"PhxApi Rate Limits:\n{self.rate_limiter}")
 
+        # order requests queued by priority and sent as the rate limiter frees up capacity
+        self.order_scheduler = OrderScheduler(self.fix_interface, self.rate_limiter, self.logger, self.on_order_action)
+
         # state variables used by algo to determine readiness for starting and stopping trading and next actions
         self.dependency_actions = PhxApi.get_init_dependency_actions()
         self.logged_in = False  # True if API logged into Phoenix FIX Bridge
@@ -112,17 +127,40 @@ class PhxApi(ApiInterface, abc.ABC):
         self.cancel_timeout_seconds = self.config.get("cancel_timeout_seconds", 5)
         self.print_reports = self.config.get("print_reports", True)
 
+        # symbols for which books are kept in tick indexed arrays instead of sorted dicts
+        self.array_order_book_symbols = set(self.config.get("array_order_book_symbols", []))
+        self.array_order_book_capacity = self.config.get("array_order_book_capacity", 4096)
+
+        # coalescing of order book updates pending in the queue into one book event per ticker
+        self.coalesce_book_updates = self.config.get("coalesce_book_updates", False)
+        self.coalesce_max_latency = pd.Timedelta(self.config.get("coalesce_max_latency", "00:00:00.002"))
+        self.book_update_batches = 0
+        self.book_updates_applied = 0
+        self.book_updates_coalesced = 0
+
         # tracking position, orders, reports etc
         self.position_tracker = PositionTracker("local", True, self.logger)
         self.order_tracker = OrderTracker("local", self.logger, self.position_tracker, self.print_reports)
         self.position_report_counter: Dict[Ticker, int] = dict()
+
+        # directory to which the slow timer and teardown save the columnar execution report and fill history
+        # as Parquet, written by a single worker so that saves neither block dispatch nor overlap
+        self.report_store_dir = self.config.get("report_store_dir", None)
+        self.report_store_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ReportStores"
+        )
         self.mass_status_exec_reports = []
 
         # event object for keeping track of queue info and updates in orders and orderbooks
         self.on_event = ev.Event()
 
         # order books
-        self.order_books: Dict[Ticker, OrderBook] = {}
+        self.order_books: Dict[Ticker, Union[OrderBook, ArrayOrderBook]] = {}
+
+        # conflated top of book, emitted on on_top_of_book only if best price or volume changed;
+        # the latest value per ticker is replaced atomically and can be polled from any thread
+        self.on_top_of_book = ev.Event()
+        self.top_of_books: Dict[Ticker, TopOfBook] = {}
 
         # security list
         self.security_list: Dict[Ticker, Security] = {}
@@ -143,6 +181,27 @@ class PhxApi(ApiInterface, abc.ABC):
         )
         self.run_thread = threading.Thread(name='RunApi', target=self.run, args=())
 
+        # serializes state evaluation, creation of order books from snapshots and security reports
+        # and on_event emission if several dispatch lanes run in parallel
+        self.state_lock = threading.RLock()
+
+        # metrics, latency histograms of messages stamped by App, see App.stamp_latency
+        self.metrics: Metrics = metrics()
+        self.message_latency: MessageLatency = self.metrics.message_latency
+        self.metrics_instance = self.metrics.new_instance("api")
+        self.metrics.bind(self.metrics_instance, self.metrics.open_orders).set_function(
+            lambda: len(self.order_tracker.open_orders)
+        )
+        for limiter in self.rate_limiter.limiters:
+            limiter.capacity_gauge = self.metrics.bind(
+                self.metrics_instance, self.metrics.rate_limiter_free_capacity, limiter.window()
+            )
+
+        # message type -> (client callbacks, internal handler), resolved per concrete type on first use
+        self.handlers: Dict[type, Tuple[Callable, bool]] = self.get_internal_handlers()
+        self.dispatch_table: Dict[type, DispatchEntry] = {}
+        self.build_dispatch_table()
+
         # start the internal threads
         self.exception = None
         self.start_threads()
@@ -157,97 +216,159 @@ class PhxApi(ApiInterface, abc.ABC):
             DependencyAction.SECURITY_REPORTS: [],
         }
 
-    def register_callback(self, msg_type: str, callback: Callable):
-        self.callbacks[msg_type] = callback
+    def register_callback(self, msg_type: Union[str, type], callback: Callable):
+        """
+        Adds a callback for messages of msg_type, given as class or class name,
+        and its subclasses. Callbacks of the most derived class are called first,
+        for one class those registered by class before those registered by name,
+        each in registration order. With DispatchLanes callbacks of different lanes
+        run concurrently on the lane threads and must guard the state they share,
+        e.g. with state_lock.
+        """
+        self.callbacks.setdefault(msg_type, []).append(callback)
+        self.build_dispatch_table()
         self.logger.info(f"register_callback {msg_type=}:{callback=}")
 
+    def get_internal_handlers(self) -> Dict[type, Tuple[Callable, bool]]:
+        return {
+            OrderBookUpdate: (self.on_order_book_update_message, True),
+            Trades: (self.on_trades, False),
+            ExecReport: (self.on_exec_report, False),
+            TradeCaptureReport: (self.on_trade_capture_report, False),
+            PositionReports: (self.on_position_reports, False),
+            Heartbeat: (self.on_heartbeat, False),
+            OrderMassCancelReport: (self.on_order_mass_cancel_report, False),
+            Reject: (self.on_reject, False),
+            BusinessMessageReject: (self.on_business_message_reject, False),
+            MarketDataRequestReject: (self.on_market_data_request_reject, False),
+            OrderCancelReject: (self.on_order_cancel_reject, False),
+            OrderBookSnapshot: (self.on_order_book_snapshot_message, False),
+            SecurityReport: (self.on_security_report, False),
+            PositionRequestAck: (self.on_position_request_ack, False),
+            TradeCaptureReportRequestAck: (self.on_trade_capture_report_request_ack, False),
+            NotConnected: (self.on_connection_error, False),
+            GatewayNotReady: (self.on_connection_error, False),
+            Logon: (self.on_logon, False),
+            Logout: (self.on_logout, False),
+            Create: (self.on_create, False),
+        }
+
+    def build_dispatch_table(self):
+        table = {}
+        for msg_type in self.handlers:
+            table[msg_type] = self.resolve_dispatch_entry(msg_type)
+        for msg_type in self.callbacks:
+            if isinstance(msg_type, type):
+                table[msg_type] = self.resolve_dispatch_entry(msg_type)
+        self.dispatch_table = table
+
+    def resolve_dispatch_entry(self, msg_type: type) -> DispatchEntry:
+        callbacks = []
+        handler = None
+        for cls in msg_type.__mro__:
+            callbacks.extend(self.callbacks.get(cls, []))
+            callbacks.extend(self.callbacks.get(cls.__name__, []))
+            if handler is None:
+                handler = self.handlers.get(cls, None)
+        handler, queue_aware = handler if handler is not None else (self.on_unknown_message, False)
+        return DispatchEntry(tuple(callbacks), handler, queue_aware)
+
     def run(self):
         self.app_runner.start()
         self.dispatch()
 
     def dispatch(self):
+        if isinstance(self.message_queue, DispatchLanes):
+            primary = self.message_queue.primary()
+            workers = [
+                threading.Thread(
+                    name=f"Dispatch_{lane_queue.name}", target=self.dispatch_queue, args=(lane_queue, False)
+                )
+                for lane_queue in self.message_queue.queues() if lane_queue is not primary
+            ]
+            for worker in workers:
+                worker.start()
+            self.dispatch_queue(primary, True)
+            for worker in workers:
+                worker.join()
+        else:
+            self.dispatch_queue(self.message_queue, True)
+        self.logger.info("dispatch loop terminated")
+        try:
+            self.order_scheduler.stop()
+            self.stop_timer_threads()
+            self.fix_interface.save_fix_message_history(pre=self.file_name_prefix(), wait=True)
+            self.fix_interface.close_fix_message_history()
+        except Exception as e:
+            self.logger.exception(f"failed to save fix message history: {e}")
+        self.close_report_stores()
+        self.release_metrics()
+
+    def release_metrics(self):
+        for limiter in self.rate_limiter.limiters:
+            limiter.capacity_gauge = None
+        self.metrics.release(self.metrics_instance)
+        self.fix_interface.release_metrics()
+
+    def dispatch_queue(self, message_queue, report_timeout: bool):
+        """
+        Dispatch loop over one queue. Runs in the RunApi thread for a plain
+        queue, or in one worker per lane shard for DispatchLanes, in which case
+        only the admin lane, which receives the heartbeats, reports timeouts.
+        """
+        carried = None
         while not self.is_finished():
             try:
                 # blocking here and wait for next message until timeout
-                msg = self.message_queue.get(timeout=self.queue_timeout.total_seconds())
-
-                # first check if to call client's callback
-                msg_class_name = type(msg).__name__
-                if msg_class_name in self.callbacks:
-                    self.callbacks[msg_class_name](msg, self.logger)
-
-                # call internal handler
-                match msg:
-                    case OrderBookUpdate():
-                        if msg.symbol in self.set_of_symbol_names:
-                            self.on_order_book_update(msg)
-                        else:
-                            self.logger.info(f"Subscription to orderbooks for wrong symbols: symbol = {msg.symbol}")
-                            continue
-                    case Trades():
-                        self.on_trades(msg)
-                    case ExecReport():
-                        self.on_exec_report(msg)
-                    case TradeCaptureReport():
-                        self.on_trade_capture_report(msg)
-                    case PositionReports():
-                        self.on_position_reports(msg)
-                    case Heartbeat():
-                        self.on_heartbeat(msg)
-                    case OrderMassCancelReport():
-                        self.on_order_mass_cancel_report(msg)
-                    case Reject():
-                        self.on_reject(msg)
-                    case BusinessMessageReject():
-                        self.on_business_message_reject(msg)
-                    case MarketDataRequestReject():
-                        self.on_market_data_request_reject(msg)
-                    case OrderCancelReject():
-                        self.on_order_cancel_reject(msg)
-                    case OrderBookSnapshot():
-                        if msg.symbol in self.set_of_symbol_names:
-                            self.on_order_book_snapshot(msg)
-                        else:
-                            self.logger.info(f"Subscription to orderbooks for wrong symbols: symbol = {msg.symbol}")
-                            continue
-                    case SecurityReport():
-                        self.on_security_report(msg)
-                    case PositionRequestAck():
-                        self.on_position_request_ack(msg)
-                    case TradeCaptureReportRequestAck():
-                        self.on_trade_capture_report_request_ack(msg)
-                    case NotConnected():
-                        self.on_connection_error(msg)
-                    case GatewayNotReady():
-                        self.on_connection_error(msg)
-                    case Logon():
-                        self.on_logon(msg)
-                    case Logout():
-                        self.on_logout(msg)
-                    case Create():
-                        self.on_create(msg)
-                    case _:
-                        self.logger.warning(f"unknown message type:{type(msg).__name__} {msg=}")
+                if carried is not None:
+                    msg, carried = carried, None
+                else:
+                    msg = message_queue.get(timeout=self.queue_timeout.total_seconds())
+                carried = self.dispatch_message(msg, message_queue)
             except queue.Empty:
-                self.exception = TimeoutError(
-                    f"queue empty after waiting {self.queue_timeout.total_seconds()}s"
-                )
-                self.logger.info(
-                    f"queue empty after waiting {self.queue_timeout.total_seconds()}s"
-                )
+                if report_timeout:
+                    self.exception = TimeoutError(
+                        f"queue empty after waiting {self.queue_timeout.total_seconds()}s"
+                    )
+                    self.logger.info(
+                        f"queue empty after waiting {self.queue_timeout.total_seconds()}s"
+                    )
             except Exception as e:
                 self.exception = e
                 self.logger.exception(
                     f"dispatch: exception {e}"
                 )
             finally:
-                self.exec_state_evaluation()
-        self.logger.info("dispatch loop terminated")
-        try:
-            self.stop_timer_threads()
-            self.fix_interface.save_fix_message_history(pre=self.file_name_prefix())
-        except Exception as e:
-            self.logger.exception(f"failed to save fix message history: {e}")
+                with self.state_lock:
+                    self.exec_state_evaluation()
+
+    def dispatch_message(self, msg, message_queue):
+        """
+        Calls the client callbacks and the internal handler of msg. Returns a
+        message taken from message_queue while coalescing that has to be
+        dispatched next, otherwise None. Messages stamped by App are recorded
+        in the message latency histograms.
+        """
+        received_ns = getattr(msg, "received_ns", None)
+        if received_ns is not None:
+            msg.dequeued_ns = time.monotonic_ns()
+        msg_type = type(msg)
+        entry = self.dispatch_table.get(msg_type, None)
+        if entry is None:
+            entry = self.dispatch_table[msg_type] = self.resolve_dispatch_entry(msg_type)
+        for callback in entry.callbacks:
+            callback(msg, self.logger)
+        carried = None
+        if entry.queue_aware:
+            carried = entry.handler(msg, message_queue)
+        else:
+            entry.handler(msg)
+        if received_ns is not None:
+            self.message_latency.observe(msg, time.monotonic_ns())
+        return carried
+
+    def on_unknown_message(self, msg):
+        self.logger.warning(f"unknown message type:{type(msg).__name__} {msg=}")
 
     def exec_state_evaluation(self):
         fn = self.exec_state_evaluation.__name__
@@ -262,13 +383,16 @@ class PhxApi(ApiInterface, abc.ABC):
             )
             if self.app_runner.is_fix_session_up:
                 self.logger.info("Stop app_runner...")
-                self.app_runner.stop()
+                self.stop_app_runner()
             else:
                 self.logger.info("Wait for app_runner to stop...")
         elif self.logged_in and not self.subscribed:
             self.logger.info(f"{fn}: {self.logged_in=} and {self.subscribed:=}. Subscribe...")
             self.subscribe()
 
+    def stop_app_runner(self):
+        self.app_runner.stop()
+
     def subscribe(self):
         self.request_security_data()
         self.subscribe_market_data()
@@ -287,28 +411,22 @@ class PhxApi(ApiInterface, abc.ABC):
                 f"{fn} cancelling {len(self.order_tracker.open_orders)} orders on exit")
             if self.use_mass_cancel_request:
                 for (exchange, symbol) in self.trading_symbols:
-                    if self.rate_limiter.has_capacity(dt_now_utc(), 1):
-                        self.rate_limiter.consume(dt_now_utc())
-                        msg = self.fix_interface.order_mass_cancel_request(exchange, symbol)
-                        self.logger.info(f"{fn} order mass cancel request {msg}")
-                    else:
-                        self.logger.info(
-                            f"{fn} no rate limit capacity. Try again later."
-                        )
+                    self.order_scheduler.mass_cancel(exchange, symbol)
             else:
-                for (ord_id, order) in self.order_tracker.open_orders.items():
-                    if self.rate_limiter.has_capacity(dt_now_utc(), 1):
-                        self.rate_limiter.consume(dt_now_utc())
-                        order, msg = self.fix_interface.order_cancel_request(order)
-                        self.logger.info(f"{fn} order cancel request {fix_message_string(msg)}")
-                    else:
-                        self.logger.info(
-                            f"{fn} no rate limit capacity. Try again later."
-                        )
-                        break
+                for (ord_id, order) in list(self.order_tracker.open_orders.items()):
+                    self.order_scheduler.cancel(order)
+            self.logger.info(f"{fn} {self.order_scheduler}")
         else:
             self.logger.info(f"{fn} keep orders alive on exit")
 
+    def on_order_action(self, action: OrderAction, result):
+        fn = self.on_order_action.__name__
+        if action.action_type == ActionType.MASS_CANCEL:
+            self.logger.info(f"{fn} order mass cancel request {result}")
+        else:
+            order, msg = result
+            self.logger.info(f"{fn} order {action.action_type.value} request {fix_message_string(msg)}")
+
     def is_ready_to_disconnect(self) -> bool:
         """
         Checks if API is ready to be disconnected, which is if API to_stop flag is True
@@ -413,13 +531,39 @@ class PhxApi(ApiInterface, abc.ABC):
         self.logger.info(f"saving dataframes and purging history")
         self.fix_interface.save_fix_message_history(pre=self.file_name_prefix(), purge_history=True)
         self.logger.info(f"   \u2705 saved and purged fix message history")
+        self.save_report_stores()
+
+    def save_report_stores(self, wait=False):
+        """
+        Saves the execution reports and fills appended since the last save to report_store_dir
+        on the report store worker, if a directory is configured.
+        """
+        if self.report_store_dir is None:
+            return
+        future = self.report_store_executor.submit(self.write_report_stores)
+        if wait:
+            future.result()
+
+    def write_report_stores(self):
+        try:
+            rows = self.order_tracker.save_stores(self.report_store_dir, pre=self.file_name_prefix(), purge=True)
+            self.logger.info(f"   \u2705 saved and purged report stores to {self.report_store_dir}: {rows}")
+        except Exception as e:
+            self.logger.exception(f"saving report stores to {self.report_store_dir} failed: {e}")
+
+    def close_report_stores(self):
+        """
+        Saves the rows appended since the last save and stops the report store worker, called once on teardown.
+        """
+        self.save_report_stores(wait=True)
+        self.report_store_executor.shutdown(wait=True)
 
     def on_fast_timer(self):
-        q = self.message_queue
-        queue_info = QueueInfo(q.qsize(), len(q.received_admin_message_history),
-                               len(q.received_app_message_history), len(q.sent_admin_message_history),
-                               len(q.sent_app_message_history))
-        self.on_event.emit(queue_info)
+        if self.coalesce_book_updates:
+            self.logger.info(
+                f"book updates: applied={self.book_updates_applied} batches={self.book_update_batches} "
+                f"coalesced={self.book_updates_coalesced}"
+            )
 
     def on_logon(self, msg: Logon):
         self.logged_in = True
@@ -462,6 +606,7 @@ class PhxApi(ApiInterface, abc.ABC):
     def on_order_cancel_reject(self, msg: OrderCancelReject):
         fn = "on_order_cancel_reject"
         self.logger.info(f"{fn} {str(msg)=}")
+        self.order_scheduler.answered(ActionType.CANCEL, msg.ord_id)
         if (
             "not_found" in msg.text
             or "NOT FOUND" in msg.text
@@ -473,12 +618,13 @@ class PhxApi(ApiInterface, abc.ABC):
 
     def on_security_report(self, msg: SecurityReport):
         exchanges = set([security.exchange for security in msg.securities.values()])
-        for security in msg.securities.values():
-            self.security_list[(security.exchange, security.symbol)] = security
-            self.logger.info(f"{security}")
-        # indicate that API received security reports
-        # TODO - allow for adding new exchanges to the list
-        self.dependency_actions[DependencyAction.SECURITY_REPORTS] = list(exchanges)
+        with self.state_lock:
+            for security in msg.securities.values():
+                self.security_list[(security.exchange, security.symbol)] = security
+                self.logger.info(f"{security}")
+            # indicate that API received security reports
+            # TODO - allow for adding new exchanges to the list
+            self.dependency_actions[DependencyAction.SECURITY_REPORTS] = list(exchanges)
         self.logger.info(f"<==== security list completed")
 
     def on_position_request_ack(self, msg: PositionRequestAck):
@@ -541,7 +687,10 @@ class PhxApi(ApiInterface, abc.ABC):
         else:
             num_open_orders_before = len(self.order_tracker.open_orders)
             order, error = self.order_tracker.process(msg, utcnow())
-            self.on_event.emit(order)
+            if msg.ord_id not in self.order_tracker.open_orders:
+                # cancelled or otherwise done, a cancel sent for it is not answered anymore
+                self.order_scheduler.answered(ActionType.CANCEL, msg.ord_id)
+            self.emit_event(order)
             # if we canceled all open orders -> store the fix message history
             if (
                 self.to_stop
@@ -552,6 +701,7 @@ class PhxApi(ApiInterface, abc.ABC):
                 self.logger.info(f"{fn} <==== all open orders cancelled")
                 self.fix_interface.save_fix_message_history(pre=self.file_name_prefix())
                 self.logger.info(f"{fn} <==== FIX message history saved")
+                self.save_report_stores()
 
     def on_status_exec_report(self, msg: ExecReport):
         if self.print_reports:
@@ -600,23 +750,59 @@ class PhxApi(ApiInterface, abc.ABC):
         # 15=BTC|55=BTC|58=FUNDS|263=0|581=1|702=1|703=TQ|704=99.999380540000|
         # 705=0.000000000000|710=pos_00003|715=20240410|721=roq-362|724=0|727=11|728=0|730=0|731=2|734=0|10=01
         self.logger.info(f"on_order_mass_cancel_report: {msg}")
+        self.order_scheduler.mass_cancel_answered(msg.exchange, msg.symbol)
+
+    def on_order_book_snapshot_message(self, msg: OrderBookSnapshot):
+        if msg.symbol in self.set_of_symbol_names:
+            self.on_order_book_snapshot(msg)
+        else:
+            self.logger.info(f"Subscription to orderbooks for wrong symbols: symbol = {msg.symbol}")
+
+    def on_order_book_update_message(self, msg: OrderBookUpdate, message_queue) -> Optional[Any]:
+        if msg.symbol not in self.set_of_symbol_names:
+            self.logger.info(f"Subscription to orderbooks for wrong symbols: symbol = {msg.symbol}")
+        elif self.coalesce_book_updates:
+            return self.on_order_book_updates_coalesced(msg, message_queue)
+        else:
+            self.on_order_book_update(msg)
+        return None
 
     def on_order_book_snapshot(self, msg: OrderBookSnapshot):
         ticker = msg.key()
         self.logger.info(f"on_order_book_snapshot: {ticker} \n{str(msg)}")
-        if ticker not in self.dependency_actions[DependencyAction.ORDERBOOK_SNAPSHOTS]:
-            self.dependency_actions[DependencyAction.ORDERBOOK_SNAPSHOTS].append(ticker)
-        book = OrderBook(
+        with self.state_lock:
+            if ticker not in self.dependency_actions[DependencyAction.ORDERBOOK_SNAPSHOTS]:
+                self.dependency_actions[DependencyAction.ORDERBOOK_SNAPSHOTS].append(ticker)
+            book = self.create_order_book(msg)
+            self.order_books[ticker] = book
+        self.emit_order_book(book)
+
+    def create_order_book(self, msg: OrderBookSnapshot) -> Union[OrderBook, ArrayOrderBook]:
+        ticker = msg.key()
+        if msg.symbol in self.array_order_book_symbols:
+            min_price_increment = self.get_security_attribute(ticker, "min_price_increment")
+            if min_price_increment is not None and min_price_increment > 0:
+                return ArrayOrderBook(
+                    msg.exchange, msg.symbol, min_price_increment, msg.bids, msg.asks,
+                    msg.exchange_ts, msg.local_ts, self.array_order_book_capacity
+                )
+            self.logger.warning(
+                f"create_order_book: no min_price_increment for {ticker} - using OrderBook"
+            )
+        return OrderBook(
             msg.exchange, msg.symbol, msg.bids, msg.asks, msg.exchange_ts, msg.local_ts
         )
-        self.order_books[ticker] = book
-        self.on_event.emit(book)
 
     def on_order_book_update(self, msg: OrderBookUpdate):
         self.logger.debug(
             f"on_order_book_update: ticker:{msg.key()}"
             f" updates:{msg.updates}"
         )
+        book = self.apply_order_book_update(msg)
+        if book is not None:
+            self.emit_order_book(book)
+
+    def apply_order_book_update(self, msg: OrderBookUpdate) -> Optional[Union[OrderBook, ArrayOrderBook]]:
         book = self.order_books.get(msg.key(), None)
         if book is not None:
             for price, quantity, is_bid in msg.updates:
@@ -625,7 +811,86 @@ class PhxApi(ApiInterface, abc.ABC):
                 book.exchange_ts = msg.exchange_ts
             if msg.local_ts is not None:
                 book.local_ts = msg.local_ts
-            self.on_event.emit(book)
+            self.book_updates_applied += 1
+            self.metrics.book_update_counter(msg.key()).inc()
+        return book
+
+    def on_order_book_updates_coalesced(self, msg: OrderBookUpdate, message_queue) -> Optional[Any]:
+        """
+        Applies msg and the order book updates pending in message_queue behind it,
+        then emits every touched book once. Draining stops when the queue is
+        empty, the coalesce_max_latency budget is used up or another message
+        type is dequeued, which is returned to be dispatched next to keep message order.
+        Drained messages stamped by App are recorded in the message latency histograms
+        as handled when the touched books are emitted, as msg is by dispatch_message.
+        """
+        deadline = time.monotonic() + self.coalesce_max_latency.total_seconds()
+        carried = None
+        books: Dict[Ticker, Union[OrderBook, ArrayOrderBook]] = {}
+        stamped: List[OrderBookUpdate] = []
+        applied = 0
+        book = self.apply_order_book_update(msg)
+        if book is not None:
+            books[msg.key()] = book
+            applied += 1
+        while time.monotonic() < deadline:
+            try:
+                msg = message_queue.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(msg, OrderBookUpdate):
+                carried = msg
+                break
+            if getattr(msg, "received_ns", None) is not None:
+                msg.dequeued_ns = time.monotonic_ns()
+                stamped.append(msg)
+            entry = self.dispatch_table.get(type(msg), None)
+            if entry is None:
+                entry = self.dispatch_table[type(msg)] = self.resolve_dispatch_entry(type(msg))
+            for callback in entry.callbacks:
+                callback(msg, self.logger)
+            if msg.symbol not in self.set_of_symbol_names:
+                self.logger.info(f"Subscription to orderbooks for wrong symbols: symbol = {msg.symbol}")
+                continue
+            book = self.apply_order_book_update(msg)
+            if book is not None:
+                books[msg.key()] = book
+                applied += 1
+        self.book_update_batches += 1
+        self.book_updates_coalesced += applied - len(books)
+        for book in books.values():
+            self.emit_order_book(book)
+        if stamped:
+            handled_ns = time.monotonic_ns()
+            for msg in stamped:
+                self.message_latency.observe(msg, handled_ns)
+        return carried
+
+    def emit_event(self, obj):
+        with self.state_lock:
+            self.on_event.emit(obj)
+
+    def emit_order_book(self, book: Union[OrderBook, ArrayOrderBook]):
+        self.emit_event(book)
+        self.publish_top_of_book(book)
+
+    def publish_top_of_book(self, book: Union[OrderBook, ArrayOrderBook]):
+        bid = book.top_bid
+        ask = book.top_ask
+        bid_price, bid_volume = bid if bid is not None else (None, None)
+        ask_price, ask_volume = ask if ask is not None else (None, None)
+        ticker = book.key()
+        last = self.top_of_books.get(ticker, None)
+        if last is not None and last.same_quote(bid_price, bid_volume, ask_price, ask_volume):
+            return
+        top_of_book = TopOfBook(
+            bid_price, bid_volume, ask_price, ask_volume, book.exchange, book.symbol, book.exchange_ts, book.local_ts
+        )
+        self.top_of_books[ticker] = top_of_book
+        self.on_top_of_book.emit(top_of_book)
+
+    def get_top_of_book(self, ticker: Ticker) -> Optional[TopOfBook]:
+        return self.top_of_books.get(ticker, None)
 
     def on_trades(self, msg: Trades):
         pass
@@ -637,8 +902,8 @@ class PhxApi(ApiInterface, abc.ABC):
         ret_val = None
         security = self.get_security(ticker)
         if security and isinstance(security, Security):
-            if attribute_name in security.__dict__:
-                ret_val = security.__dict__[attribute_name]
+            if attribute_name in Security.__slots__:
+                ret_val = getattr(security, attribute_name)
         return ret_val
 
     def file_name_prefix(self) -> str:
@@ -0,0 +1,278 @@
+import heapq
+import itertools
+import threading
+import time
+from enum import Enum
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from phx.fix_base.fix.app.interface import FixInterface
+from phx.fix_base.fix.model import Order
+from phx.fix_base.utils.limiter import MultiPeriodLimiter
+from phx.fix_base.utils.time import dt_now_utc
+
+
+class ActionType(str, Enum):
+    CANCEL = "cancel"
+    MASS_CANCEL = "mass_cancel"
+    REPLACE = "replace"
+    NEW = "new"
+
+
+# lower value is sent first, actions of equal priority in submission order
+ACTION_PRIORITY: Dict[ActionType, int] = {
+    ActionType.CANCEL: 0,
+    ActionType.MASS_CANCEL: 0,
+    ActionType.REPLACE: 1,
+    ActionType.NEW: 2,
+}
+
+# lower bound of the wait for capacity so that rounding of the limiter does not spin the worker
+MIN_WAIT_SECONDS = 0.0005
+
+# a cancel or mass cancel sent and not answered within this time can be sent again
+CANCEL_RETRY_SECONDS = 5.0
+
+
+class OrderAction(object):
+    """
+    Order request waiting in the OrderScheduler. The key identifies what the
+    action applies to: the order id for cancels and replaces, the ticker and
+    side for mass cancels and the submission sequence number for new orders.
+    """
+
+    def __init__(self, action_type: ActionType, key: Any, order: Optional[Order] = None, **kwargs):
+        self.action_type = action_type
+        self.key = key
+        self.order = order
+        self.kwargs = kwargs
+        self.dropped = False
+
+    def __str__(self):
+        return f"OrderAction[{self.action_type.value}, key={self.key}, {self.kwargs}]"
+
+
+def order_key(order: Order) -> str:
+    return order.ord_id if order.ord_id is not None else order.cl_ord_id
+
+
+class OrderScheduler(object):
+    """
+    Queue of outbound order requests sent as soon as the rate limiter has
+    capacity. Cancels and mass cancels go before replaces and replaces before
+    new orders. Redundant actions are coalesced while queued:
+
+        - repeated cancels of an order collapse to one
+        - a cancel drops a queued replace of the order and a cancel of a queued new order drops both
+        - repeated replaces of an order collapse to the latest, a replace of an order to be cancelled is ignored
+        - a mass cancel drops the queued new orders, replaces and cancels it covers
+        - a cancel or mass cancel already sent and not yet answered is not sent again
+          until CANCEL_RETRY_SECONDS passed, the owner reports answers with answered
+
+    A worker thread started with the first action sends the queued actions and
+    sleeps until the limiter frees up capacity for the next one. The optional
+    callback is called with the action and the result of the FixInterface call.
+    """
+
+    def __init__(
+            self,
+            fix_interface: FixInterface,
+            rate_limiter: MultiPeriodLimiter,
+            logger: Logger,
+            callback: Optional[Callable[[OrderAction, Any], None]] = None,
+    ):
+        self.fix_interface = fix_interface
+        self.rate_limiter = rate_limiter
+        self.logger = logger
+        self.callback = callback
+        self.condition = threading.Condition(threading.RLock())
+        self.heap: List[Tuple[int, int, OrderAction]] = []
+        self.pending: Dict[Tuple[ActionType, Any], OrderAction] = {}
+        # cancels and mass cancels sent and not answered yet, monotonic send time by action type and key
+        self.in_flight: Dict[Tuple[ActionType, Any], float] = {}
+        self.sequence = itertools.count()
+        self.worker: Optional[threading.Thread] = None
+        self.to_stop = False
+        self.num_sent = 0
+        self.num_coalesced = 0
+
+    def __str__(self):
+        return (f"OrderScheduler["
+                f"pending={len(self.pending)}, "
+                f"in_flight={len(self.in_flight)}, "
+                f"sent={self.num_sent}, "
+                f"coalesced={self.num_coalesced}"
+                f"]")
+
+    def new_order_single(self, exchange, symbol, side, order_qty, **kwargs) -> OrderAction:
+        with self.condition:
+            action = OrderAction(
+                ActionType.NEW, next(self.sequence),
+                exchange=exchange, symbol=symbol, side=side, order_qty=order_qty, **kwargs
+            )
+            self.push(action)
+            return action
+
+    def cancel(self, order: Order) -> Optional[OrderAction]:
+        key = order_key(order)
+        with self.condition:
+            if (ActionType.CANCEL, key) in self.pending:
+                self.num_coalesced += 1
+                return self.pending[ActionType.CANCEL, key]
+            if self.is_in_flight(ActionType.CANCEL, key):
+                self.num_coalesced += 1
+                return None
+            if self.drop(ActionType.REPLACE, key):
+                self.num_coalesced += 1
+            action = OrderAction(ActionType.CANCEL, key, order)
+            self.push(action)
+            return action
+
+    def cancel_new(self, action: OrderAction) -> bool:
+        """
+        Drop a new order which has not been sent yet, False if it has been sent already.
+        """
+        with self.condition:
+            if self.drop(ActionType.NEW, action.key):
+                self.num_coalesced += 1
+                return True
+            return False
+
+    def replace(self, order: Order, order_qty, **kwargs) -> Optional[OrderAction]:
+        key = order_key(order)
+        with self.condition:
+            if (ActionType.CANCEL, key) in self.pending:
+                self.num_coalesced += 1
+                return None
+            action = self.pending.get((ActionType.REPLACE, key), None)
+            if action is not None:
+                action.order = order
+                action.kwargs = dict(order_qty=order_qty, **kwargs)
+                self.num_coalesced += 1
+                return action
+            action = OrderAction(ActionType.REPLACE, key, order, order_qty=order_qty, **kwargs)
+            self.push(action)
+            return action
+
+    def mass_cancel(self, exchange=None, symbol=None, side=None) -> Optional[OrderAction]:
+        key = (exchange, symbol, side)
+        with self.condition:
+            if (ActionType.MASS_CANCEL, key) in self.pending:
+                self.num_coalesced += 1
+                return self.pending[ActionType.MASS_CANCEL, key]
+            if self.is_in_flight(ActionType.MASS_CANCEL, key):
+                self.num_coalesced += 1
+                return None
+            for (action_type, _), action in list(self.pending.items()):
+                if action_type != ActionType.MASS_CANCEL and self.covers(key, action):
+                    self.drop(action_type, action.key)
+                    self.num_coalesced += 1
+            action = OrderAction(ActionType.MASS_CANCEL, key, exchange=exchange, symbol=symbol, side=side)
+            self.push(action)
+            return action
+
+    def is_in_flight(self, action_type: ActionType, key) -> bool:
+        sent = self.in_flight.get((action_type, key), None)
+        if sent is None:
+            return False
+        if time.monotonic() - sent < CANCEL_RETRY_SECONDS:
+            return True
+        del self.in_flight[action_type, key]
+        return False
+
+    def answered(self, action_type: ActionType, key):
+        """
+        The venue answered the cancel of order key, e.g. with CANCELED or an order cancel reject,
+        or for a mass cancel with key (exchange, symbol, side) with a mass cancel report.
+        """
+        with self.condition:
+            self.in_flight.pop((action_type, key), None)
+
+    def mass_cancel_answered(self, exchange, symbol):
+        """
+        Mass cancels of exchange and symbol, of any side, are answered.
+        """
+        with self.condition:
+            for action_type, key in list(self.in_flight):
+                if action_type == ActionType.MASS_CANCEL and key[0] in (None, exchange) and key[1] in (None, symbol):
+                    del self.in_flight[action_type, key]
+
+    @staticmethod
+    def covers(key: Tuple, action: OrderAction) -> bool:
+        exchange, symbol, side = key
+        if action.order is not None:
+            attributes = (action.order.exchange, action.order.symbol, action.order.side)
+        else:
+            attributes = (action.kwargs["exchange"], action.kwargs["symbol"], action.kwargs["side"])
+        return all(value is None or value == attribute for value, attribute in zip(key, attributes))
+
+    def push(self, action: OrderAction):
+        self.pending[action.action_type, action.key] = action
+        heapq.heappush(self.heap, (ACTION_PRIORITY[action.action_type], next(self.sequence), action))
+        if self.worker is None:
+            self.worker = threading.Thread(name="OrderScheduler", target=self.run, daemon=True)
+            self.worker.start()
+        self.condition.notify()
+
+    def drop(self, action_type: ActionType, key) -> bool:
+        action = self.pending.pop((action_type, key), None)
+        if action is None:
+            return False
+        action.dropped = True
+        return True
+
+    def peek(self) -> Optional[OrderAction]:
+        while self.heap:
+            _, _, action = self.heap[0]
+            if not action.dropped:
+                return action
+            heapq.heappop(self.heap)
+        return None
+
+    def send(self, action: OrderAction):
+        if action.action_type == ActionType.NEW:
+            result = self.fix_interface.new_order_single(**action.kwargs)
+        elif action.action_type == ActionType.CANCEL:
+            result = self.fix_interface.order_cancel_request(action.order)
+        elif action.action_type == ActionType.REPLACE:
+            result = self.fix_interface.order_cancel_replace_request(action.order, **action.kwargs)
+        else:
+            result = self.fix_interface.order_mass_cancel_request(**action.kwargs)
+        self.num_sent += 1
+        if self.callback is not None:
+            self.callback(action, result)
+
+    def drain(self) -> Optional[float]:
+        """
+        Send queued actions while the rate limiter has capacity, returns the
+        seconds to wait for the next one or None if nothing is queued.
+        """
+        with self.condition:
+            while True:
+                action = self.peek()
+                if action is None:
+                    return None
+                now = dt_now_utc()
+                if not self.rate_limiter.has_capacity(now, 1):
+                    return max(MIN_WAIT_SECONDS, self.rate_limiter.wait_time(now, 1))
+                heapq.heappop(self.heap)
+                del self.pending[action.action_type, action.key]
+                self.rate_limiter.consume(now)
+                if action.action_type in (ActionType.CANCEL, ActionType.MASS_CANCEL):
+                    self.in_flight[action.action_type, action.key] = time.monotonic()
+                try:
+                    self.send(action)
+                except Exception as e:
+                    self.logger.exception(f"OrderScheduler failed to send {action}: {e}")
+
+    def run(self):
+        with self.condition:
+            while not self.to_stop:
+                self.condition.wait(self.drain())
+
+    def stop(self):
+        with self.condition:
+            self.to_stop = True
+            self.condition.notify()
+        if self.worker is not None and self.worker is not threading.current_thread():
+            self.worker.join()
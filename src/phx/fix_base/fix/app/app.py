@@ -9,13 +9,18 @@ import ssl
 import string
 import time
 from datetime import datetime
-from logging import Logger
-from typing import AnyStr, Dict, List, Tuple
+from logging import DEBUG, Logger
+from typing import AnyStr, Dict, List, Optional, Tuple
 
 import quickfix as fix
 import quickfix44 as fix44
 
+from phx.fix_base.fix.app.capture import CAPTURE_SUFFIX, CaptureWriter, msg_type_of
 from phx.fix_base.fix.app.config import FixAuthenticationMethod
+from phx.fix_base.fix.app.history import (
+    DEFAULT_HISTORY_FILE_MAX_BYTES, DEFAULT_HISTORY_MAX_BYTES, RECEIVED_ADMIN, RECEIVED_APP, SENT_ADMIN, SENT_APP,
+    Compression, FsyncPolicy, HistoryWriter, RingBuffer, to_pipe_delimited
+)
 from phx.fix_base.fix.app.interface import FixInterface
 from phx.fix_base.fix.model.exec_report import ExecReport
 from phx.fix_base.fix.model.message import (
@@ -31,12 +36,14 @@ from phx.fix_base.fix.model.trade import Trade, Trades
 from phx.fix_base.fix.model.trade_capture_report import (
     TradeCaptureReport, TradeReport, TradeReportParty, TradeReportSide
 )
+from phx.fix_base.fix.tracker.latency_tracker import CANCEL, NEW, REPLACE, OrderLatencyTracker
 from phx.fix_base.fix.utils import (
-    cxl_rej_reason_to_string, cxl_rej_response_to_to_string, entry_type_to_str,
+    ExtractionPlan, FieldSpec, cxl_rej_reason_to_string, cxl_rej_response_to_to_string, entry_type_to_str,
     extract_message_field_value, fix_message_string, mass_cancel_reject_reason_to_string,
-    mass_cancel_request_type_to_string, msg_type_to_string, session_reject_reason_to_string
+    mass_cancel_request_type_to_string, msg_type_to_string, session_reject_reason_to_string, to_int_from_float
 )
-from phx.fix_base.utils import make_dirs_for_file
+from phx.fix_base.fix.utils.md_parser import parse_market_data
+from phx.fix_base.utils.prometheus import metrics
 from phx.fix_base.utils.utils import str_to_datetime
 from phx.fix_base.utils.time import dt_now_utc
 
@@ -44,6 +51,103 @@ REJECT_TEXT_GATEWAY_NOT_READY = "GATEWAY_NOT_READY"
 
 REJECT_TEXT_NOT_CONNECTED = "NOT CONNECTED"
 
+# extraction plans per message type, compiled once at import
+SENDING_TIME_PLAN = ExtractionPlan([
+    FieldSpec(fix.SendingTime().getField(), "sending_time", "datetime"),
+])
+
+MD_SNAPSHOT_PLAN = ExtractionPlan([
+    FieldSpec(fix.SecurityExchange().getField(), "exchange"),
+    FieldSpec(fix.Symbol().getField(), "symbol"),
+    FieldSpec(fix.NoMDEntries().getField(), "group_size", "int"),
+    FieldSpec(fix.MDReqID().getField(), "md_req_id"),
+])
+
+MD_SNAPSHOT_ENTRY_PLAN = ExtractionPlan([
+    FieldSpec(fix.MDEntryType().getField(), "entry_type", "char"),
+    FieldSpec(fix.MDEntryPx().getField(), "price", "float"),
+    FieldSpec(fix.MDEntrySize().getField(), "size", "float"),
+    FieldSpec(fix.MDEntryDate().getField(), "date_str"),
+    FieldSpec(fix.MDEntryTime().getField(), "time_str"),
+])
+
+MD_INCREMENTAL_ENTRY_PLAN = ExtractionPlan([
+    FieldSpec(fix.MDEntryType().getField(), "entry_type", "char"),
+    FieldSpec(fix.SecurityExchange().getField(), "exchange"),
+    FieldSpec(fix.Symbol().getField(), "symbol"),
+    FieldSpec(fix.MDEntryPx().getField(), "price", "float"),
+    FieldSpec(fix.MDEntrySize().getField(), "size", "float"),
+    FieldSpec(fix.MDEntryDate().getField(), "date_str"),
+    FieldSpec(fix.MDEntryTime().getField(), "time_str"),
+])
+
+POSITION_REPORT_PLAN = ExtractionPlan([
+    FieldSpec(fix.PosReqID().getField(), "pos_req_id"),
+    FieldSpec(fix.PosMaintRptID().getField(), "pos_maint_rpt_id"),
+    FieldSpec(fix.PosReqType().getField(), "pos_req_type", "int"),
+    FieldSpec(fix.TotalNumPosReports().getField(), "tot_num_pos_reports", "int"),
+    FieldSpec(fix.SecurityExchange().getField(), "exchange"),
+    FieldSpec(fix.Account().getField(), "account"),
+    FieldSpec(fix.Symbol().getField(), "symbol"),
+    FieldSpec(fix.Text().getField(), "text"),
+    FieldSpec(fix.SettlPrice().getField(), "settle_price", "float"),
+    FieldSpec(fix.ClearingBusinessDate().getField(), "clearing_business_date"),
+    FieldSpec(fix.NoPositions().getField(), "group_size", "int"),
+])
+
+POSITION_PLAN = ExtractionPlan([
+    FieldSpec(fix.PosType().getField(), "pos_type"),
+    FieldSpec(fix.LongQty().getField(), "long_qty", "float"),
+    FieldSpec(fix.ShortQty().getField(), "short_qty", "float"),
+])
+
+TRADE_CAPTURE_REPORT_PLAN = ExtractionPlan([
+    FieldSpec(fix.TradeReportID().getField(), "trade_report_id"),
+    FieldSpec(fix.TradeRequestID().getField(), "trade_req_id"),
+    FieldSpec(fix.LastRptRequested().getField(), "last_requested", "bool"),
+    FieldSpec(fix.TotNumTradeReports().getField(), "tot_num_trade_reports", "int"),
+    FieldSpec(fix.PreviouslyReported().getField(), "previously_reported", "bool"),
+    FieldSpec(fix.ExecID().getField(), "exec_id"),
+    FieldSpec(fix.ExecType().getField(), "exec_type", "char"),
+    FieldSpec(fix.LastPx().getField(), "last_px", "float"),
+    FieldSpec(fix.LastQty().getField(), "last_qty", "float"),
+    FieldSpec(fix.TransactTime().getField(), "transact_time", "datetime"),
+    FieldSpec(fix.TradeDate().getField(), "trade_date"),
+    FieldSpec(fix.Symbol().getField(), "symbol"),
+    FieldSpec(fix.SecurityExchange().getField(), "exchange"),
+    FieldSpec(fix.NoSides().getField(), "num_sides", "int"),
+])
+
+TRADE_REPORT_SIDE_PLAN = ExtractionPlan([
+    FieldSpec(fix.Side().getField(), "side", "char"),
+    FieldSpec(fix.OrderID().getField(), "order_id"),
+    FieldSpec(fix.Account().getField(), "account"),
+    FieldSpec(fix.NoPartyIDs().getField(), "num_parties", "int"),
+])
+
+TRADE_REPORT_PARTY_PLAN = ExtractionPlan([
+    FieldSpec(fix.PartyID().getField(), "party_id"),
+    FieldSpec(fix.PartyIDSource().getField(), "party_id_source", "char"),
+    FieldSpec(fix.PartyRole().getField(), "party_role", "int"),
+])
+
+SECURITY_PLAN = ExtractionPlan([
+    FieldSpec(fix.SecurityExchange().getField(), "exchange"),
+    FieldSpec(fix.Symbol().getField(), "symbol"),
+    FieldSpec(fix.ContractMultiplier().getField(), "multiplier", to_int_from_float),
+    FieldSpec(fix.MinTradeVol().getField(), "min_trade_vol", "float"),
+    FieldSpec(fix.MinPriceIncrement().getField(), "min_price_increment", "float"),
+])
+
+ORDER_CANCEL_REJECT_PLAN = ExtractionPlan([
+    FieldSpec(fix.OrderID().getField(), "ord_id"),
+    FieldSpec(fix.ClOrdID().getField(), "cl_ord_id"),
+    FieldSpec(fix.OrigClOrdID().getField(), "orig_cl_ord_id"),
+    FieldSpec(fix.CxlRejResponseTo().getField(), "cxl_rej_response_to"),
+    FieldSpec(fix.CxlRejReason().getField(), "cxl_rej_reason", "int"),
+    FieldSpec(fix.Text().getField(), "text"),
+])
+
 
 class App(fix.Application, FixInterface):
     app_num = 0
@@ -54,6 +158,14 @@ class App(fix.Application, FixInterface):
             session_settings: fix.SessionSettings,
             logger: Logger,
             export_dir: str,
+            fast_md_parsing: bool = False,
+            history_max_bytes: int = DEFAULT_HISTORY_MAX_BYTES,
+            stream_history: bool = False,
+            history_file_max_bytes: int = DEFAULT_HISTORY_FILE_MAX_BYTES,
+            history_compression: str = Compression.NONE,
+            history_fsync: str = FsyncPolicy.NEVER,
+            capture_history: bool = False,
+            stamp_latency: bool = False,
     ):
         fix.Application.__init__(self)
         self.session_settings = session_settings
@@ -61,6 +173,9 @@ class App(fix.Application, FixInterface):
         self.logger = logger
         self.export_dir = export_dir
         self.log_mkt_data = False
+        self.fast_md_parsing = fast_md_parsing  # parse 35=W / 35=X from the raw string instead of via groups
+        self.stamp_latency = stamp_latency  # stamp queued messages with monotonic ns receive and parse times
+        self.received_ns = None  # receive time of the message processed in fromApp if stamping
         self.group_log_count = 5
         self.session_id = None
         self.sessions = set()
@@ -75,16 +190,50 @@ class App(fix.Application, FixInterface):
         self.position_subscriptions: Dict[Tuple[str, fix.MsgType], Tuple[datetime, List]] = {}
         self.trade_report_subscriptions: Dict[Tuple[str, fix.MsgType], Tuple[datetime, List]] = {}
 
-        # plain message history
-        self.received_admin_message_history: List[str] = []
-        self.received_app_message_history: List[str] = []
-        self.sent_admin_message_history: List[str] = []
-        self.sent_app_message_history: List[str] = []
+        # raw message history, bounded to history_max_bytes per direction and message category
+        self.received_admin_message_history = RingBuffer(history_max_bytes)
+        self.received_app_message_history = RingBuffer(history_max_bytes)
+        self.sent_admin_message_history = RingBuffer(history_max_bytes)
+        self.sent_app_message_history = RingBuffer(history_max_bytes)
+
+        # history files are written by a background thread, started on first use, either
+        # streamed to rotating files in export_dir as messages arrive or saved on request
+        history_prefix = datetime.utcnow().strftime("%Y_%m_%d_%H%M%S")
+        self.stream_history = stream_history
+        self.history_writer = HistoryWriter(
+            export_dir,
+            history_prefix,
+            history_file_max_bytes,
+            logger,
+            history_compression,
+            history_fsync,
+        )
+        if stream_history:
+            self.history_writer.start()
+
+        # optionally capture all messages with receive time to a binary capture file
+        self.capture_writer = None
+        if capture_history:
+            self.capture_writer = CaptureWriter(
+                os.path.join(export_dir, f"{history_prefix}_fix_capture{CAPTURE_SUFFIX}")
+            )
 
         # lists to accumulate messages before sending completed message - for convenience
         self.trade_reports = []
         self.position_reports = []
 
+        # message counters on the hot path, queue depth and history sizes read on collection
+        self.metrics = metrics()
+        self.metrics_instance = self.metrics.new_instance("app")
+        self.metrics.bind(self.metrics_instance, self.metrics.message_queue_depth).set_function(message_queue.qsize)
+        for name, history in self.message_histories().items():
+            self.metrics.bind(self.metrics_instance, self.metrics.message_history_bytes, name).set_function(
+                lambda h=history: h.num_bytes
+            )
+
+        # ack, fill and cancel latency of the order requests sent
+        self.order_latency = OrderLatencyTracker(self.metrics)
+
     def _reset_session_states(self):
         self.connected = False
         self.session_id = None
@@ -190,9 +339,9 @@ class App(fix.Application, FixInterface):
             else:
                 self.logger.error(f"[toAdmin] {session_id} unhandled message | {fix_message_string(message)}")
             # need to record down the final modified to admin message
-            msg = fix_message_string(message)
-            self.sent_admin_message_history.append(msg)
-            self.logger.debug(f"[toAdmin] {session_id} | {msg} ")
+            raw = self.record_history(SENT_ADMIN, self.sent_admin_message_history, message, session_id)
+            if self.logger.isEnabledFor(DEBUG):
+                self.logger.debug(f"[toAdmin] {session_id} | {to_pipe_delimited(raw).decode()} ")
         except Exception as error:
             self.logger.error(f"session : {self.session_id} , exception in [toAdmin] callback , might related to "
                               f"underlying c++ quickfix engine")
@@ -200,10 +349,10 @@ class App(fix.Application, FixInterface):
 
     def fromAdmin(self, message: fix.Message, session_id: fix.SessionID):
         try:
-            msg = fix_message_string(message)
-            self.received_admin_message_history.append(
-                msg)  # we cannot store a fix message for later usage - get seg fault
-            self.logger.debug(f"[fromAdmin] {session_id} | {msg}")
+            # we cannot store a fix message for later usage - get seg fault
+            raw = self.record_history(RECEIVED_ADMIN, self.received_admin_message_history, message, session_id)
+            if self.logger.isEnabledFor(DEBUG):
+                self.logger.debug(f"[fromAdmin] {session_id} | {to_pipe_delimited(raw).decode()}")
 
             msg_type = fix.MsgType()
             message.getHeader().getField(msg_type)
@@ -221,28 +370,38 @@ class App(fix.Application, FixInterface):
 
     def toApp(self, message: fix.Message, session_id: fix.SessionID):
         try:
-            msg = fix_message_string(message)
-            self.sent_app_message_history.append(msg)
-            self.logger.debug(f"[toApp] {session_id} | {msg}")
+            raw = self.record_history(SENT_APP, self.sent_app_message_history, message, session_id)
+            if self.logger.isEnabledFor(DEBUG):
+                self.logger.debug(f"[toApp] {session_id} | {to_pipe_delimited(raw).decode()}")
         except Exception as error:
             self.logger.error(f"session : {self.session_id} , exception in [toApp] callback , might related to "
                               f"underlying c++ quickfix engine")
             self.logger.error(error, exc_info=True)
 
     def fromApp(self, message: fix.Message, session_id: fix.SessionID):
+        if self.stamp_latency:
+            self.received_ns = time.monotonic_ns()
         try:
-            msg = fix_message_string(message)
-            self.logger.debug(f"[fromApp] {session_id} | {msg}")
-            self.received_app_message_history.append(msg)
+            raw = self.record_history(
+                RECEIVED_APP, self.received_app_message_history, message, session_id, self.received_ns
+            )
+            if self.logger.isEnabledFor(DEBUG):
+                self.logger.debug(f"[fromApp] {session_id} | {to_pipe_delimited(raw).decode()}")
             msg_type = fix.MsgType()
             message.getHeader().getField(msg_type)
 
-            sending_time = extract_message_field_value(fix.SendingTime(), message, 'datetime')
+            sending_time = SENDING_TIME_PLAN.extract(message.getHeader())["sending_time"]
 
             if msg_type.getValue() == fix.MsgType_MarketDataSnapshotFullRefresh:
-                self.on_market_data_refresh_full(message, sending_time)
+                if self.fast_md_parsing:
+                    self.on_market_data_refresh_full_fast(message, sending_time)
+                else:
+                    self.on_market_data_refresh_full(message, sending_time)
             elif msg_type.getValue() == fix.MsgType_MarketDataIncrementalRefresh:
-                self.on_market_data_refresh_incremental(message, sending_time)
+                if self.fast_md_parsing:
+                    self.on_market_data_refresh_incremental_fast(message, sending_time)
+                else:
+                    self.on_market_data_refresh_incremental(message, sending_time)
             elif msg_type.getValue() == fix.MsgType_ExecutionReport:
                 self.on_exec_report(message, session_id, sending_time)
             elif msg_type.getValue() == fix.MsgType_PositionReport:
@@ -274,6 +433,18 @@ class App(fix.Application, FixInterface):
             self.logger.error(f"session : {self.session_id} , exception in [fromApp] callback , might related to "
                               f"underlying c++ quickfix engine")
             self.logger.error(error, exc_info=True)
+        finally:
+            self.received_ns = None
+
+    def enqueue(self, msg: Message):
+        """
+        Puts a parsed message to the message queue. Messages parsed in fromApp are
+        stamped with the receive and parse time if stamp_latency is set.
+        """
+        if self.received_ns is not None:
+            msg.received_ns = self.received_ns
+            msg.parsed_ns = time.monotonic_ns()
+        self.message_queue.put(msg, block=False)
 
     def send_message_to_session(self, message: fix.Message):
         try:
@@ -301,7 +472,7 @@ class App(fix.Application, FixInterface):
             - https://www.onixs.biz/fix-dictionary/4.4/msgType_AO_6579.html
         """
         pos_req_status = extract_message_field_value(fix.PosReqStatus(), message)
-        self.message_queue.put(PositionRequestAck(pos_req_status), block=False)
+        self.enqueue(PositionRequestAck(pos_req_status))
         if pos_req_status == fix.PosReqStatus_REJECTED:
             self.logger.error(
                 f"request for position rejected "
@@ -319,7 +490,7 @@ class App(fix.Application, FixInterface):
         result = extract_message_field_value(fix.TradeRequestResult(), message)
         status = extract_message_field_value(fix.TradeRequestStatus(), message)
         symbol = extract_message_field_value(fix.Symbol(), message)
-        self.message_queue.put(TradeCaptureReportRequestAck(symbol, result, status), block=False)
+        self.enqueue(TradeCaptureReportRequestAck(symbol, result, status))
         if result != fix.TradeRequestResult_SUCCESSFUL or status == fix.TradeRequestStatus_REJECTED:
             self.logger.error(
                 f"trade capture report request rejected - Rejected "
@@ -351,18 +522,18 @@ class App(fix.Application, FixInterface):
                 f"text={text} "
                 f"| {fix_message_string(message)}")
         report = OrderMassCancelReport(exchange, symbol, response, request_type, reject_reason, text)
-        self.message_queue.put(report, block=False)
+        self.enqueue(report)
 
     def on_heart_beat(self, message, session_id):
         receive_ts = extract_message_field_value(fix.SendingTime(), message, "datetime")
-        self.message_queue.put(Heartbeat(receive_ts), block=False)
+        self.enqueue(Heartbeat(receive_ts))
 
     def on_business_message_reject(self, message, session_id):
         ref_msg_seq_num = extract_message_field_value(fix.RefSeqNum(), message, "int")
         ref_msg_type = extract_message_field_value(fix.RefMsgType(), message, "str")
         reason = extract_message_field_value(fix.BusinessRejectReason(), message, "int")
         text = extract_message_field_value(fix.Text(), message, "str")
-        self.message_queue.put(BusinessMessageReject(ref_msg_seq_num, ref_msg_type, reason, text), block=False)
+        self.enqueue(BusinessMessageReject(ref_msg_seq_num, ref_msg_type, reason, text))
         self.logger.error(
             f"on_business_reject {reason} : "
             f"ref msg seq {ref_msg_seq_num} "
@@ -381,7 +552,7 @@ class App(fix.Application, FixInterface):
         ref_tag = extract_message_field_value(fix.RefTagID(), message, "int")
         reason = extract_message_field_value(fix.SessionRejectReason(), message, "int")
         text = extract_message_field_value(fix.Text(), message, "str")
-        self.message_queue.put(Reject(ref_msg_seq_num, ref_msg_type, ref_tag, reason, text), block=False)
+        self.enqueue(Reject(ref_msg_seq_num, ref_msg_type, ref_tag, reason, text))
         self.logger.error(
             f"on_reject {session_reject_reason_to_string(reason)} : "
             f"ref_msg_seq_num={ref_msg_seq_num}, "
@@ -412,11 +583,12 @@ class App(fix.Application, FixInterface):
         """
         #receive_ts = extract_message_field_value(fix.SendingTime(), message, "datetime")
         receive_ts = dt_now_utc()
-        exchange = extract_message_field_value(fix.SecurityExchange(), message, "str")
-        symbol = extract_message_field_value(fix.Symbol(), message, "str")
+        header = MD_SNAPSHOT_PLAN.extract(message)
+        exchange = header["exchange"]
+        symbol = header["symbol"]
+        group_size = header["group_size"]
+        md_req_id = header["md_req_id"]
         group = fix44.MarketDataSnapshotFullRefresh.NoMDEntries()
-        group_size = extract_message_field_value(fix.NoMDEntries(), message, "int")
-        md_req_id = extract_message_field_value(fix.MDReqID(), message, "str")
 
         self.logger.debug(
             f" ===> on_market_data_refresh_full [{group_size}] {exchange} {symbol} "
@@ -428,12 +600,11 @@ class App(fix.Application, FixInterface):
         asks = {}
         for i in range(group_size):
             message.getGroup(i + 1, group)
-            entry_type = extract_message_field_value(fix.MDEntryType(), group, "")
-            price = extract_message_field_value(fix.MDEntryPx(), group, "float")
-            size = extract_message_field_value(fix.MDEntrySize(), group, "float")
-            date_str = extract_message_field_value(fix.StringField(272), group, "str")  # QuickFix bug
-            time_str = extract_message_field_value(fix.StringField(273), group, "str")
-            timestamp = str_to_datetime(f"{date_str}-{time_str}")
+            entry = MD_SNAPSHOT_ENTRY_PLAN.extract(group)
+            entry_type = entry["entry_type"]
+            price = entry["price"]
+            size = entry["size"]
+            timestamp = str_to_datetime(f"{entry['date_str']}-{entry['time_str']}")
 
             if entry_type == fix.MDEntryType_BID:
                 bids[price] = size
@@ -448,7 +619,7 @@ class App(fix.Application, FixInterface):
         # we have an issue with zero size books, most likely from a trade snapshot that is empty
         if group_size > 0:
             snapshot = OrderBookSnapshot(exchange, symbol, timestamp, receive_ts, bids, asks)
-            self.message_queue.put(snapshot, block=False)
+            self.enqueue(snapshot)
         else:
             self.logger.error(
                 f"Market_data_refresh - empty book for exchange {exchange} symbol {symbol} "
@@ -476,7 +647,7 @@ class App(fix.Application, FixInterface):
         # receive_ts = extract_message_field_value(fix.SendingTime(), message, "datetime")
         receive_ts = dt_now_utc()
         group = fix44.MarketDataIncrementalRefresh.NoMDEntries()
-        group_size = extract_message_field_value(fix.NoMDEntries(), message, "int")
+        group_size = MD_SNAPSHOT_PLAN.extract(message)["group_size"]
 
         self.logger.debug(f"{fn} receive_ts={receive_ts} group_size={group_size}")
 
@@ -488,16 +659,14 @@ class App(fix.Application, FixInterface):
 
         for i in range(group_size):
             message.getGroup(i + 1, group)
-            entry_type = extract_message_field_value(fix.MDEntryType(), group, "")
-            # update_action = extract_message_field_value(fix.MDUpdateAction(), group, "")
-            exchange = extract_message_field_value(fix.SecurityExchange(), group, "str")
-            symbol = extract_message_field_value(fix.Symbol(), group, "str")
-            price = extract_message_field_value(fix.MDEntryPx(), group, "float")
-            size = extract_message_field_value(fix.MDEntrySize(), group, "float")
+            entry = MD_INCREMENTAL_ENTRY_PLAN.extract(group)
+            entry_type = entry["entry_type"]
+            exchange = entry["exchange"]
+            symbol = entry["symbol"]
+            price = entry["price"]
+            size = entry["size"]
             side = None  # if we want to have the side of the trade we should get the trades via SBE
-            date_str = extract_message_field_value(fix.StringField(272), group, "str")  # QuickFix bug
-            time_str = extract_message_field_value(fix.StringField(273), group, "str")
-            element_ts = str_to_datetime(f"{date_str}-{time_str}")  # TODO clarify diff between element_ts / receive_ts
+            element_ts = str_to_datetime(f"{entry['date_str']}-{entry['time_str']}")  # TODO clarify diff between element_ts / receive_ts
 
             if entry_type == fix.MDEntryType_TRADE:
                 trades.append(Trade(exchange, symbol, element_ts, receive_ts, side, price, size))
@@ -524,10 +693,69 @@ class App(fix.Application, FixInterface):
                 self.logger.debug(
                     f"{fn} enqueue book_update {book_key=} update:{str(book_update)}"
                 )
-                self.message_queue.put(book_update, block=False)
+                self.enqueue(book_update)
+
+        if trades:
+            self.enqueue(Trades(trades))
+
+    def on_market_data_refresh_full_fast(self, message, sending_time):
+        """
+        Same as on_market_data_refresh_full but parses the raw message string
+        in one pass into arrays instead of walking the repeating group.
+        """
+        receive_ts = dt_now_utc()
+        entries = parse_market_data(message.toString())
+        group_size = len(entries)
+
+        self.logger.debug(
+            f" ===> on_market_data_refresh_full_fast [{group_size}] {entries.exchange} {entries.symbol} "
+            f"{receive_ts} {entries.md_req_id}"
+        )
+
+        if group_size > 0:
+            is_bid = entries.entry_type == fix.MDEntryType_BID
+            is_ask = entries.entry_type == fix.MDEntryType_OFFER
+            bids = dict(zip(entries.price[is_bid].tolist(), entries.quantity[is_bid].tolist()))
+            asks = dict(zip(entries.price[is_ask].tolist(), entries.quantity[is_ask].tolist()))
+            timestamp = entries.timestamp(group_size - 1)
+            snapshot = OrderBookSnapshot(entries.exchange, entries.symbol, timestamp, receive_ts, bids, asks)
+            self.enqueue(snapshot)
+        else:
+            self.logger.error(
+                f"Market_data_refresh - empty book for exchange {entries.exchange} symbol {entries.symbol} "
+                f"| {fix_message_string(message)}"
+            )
+
+    def on_market_data_refresh_incremental_fast(self, message, sending_time):
+        """
+        Same as on_market_data_refresh_incremental but parses the raw message
+        string in one pass into arrays instead of walking the repeating group.
+        """
+        receive_ts = dt_now_utc()
+        entries = parse_market_data(message.toString())
+
+        book_updates: Dict[Tuple[str, str], OrderBookUpdate] = {}
+        trades: List[Trade] = []
+
+        rows = zip(
+            entries.entry_type.tolist(), entries.exchanges.tolist(), entries.symbols.tolist(),
+            entries.price.tolist(), entries.quantity.tolist()
+        )
+        for i, (entry_type, exchange, symbol, price, size) in enumerate(rows):
+            if entry_type == fix.MDEntryType_TRADE:
+                trades.append(Trade(exchange, symbol, entries.timestamp(i), receive_ts, None, price, size))
+            else:
+                book_update = book_updates.get((exchange, symbol), None)
+                if book_update is None:
+                    book_update = OrderBookUpdate(exchange, symbol, entries.timestamp(i), receive_ts)
+                    book_updates[(exchange, symbol)] = book_update
+                book_update.add(price, size, entry_type == fix.MDEntryType_BID)
+
+        for book_update in book_updates.values():
+            self.enqueue(book_update)
 
         if trades:
-            self.message_queue.put(Trades(trades), block=False)
+            self.enqueue(Trades(trades))
 
     def on_exec_report(self, message, session_id, sending_time):
         """
@@ -536,13 +764,14 @@ class App(fix.Application, FixInterface):
             - https://docs.deribit.com/test/#order-mass-status-request-af
         """
         report = ExecReport.from_message(message)
+        self.order_latency.on_exec_report(report)
 
         if report.exec_type == fix.ExecType_REJECTED and report.text == REJECT_TEXT_GATEWAY_NOT_READY:
-            self.message_queue.put(GatewayNotReady(report), block=False)
+            self.enqueue(GatewayNotReady(report))
         if report.exec_type == fix.ExecType_REJECTED and report.text == REJECT_TEXT_NOT_CONNECTED:
-            self.message_queue.put(NotConnected(report), block=False)
+            self.enqueue(NotConnected(report))
         else:
-            self.message_queue.put(report, block=False)
+            self.enqueue(report)
 
     def on_position_report(self, message, session_id, sending_time):
         """
@@ -550,90 +779,64 @@ class App(fix.Application, FixInterface):
             - https://www.onixs.biz/fix-dictionary/4.4/msgtype_ap_6580.html
             - https://docs.deribit.com/#position-report-ap
         """
-        pos_req_id = extract_message_field_value(fix.PosReqID(), message, "str")
-        pos_maint_rpt_id = extract_message_field_value(fix.PosMaintRptID(), message, "str")
-        pos_req_type = extract_message_field_value(fix.PosReqType(), message, "int")
-        tot_num_pos_reports = extract_message_field_value(fix.TotalNumPosReports(), message, "int")
-        exchange = extract_message_field_value(fix.SecurityExchange(), message, "str")
-        account = extract_message_field_value(fix.Account(), message, "str")
-        symbol = extract_message_field_value(fix.Symbol(), message, "str")
-        text = extract_message_field_value(fix.Text(), message, "str")
-        settle_price = extract_message_field_value(fix.SettlPrice(), message, "float")
-        clearing_business_date = extract_message_field_value(fix.ClearingBusinessDate(), message, "str")
+        values = POSITION_REPORT_PLAN.extract(message)
+        tot_num_pos_reports = values["tot_num_pos_reports"]
 
         group = fix44.PositionReport.NoPositions()
-        group_size = extract_message_field_value(fix.NoPositions(), message, "int")
         positions = []
-        for i in range(group_size):
+        for i in range(values["group_size"]):
             message.getGroup(i + 1, group)
-            post_type = extract_message_field_value(fix.PosType(), group, "str")
-            long_qty = extract_message_field_value(fix.LongQty(), group, "float")
-            short_qty = extract_message_field_value(fix.ShortQty(), group, "float")
-            positions.append(Position(symbol, account, long_qty, short_qty, post_type))
+            pos = POSITION_PLAN.extract(group)
+            positions.append(
+                Position(values["symbol"], values["account"], pos["long_qty"], pos["short_qty"], pos["pos_type"])
+            )
 
         report = PositionReport(
-            exchange, pos_maint_rpt_id, pos_req_id, pos_req_type, settle_price,
-            clearing_business_date, positions, text, tot_num_pos_reports
+            values["exchange"], values["pos_maint_rpt_id"], values["pos_req_id"], values["pos_req_type"],
+            values["settle_price"], values["clearing_business_date"], positions, values["text"], tot_num_pos_reports
         )
 
         self.position_reports.append(report)
         if len(self.position_reports) == tot_num_pos_reports:
             reports = self.position_reports
             self.position_reports = []
-            self.message_queue.put(PositionReports(reports), block=False, timeout=None)  # TODO check
+            self.enqueue(PositionReports(reports))  # TODO check
 
     def on_trade_capture_report(self, message, session_id, sending_time):
         """
         Trade Capture Report <AE> message
             - https://www.onixs.biz/fix-dictionary/4.4/msgType_AE_6569.html
         """
-        trade_report_id = extract_message_field_value(fix.TradeReportID(), message, "str")
-        trade_req_id = extract_message_field_value(fix.TradeRequestID(), message, "str")
-        last_requested = extract_message_field_value(fix.LastRptRequested(), message, "bool")
-        tot_num_trade_reports = extract_message_field_value(fix.TotNumTradeReports(), message, "int")
-
-        previously_reported = extract_message_field_value(fix.PreviouslyReported(), message, "bool")
-        exec_id = extract_message_field_value(fix.ExecID(), message, "str")
-        exec_type = extract_message_field_value(fix.ExecType(), message, "")
-        last_px = extract_message_field_value(fix.LastPx(), message, "float")
-        last_qty = extract_message_field_value(fix.LastQty(), message, "float")
-        transact_time = extract_message_field_value(fix.StringField(60), message, "str")  # QuickFix bug
-        transact_time = str_to_datetime(transact_time)
-        trade_date = extract_message_field_value(fix.TradeDate(), message, "str")
-        symbol = extract_message_field_value(fix.Symbol(), message, "str")
-        exchange = extract_message_field_value(fix.SecurityExchange(), message, "str")
+        values = TRADE_CAPTURE_REPORT_PLAN.extract(message)
+        tot_num_trade_reports = values["tot_num_trade_reports"]
 
         sides_group = fix44.TradeCaptureReport.NoSides()
-        num_sides = extract_message_field_value(fix.NoSides(), message, "int")
         sides = []
-        for i in range(num_sides):
+        for i in range(values["num_sides"]):
             message.getGroup(i + 1, sides_group)
-            side = extract_message_field_value(fix.Side(), sides_group, "")
-            order_id = extract_message_field_value(fix.OrderID(), sides_group, "str")
-            account = extract_message_field_value(fix.Account(), sides_group, "str")
-            num_parties = extract_message_field_value(fix.NoPartyIDs(), sides_group, "int")
+            side = TRADE_REPORT_SIDE_PLAN.extract(sides_group)
+            num_parties = side["num_parties"]
             party_group = sides_group.NoPartyIDs()
             parties = []
             if num_parties is not None:
                 for j in range(num_parties):
                     sides_group.getGroup(i + 1, party_group)
-                    party_id = extract_message_field_value(fix.PartyID(), party_group, "str")
-                    party_id_source = extract_message_field_value(fix.PartyIDSource(), party_group, "")
-                    party_role = extract_message_field_value(fix.PartyRole(), party_group, "int")
-                    parties.append(TradeReportParty(party_id, party_id_source, party_role))
+                    party = TRADE_REPORT_PARTY_PLAN.extract(party_group)
+                    parties.append(TradeReportParty(party["party_id"], party["party_id_source"], party["party_role"]))
 
-            sides.append(TradeReportSide(side, order_id, account, parties))
+            sides.append(TradeReportSide(side["side"], side["order_id"], side["account"], parties))
 
         report = TradeReport(
-            exchange, symbol, trade_report_id, trade_req_id, previously_reported,
-            exec_id, exec_type, last_px, last_qty, transact_time, trade_date, sides
+            values["exchange"], values["symbol"], values["trade_report_id"], values["trade_req_id"],
+            values["previously_reported"], values["exec_id"], values["exec_type"], values["last_px"],
+            values["last_qty"], values["transact_time"], values["trade_date"], sides
         )
 
         self.trade_reports.append(report)
         if len(self.trade_reports) == tot_num_trade_reports:
             reports = self.trade_reports
             self.trade_reports = []
-            self.message_queue.put(TradeCaptureReport(reports), block=False)
+            self.enqueue(TradeCaptureReport(reports))
 
     def on_security_list(self, message, sending_time):
         """
@@ -672,17 +875,10 @@ class App(fix.Application, FixInterface):
 
         for i in range(group_size):
             message.getGroup(i + 1, group)
-            exchange = extract_message_field_value(fix.SecurityExchange(), group, "str")
-            symbol = extract_message_field_value(fix.Symbol(), group, "str")
-            multiplier = extract_message_field_value(fix.ContractMultiplier(), group, "int")
-            min_trade_vol = extract_message_field_value(fix.MinTradeVol(), group, "float")
-            min_price_increment = extract_message_field_value(fix.MinPriceIncrement(), group, "float")
-            trading_session_id = extract_message_field_value(fix.TradingSessionID(), group, "str")
-            security_list[(exchange, symbol)] = Security(
-                exchange, symbol, multiplier, min_trade_vol, min_price_increment
-            )
+            values = SECURITY_PLAN.extract(group)
+            security_list[(values["exchange"], values["symbol"])] = Security(**values)
 
-        self.message_queue.put(SecurityReport(security_list), block=False, timeout=None)  # TODO check
+        self.enqueue(SecurityReport(security_list))  # TODO check
 
     def on_security_definition(self, message: fix.Message, sending_time):
         self.logger.debug(f"on_security_definition {fix_message_string(message)}")
@@ -691,17 +887,19 @@ class App(fix.Application, FixInterface):
     def on_market_data_request_reject(self, message: fix.Message, session_id, sending_time):
         text = extract_message_field_value(fix.Text(), message, "str")
         reason = extract_message_field_value(fix.MDReqRejReason(), message, "str")
-        self.message_queue.put(MarketDataRequestReject(reason, text), block=False)
+        self.enqueue(MarketDataRequestReject(reason, text))
         self.logger.error(f"on_market_data_request_reject {session_id} | {fix_message_string(message)}")
 
     def on_order_cancel_reject(self, message: fix.Message, session_id, sending_time):
-        ord_id = extract_message_field_value(fix.OrderID(), message, "str")
-        cl_ord_id = extract_message_field_value(fix.ClOrdID(), message, "str")
-        orig_cl_ord_id = extract_message_field_value(fix.OrigClOrdID(), message, "str")
-        cxl_rej_response_to = extract_message_field_value(fix.CxlRejResponseTo(), message, "str")
-        cxl_rej_reason = extract_message_field_value(fix.CxlRejReason(), message, "int")
-        text = extract_message_field_value(fix.Text(), message, "str")
+        values = ORDER_CANCEL_REJECT_PLAN.extract(message)
+        ord_id = values["ord_id"]
+        cl_ord_id = values["cl_ord_id"]
+        orig_cl_ord_id = values["orig_cl_ord_id"]
+        cxl_rej_response_to = values["cxl_rej_response_to"]
+        cxl_rej_reason = values["cxl_rej_reason"]
+        text = values["text"]
         reason_str = cxl_rej_reason_to_string(cxl_rej_reason)
+        self.order_latency.rejected(cl_ord_id)
         self.logger.warning(
             f"order cancel reject: "
             f"ord_id {ord_id} "
@@ -712,10 +910,7 @@ class App(fix.Application, FixInterface):
             f"text:{text} "
             f"| {fix_message_string(message)}"
         )
-        self.message_queue.put(
-            OrderCancelReject(ord_id, cl_ord_id, orig_cl_ord_id, reason_str, text),
-            block=False,
-        )
+        self.enqueue(OrderCancelReject(ord_id, cl_ord_id, orig_cl_ord_id, reason_str, text))
         # self.strategy.on_order_cancel_reject_completed(cxl_rej_reason, text)
 
     def generate_msg_id(self) -> AnyStr:
@@ -772,6 +967,7 @@ class App(fix.Application, FixInterface):
             exchange, symbol, account, cl_ord_id, side, ord_type, order_qty, price,
             fix.OrdStatus_PENDING_NEW, min_qty, tif, ord_id=None, text=text
         )
+        self.order_latency.sent(NEW, cl_ord_id, exchange, symbol)
         self.send_message_to_session(message)
         return order, message
 
@@ -798,8 +994,12 @@ class App(fix.Application, FixInterface):
         tx_time.setString(datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
         message.setField(tx_time)
 
+        # the order may be owned by the order tracker and shared with its snapshots, so a copy is
+        # updated, the tracker updates its order from the execution reports under its lock
+        order = order.copy()
         order.ord_status = fix.OrdStatus_PENDING_CANCEL  # do not update order.cl_ord_id yet as may be rejected
 
+        self.order_latency.sent(CANCEL, cl_ord_id, order.exchange, order.symbol, order.ord_id)
         self.send_message_to_session(message)
         return order, message
 
@@ -873,8 +1073,12 @@ class App(fix.Application, FixInterface):
         tx_time.setString(datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
         message.setField(tx_time)
 
+        # the order may be owned by the order tracker and shared with its snapshots, so a copy is
+        # updated, the tracker updates its order from the execution reports under its lock
+        order = order.copy()
         order.ord_status = fix.OrdStatus_PENDING_CANCEL_REPLACE  # do not update order.cl_ord_id yet as may be rejected
 
+        self.order_latency.sent(REPLACE, cl_ord_id, order.exchange, order.symbol, order.ord_id)
         self.send_message_to_session(message)
 
         return order, message
@@ -1094,9 +1298,6 @@ class App(fix.Application, FixInterface):
         message = fix.Message()
         header = message.getHeader()
         header.setField(fix.MsgType(fix.MsgType_SecurityListRequest))
-        snd_time = fix.SendingTime()
-        snd_time.setString(datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
-        message.setField(snd_time)
         if exchange is not None:
             message.setField(fix.SecurityExchange(exchange))
         if subscription_request_type is not None:
@@ -1117,9 +1318,6 @@ class App(fix.Application, FixInterface):
         message = fix.Message()
         header = message.getHeader()
         header.setField(fix.MsgType(fix.MsgType_SecurityDefinitionRequest))
-        snd_time = fix.SendingTime()
-        snd_time.setString(datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
-        message.setField(snd_time)
         message.setField(fix.SecurityReqID(f"{req_id}_{self.next_request_id()}"))
         message.setField(fix.SecurityRequestType(security_request_type))
         if symbol is not None:
@@ -1148,9 +1346,6 @@ class App(fix.Application, FixInterface):
         message = fix.Message()
         header = message.getHeader()
         header.setField(fix.MsgType(fix.MsgType_MarketDataRequest))
-        snd_time = fix.SendingTime()
-        snd_time.setString(datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
-        message.setField(snd_time)
         message.setField(fix.MDReqID(req_id))
         message.setField(fix.SubscriptionRequestType(subscription_request_type))
         message.setField(fix.MarketDepth(market_depth))
@@ -1224,43 +1419,91 @@ class App(fix.Application, FixInterface):
     def get_trade_report_subscriptions(self):
         return copy.deepcopy(self.trade_report_subscriptions)
 
+    def record_history(
+            self, name: str, history: RingBuffer, message: fix.Message, session_id: fix.SessionID,
+            monotonic_ns: Optional[int] = None
+    ) -> bytes:
+        """
+        Records the raw message in history and writes it to the capture file, at monotonic_ns
+        if given, such as the receive time stamped in fromApp, otherwise at the time of writing.
+        """
+        raw = message.toString().encode()
+        history.append(raw)
+        self.metrics.fix_message_counter(name, msg_type_of(raw)).inc()
+        if self.stream_history:
+            self.history_writer.submit(name, raw)
+        if self.capture_writer is not None:
+            self.capture_writer.write_history(name, session_id.toString(), raw, monotonic_ns)
+        return raw
+
+    def message_histories(self) -> Dict[str, RingBuffer]:
+        return {
+            RECEIVED_APP: self.received_app_message_history,
+            RECEIVED_ADMIN: self.received_admin_message_history,
+            SENT_APP: self.sent_app_message_history,
+            SENT_ADMIN: self.sent_admin_message_history,
+        }
+
     def purge_fix_message_history(self):
         """
         Purge history to avoid growing memory footprint
         """
-        self.received_app_message_history = []
-        self.received_admin_message_history = []
-        self.sent_app_message_history = []
-        self.sent_admin_message_history = []
+        for history in self.message_histories().values():
+            history.clear()
         self.logger.debug("Purge Plain FIX Message History In Base App")
 
     def get_fix_message_history(self, purge_history=False) -> Dict[str, List[str]]:
         history = {
-            "received_app_message_history": self.received_app_message_history.copy(),
-            "received_admin_message_history": self.received_admin_message_history.copy(),
-            "sent_app_message_history": self.sent_app_message_history.copy(),
-            "sent_admin_message_history": self.sent_admin_message_history.copy(),
+            name: [to_pipe_delimited(raw).decode() for raw in buffer.snapshot()]
+            for name, buffer in self.message_histories().items()
         }
         if purge_history:
             self.purge_fix_message_history()
         return history
 
-    def save_fix_message_history(self, path=None, fmt="csv", pre=None, post=None, purge_history=False):
+    def save_fix_message_history(
+            self, path=None, fmt="csv", pre=None, post=None, purge_history=False, wait=False
+    ):
+        """
+        Hands the buffered history over to the background writer, which writes
+        one file per history name. If the history is streamed to disk already,
+        the writer is flushed instead. Returns immediately unless wait is set.
+        """
+        if self.capture_writer is not None:
+            self.capture_writer.flush()
+        if self.stream_history:
+            self.history_writer.flush(wait=wait)
+            self.logger.info(f"flushing FIX message history streamed to {self.history_writer.directory}")
+            if purge_history:
+                self.purge_fix_message_history()
+            return
+
         if path is None:
             path = self.export_dir
-        msg_hist = self.get_fix_message_history(purge_history)
-        if sum([len(hist) for hist in msg_hist.values()]) > 0:
+        histories = {name: buffer.snapshot() for name, buffer in self.message_histories().items()}
+        if purge_history:
+            self.purge_fix_message_history()
+        if sum([len(hist) for hist in histories.values()]) > 0:
             self.logger.info(f"saving FIX message history to {path}")
+            pre_ = pre + "_" if pre is not None else ""
+            _post = "_" + post if post is not None else ""
+            for name, history in histories.items():
+                self.history_writer.save(os.path.join(path, f"{pre_}{name}{_post}.{fmt}"), history)
+            if wait:
+                self.history_writer.flush()
+
+    def close_fix_message_history(self):
+        """
+        Stops the history writer and closes the capture file, so that streamed and
+        compressed files are complete. Called once when the application shuts down.
+        """
+        self.history_writer.stop()
+        if self.capture_writer is not None:
+            self.capture_writer.close()
+        self.logger.info(f"FIX message history closed")
 
-            def filename(name):
-                pre_ = pre + "_" if pre is not None else ""
-                _post = "_" + post if post is not None else ""
-                return os.path.join(path, f"{pre_}{name}{_post}.{fmt}")
-
-            def save(fix_msg_history, name):
-                with open(make_dirs_for_file(filename(name)), "w") as f:
-                    for row in fix_msg_history:
-                        f.write(row + "\n")
-
-            for key, history in msg_hist.items():
-                save(history, key)
+    def release_metrics(self):
+        """
+        Removes the gauges of this application from the metrics, called once when the application shuts down.
+        """
+        self.metrics.release(self.metrics_instance)
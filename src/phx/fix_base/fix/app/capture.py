@@ -0,0 +1,266 @@
+import mmap
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from phx.fix_base.fix.app.history import RECEIVED_ADMIN, RECEIVED_APP, SENT_ADMIN, SENT_APP, SOH
+from phx.fix_base.utils import make_dirs_for_file
+
+CAPTURE_MAGIC = b"PHXCAP01"
+CAPTURE_SUFFIX = ".phxcap"
+
+# file header: magic, wall clock ns and monotonic ns when the capture was opened
+FILE_HEADER = struct.Struct("<8sqq")
+
+# record header: length of raw message, flags, session index, monotonic receive ns, msg type
+RECORD_HEADER = struct.Struct("<IBBHq2s")
+
+SENT = 0x01
+ADMIN = 0x02
+SESSION = 0x80  # record defining the session string of a session index
+
+FLAGS_OF_HISTORY = {
+    RECEIVED_APP: 0,
+    RECEIVED_ADMIN: ADMIN,
+    SENT_APP: SENT,
+    SENT_ADMIN: SENT | ADMIN,
+}
+
+MSG_TYPE_TAG = SOH + b"35="
+CAPTURE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def msg_type_of(raw: bytes) -> bytes:
+    start = raw.find(MSG_TYPE_TAG)
+    if start < 0:
+        return b""
+    start += len(MSG_TYPE_TAG)
+    return raw[start:raw.find(SOH, start)]
+
+
+class CaptureRecord(NamedTuple):
+    offset: int
+    flags: int
+    session: str
+    monotonic_ns: int
+    msg_type: str
+    raw: bytes
+
+    @property
+    def sent(self) -> bool:
+        return bool(self.flags & SENT)
+
+    @property
+    def admin(self) -> bool:
+        return bool(self.flags & ADMIN)
+
+
+class CaptureIndex(NamedTuple):
+    offsets: np.ndarray
+    monotonic_ns: np.ndarray
+    flags: np.ndarray
+    msg_types: np.ndarray
+
+
+class CaptureWriter(object):
+    """
+    Writes raw FIX messages to a binary capture file, each record a fixed
+    header followed by the raw SOH delimited message:
+
+        uint32 length, uint8 flags, uint8 reserved, uint16 session, int64 monotonic ns, char[2] msg type
+
+    Flags mark sent and admin messages. Session strings are written once as
+    a SESSION record and referenced by index afterwards. Records are written
+    through a large buffer, call flush to make them visible to readers.
+    """
+
+    def __init__(self, filename: str, buffer_size: int = CAPTURE_BUFFER_SIZE):
+        self.filename = filename
+        self.file = open(make_dirs_for_file(filename), "wb", buffering=buffer_size)
+        self.sessions: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.num_records = 0
+        self.last_monotonic_ns = 0
+        self.file.write(FILE_HEADER.pack(CAPTURE_MAGIC, time.time_ns(), time.monotonic_ns()))
+
+    def session_index(self, session: str) -> int:
+        index = self.sessions.get(session, None)
+        if index is None:
+            index = self.sessions[session] = len(self.sessions)
+            encoded = session.encode()
+            self.file.write(RECORD_HEADER.pack(len(encoded), SESSION, 0, index, 0, b""))
+            self.file.write(encoded)
+        return index
+
+    def write(
+            self, flags: int, session: str, raw: bytes, monotonic_ns: Optional[int] = None,
+            msg_type: Optional[bytes] = None
+    ):
+        if msg_type is None:
+            msg_type = msg_type_of(raw)
+        with self.lock:
+            if self.file.closed:
+                return
+            # taken under the lock so that the records are ordered by time, a time stamped before
+            # a concurrent record was written is moved up to it to keep the order for seeking
+            if monotonic_ns is None:
+                monotonic_ns = time.monotonic_ns()
+            elif monotonic_ns < self.last_monotonic_ns:
+                monotonic_ns = self.last_monotonic_ns
+            self.last_monotonic_ns = monotonic_ns
+            index = self.session_index(session)
+            self.file.write(RECORD_HEADER.pack(len(raw), flags, 0, index, monotonic_ns, msg_type))
+            self.file.write(raw)
+            self.num_records += 1
+
+    def write_history(self, name: str, session: str, raw: bytes, monotonic_ns: Optional[int] = None):
+        self.write(FLAGS_OF_HISTORY[name], session, raw, monotonic_ns)
+
+    def flush(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+    def __str__(self):
+        return (f"CaptureWriter["
+                f"filename={self.filename}, "
+                f"num_records={self.num_records}, "
+                f"sessions={len(self.sessions)}"
+                f"]")
+
+
+class CaptureReader(object):
+    """
+    Memory mapped reader of a capture file. Iterating only decodes the record
+    headers and slices the raw messages that are actually returned, so that
+    filtering by message type or time does not touch the message bodies.
+    The index of all record offsets, times, flags and message types is built
+    on demand and used for seeking by time with a binary search.
+
+        with CaptureReader(filename) as reader:
+            for record in reader.records(msg_types=["8"], start_ns=t0):
+                ...
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = open(filename, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.wall_ns_at_open, self.monotonic_ns_at_open = FILE_HEADER.unpack_from(self.mmap, 0)
+        if magic != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a FIX capture file")
+        self.sessions: Dict[int, str] = {}
+        self.index: Optional[CaptureIndex] = None
+
+    def to_wall_ns(self, monotonic_ns: int) -> int:
+        return self.wall_ns_at_open + monotonic_ns - self.monotonic_ns_at_open
+
+    def headers(self, offset: int = FILE_HEADER.size) -> Iterator[tuple]:
+        """
+        Record headers as (offset, length, flags, session, monotonic ns, msg type), skipping session records.
+        """
+        buffer = self.mmap
+        end = len(buffer)
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        sessions = self.sessions
+        while offset + header_size <= end:
+            length, flags, _, session, monotonic_ns, msg_type = unpack_from(buffer, offset)
+            body = offset + header_size
+            if body + length > end:
+                break  # record truncated by a writer that has not flushed yet
+            if flags & SESSION:
+                sessions[session] = buffer[body:body + length].decode()
+            else:
+                yield offset, length, flags, session, monotonic_ns, msg_type
+            offset = body + length
+
+    def records(
+            self,
+            msg_types: Optional[Iterable[str]] = None,
+            start_ns: Optional[int] = None,
+            end_ns: Optional[int] = None,
+            sent: Optional[bool] = None,
+            admin: Optional[bool] = None,
+    ) -> Iterator[CaptureRecord]:
+        """
+        Records filtered by msg type, monotonic time range [start_ns, end_ns), direction and category.
+        """
+        types = {t.encode().ljust(2, b"\x00") for t in msg_types} if msg_types is not None else None
+        offset = self.seek(start_ns) if start_ns is not None else FILE_HEADER.size
+        header_size = RECORD_HEADER.size
+        for offset, length, flags, session, monotonic_ns, msg_type in self.headers(offset):
+            if end_ns is not None and monotonic_ns >= end_ns:
+                break
+            if types is not None and msg_type not in types:
+                continue
+            if sent is not None and bool(flags & SENT) != sent:
+                continue
+            if admin is not None and bool(flags & ADMIN) != admin:
+                continue
+            body = offset + header_size
+            yield CaptureRecord(
+                offset,
+                flags,
+                self.sessions.get(session, ""),
+                monotonic_ns,
+                msg_type.rstrip(b"\x00").decode(),
+                self.mmap[body:body + length],
+            )
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.records()
+
+    def build_index(self) -> CaptureIndex:
+        offsets: List[int] = []
+        times: List[int] = []
+        flags_list: List[int] = []
+        types: List[bytes] = []
+        for offset, _, flags, _, monotonic_ns, msg_type in self.headers():
+            offsets.append(offset)
+            times.append(monotonic_ns)
+            flags_list.append(flags)
+            types.append(msg_type)
+        self.index = CaptureIndex(
+            np.array(offsets, dtype=np.int64),
+            np.array(times, dtype=np.int64),
+            np.array(flags_list, dtype=np.uint8),
+            np.array(types, dtype="S2"),
+        )
+        return self.index
+
+    def seek(self, monotonic_ns: int) -> int:
+        """
+        Offset of the first record received at or after monotonic_ns.
+        """
+        index = self.index if self.index is not None else self.build_index()
+        i = int(np.searchsorted(index.monotonic_ns, monotonic_ns, side="left"))
+        return int(index.offsets[i]) if i < len(index.offsets) else len(self.mmap)
+
+    def count_by_msg_type(self) -> Dict[str, int]:
+        index = self.index if self.index is not None else self.build_index()
+        types, counts = np.unique(index.msg_types, return_counts=True)
+        return {t.decode(): int(c) for t, c in zip(types, counts)}
+
+    def close(self):
+        self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        index = self.index if self.index is not None else self.build_index()
+        return len(index.offsets)
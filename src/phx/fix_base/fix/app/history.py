@@ -0,0 +1,301 @@
+import gzip
+import os
+import queue
+import threading
+from collections import deque
+from enum import Enum
+from logging import Logger
+from typing import Dict, Iterator, List, Optional
+
+from phx.fix_base.utils import make_dirs_for_file
+
+SOH = b"\x01"
+PIPE = b"|"
+
+RECEIVED_APP = "received_app_message_history"
+RECEIVED_ADMIN = "received_admin_message_history"
+SENT_APP = "sent_app_message_history"
+SENT_ADMIN = "sent_admin_message_history"
+HISTORY_NAMES = (RECEIVED_APP, RECEIVED_ADMIN, SENT_APP, SENT_ADMIN)
+
+DEFAULT_HISTORY_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_HISTORY_FILE_MAX_BYTES = 256 * 1024 * 1024
+WRITER_BATCH_SIZE = 1024
+
+
+def to_pipe_delimited(raw: bytes) -> bytes:
+    """
+    Raw SOH delimited message as pipe delimited line without trailing delimiter.
+    """
+    return raw.rstrip(SOH).replace(SOH, PIPE)
+
+
+class RingBuffer(object):
+    """
+    Bounded history of raw FIX messages. Keeps the most recent messages up
+    to max_bytes in total and evicts the oldest ones beyond that.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: deque = deque()
+        self.num_bytes = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def append(self, raw: bytes):
+        with self.lock:
+            self.entries.append(raw)
+            self.num_bytes += len(raw)
+            while self.num_bytes > self.max_bytes and len(self.entries) > 1:
+                self.num_bytes -= len(self.entries.popleft())
+                self.evicted += 1
+
+    def snapshot(self) -> List[bytes]:
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.num_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.snapshot())
+
+    def __str__(self):
+        return (f"RingBuffer["
+                f"entries={len(self.entries)}, "
+                f"num_bytes={self.num_bytes}, "
+                f"max_bytes={self.max_bytes}, "
+                f"evicted={self.evicted}"
+                f"]")
+
+
+class Compression(str, Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"  # requires the optional zstandard package
+
+
+class FsyncPolicy(str, Enum):
+    NEVER = "never"  # leave it to the OS
+    FLUSH = "flush"  # on flush requests and when a file is closed
+    ALWAYS = "always"  # after every written batch
+
+
+COMPRESSION_SUFFIX = {
+    Compression.NONE: "",
+    Compression.GZIP: ".gz",
+    Compression.ZSTD: ".zst",
+}
+
+
+def check_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression of the FIX history requires the zstandard package") from e
+    return zstandard
+
+
+class HistoryFile(object):
+    """
+    Binary output file with optional gzip or zstd compression.
+    """
+
+    def __init__(self, filename: str, compression: Compression = Compression.NONE):
+        self.filename = filename
+        zstandard = check_zstandard() if compression == Compression.ZSTD else None
+        self.raw = open(filename, "wb")
+        if compression == Compression.GZIP:
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode="wb")
+        elif compression == Compression.ZSTD:
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+        self.num_bytes = 0
+
+    def writelines(self, lines: List[bytes]):
+        self.stream.writelines(lines)
+        self.num_bytes += sum(len(line) for line in lines)
+
+    def flush(self, fsync=False):
+        if self.stream is not self.raw:
+            self.stream.flush()
+        self.raw.flush()
+        if fsync:
+            os.fsync(self.raw.fileno())
+
+    def close(self, fsync=False):
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.flush()
+        if fsync:
+            os.fsync(self.raw.fileno())
+        self.raw.close()
+
+
+class HistoryWriter(threading.Thread):
+    """
+    Background thread writing the FIX message history, so that neither
+    recording nor saving history blocks the caller. It takes two kinds of
+    work from a handoff queue:
+
+        - entries streamed as they arrive, one file per history name, rotated
+          when a file reaches max_file_bytes:
+          {directory}/{prefix}_{name}_{index:04d}.csv
+        - bulk saves of a list of entries to a given file
+
+    Lines are pipe delimited and written with writelines in batches. The
+    thread is started on first use. Stop closes the files so that compressed
+    files get their trailer; after that saves are written by the caller and
+    streamed entries are dropped.
+    """
+    ENTRY = "entry"
+    SAVE = "save"
+    FLUSH = "flush"
+    STOP = "stop"
+
+    def __init__(
+            self,
+            directory: str,
+            prefix: Optional[str] = None,
+            max_file_bytes: int = DEFAULT_HISTORY_FILE_MAX_BYTES,
+            logger: Optional[Logger] = None,
+            compression: str = Compression.NONE,
+            fsync: str = FsyncPolicy.NEVER,
+            name: str = "HistoryWriter",
+    ):
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.directory = str(directory)
+        self.prefix = f"{prefix}_" if prefix else ""
+        self.max_file_bytes = max_file_bytes
+        self.logger = logger
+        self.compression = Compression(compression or Compression.NONE)
+        self.fsync = FsyncPolicy(fsync)
+        if self.compression == Compression.ZSTD:
+            check_zstandard()
+        self.queue = queue.SimpleQueue()
+        self.start_lock = threading.Lock()
+        self.files: Dict[str, HistoryFile] = {}
+        self.file_index: Dict[str, int] = {}
+        self.written = 0
+
+    def ensure_started(self):
+        if self.ident is None:
+            with self.start_lock:
+                if self.ident is None:
+                    self.start()
+
+    def stopped(self) -> bool:
+        return self.ident is not None and not self.is_alive()
+
+    def submit(self, name: str, raw: bytes):
+        if self.stopped():
+            return
+        self.ensure_started()
+        self.queue.put((HistoryWriter.ENTRY, name, raw))
+
+    def save(self, filename: str, entries: List[bytes]):
+        """
+        Writes entries to filename, with the compression suffix appended, in the background.
+        """
+        filename = filename + COMPRESSION_SUFFIX[self.compression]
+        if self.stopped():
+            self.try_write(self.save_file, filename, entries)
+            return
+        self.ensure_started()
+        self.queue.put((HistoryWriter.SAVE, filename, entries))
+
+    def flush(self, timeout: Optional[float] = None, wait: bool = True) -> bool:
+        """
+        Flushes all work submitted so far. Blocks until done if wait is set.
+        Returns immediately once the thread is stopped, its files are closed then.
+        """
+        if self.stopped():
+            return True
+        self.ensure_started()
+        done = threading.Event()
+        self.queue.put((HistoryWriter.FLUSH, done, None))
+        return done.wait(timeout) if wait else False
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Writes the work submitted so far, closes the files and ends the thread.
+        """
+        if self.ident is not None and self.is_alive():
+            self.queue.put((HistoryWriter.STOP, None, None))
+            self.join(timeout)
+
+    def file_name(self, name: str) -> str:
+        return os.path.join(
+            self.directory,
+            f"{self.prefix}{name}_{self.file_index[name]:04d}.csv{COMPRESSION_SUFFIX[self.compression]}"
+        )
+
+    def open_file(self, name: str) -> HistoryFile:
+        self.file_index[name] = self.file_index.get(name, -1) + 1
+        self.files[name] = HistoryFile(make_dirs_for_file(self.file_name(name)), self.compression)
+        return self.files[name]
+
+    def write(self, name: str, lines: List[bytes]):
+        f = self.files.get(name, None)
+        if f is None or f.num_bytes >= self.max_file_bytes:
+            if f is not None:
+                f.close(self.fsync != FsyncPolicy.NEVER)
+            f = self.open_file(name)
+        f.writelines(lines)
+        self.written += len(lines)
+
+    def save_file(self, filename: str, entries: List[bytes]):
+        f = HistoryFile(make_dirs_for_file(filename), self.compression)
+        try:
+            for i in range(0, len(entries), WRITER_BATCH_SIZE):
+                f.writelines([to_pipe_delimited(raw) + b"\n" for raw in entries[i:i + WRITER_BATCH_SIZE]])
+        finally:
+            f.close(self.fsync != FsyncPolicy.NEVER)
+
+    def close_files(self):
+        for f in self.files.values():
+            f.close(self.fsync != FsyncPolicy.NEVER)
+        self.files = {}
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < WRITER_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: Dict[str, List[bytes]] = {}
+            events = []
+            for kind, a, b in batch:
+                if kind == HistoryWriter.ENTRY:
+                    lines.setdefault(a, []).append(to_pipe_delimited(b) + b"\n")
+                elif kind == HistoryWriter.SAVE:
+                    self.try_write(self.save_file, a, b)
+                elif kind == HistoryWriter.FLUSH:
+                    events.append(a)
+                elif kind == HistoryWriter.STOP:
+                    running = False
+            for name, rows in lines.items():
+                self.try_write(self.write, name, rows)
+            if events or self.fsync == FsyncPolicy.ALWAYS:
+                for f in self.files.values():
+                    self.try_write(f.flush, self.fsync != FsyncPolicy.NEVER)
+            for event in events:
+                event.set()
+        self.close_files()
+
+    def try_write(self, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.exception(f"HistoryWriter: failed to write history: {e}")
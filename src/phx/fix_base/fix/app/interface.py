@@ -224,6 +224,15 @@ class FixInterface(abc.ABC):
             fmt="csv",
             pre=None,
             post=None,
-            purge_history=False
+            purge_history=False,
+            wait=False
     ):
         pass
+
+    @abc.abstractmethod
+    def close_fix_message_history(self):
+        pass
+
+    @abc.abstractmethod
+    def release_metrics(self):
+        pass
@@ -0,0 +1,247 @@
+import glob
+import gzip
+import heapq
+import os
+import re
+import threading
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+import quickfix as fix
+
+from phx.fix_base.fix.app.app import App
+from phx.fix_base.fix.app.capture import ADMIN, SENT, CaptureReader, msg_type_of
+from phx.fix_base.fix.app.history import (
+    COMPRESSION_SUFFIX, PIPE, RECEIVED_ADMIN, RECEIVED_APP, SENT_ADMIN, SENT_APP, SOH, Compression, check_zstandard
+)
+from phx.fix_base.utils.utils import str_to_epoch_ns
+
+DEFAULT_DATA_DICTIONARY = str(Path(__file__).resolve().parents[1] / "specs" / "FIX44.xml")
+
+SENDING_TIME_PATTERN = re.compile(rb"\x0152=([^\x01]*)")
+HEADER_FIELD_PATTERN = re.compile(rb"(?:^|\x01)(8|49|56)=([^\x01]*)")
+
+HISTORY_OF_FLAGS = {
+    0: RECEIVED_APP,
+    ADMIN: RECEIVED_ADMIN,
+    SENT: SENT_APP,
+    SENT | ADMIN: SENT_ADMIN,
+}
+
+
+class ReplayRecord(NamedTuple):
+    name: str  # history name, i.e. direction and message category
+    session: str  # session id string, empty if not recorded
+    time_ns: Optional[int]  # monotonic receive ns of captures, sending time of history files
+    raw: bytes
+
+
+def sending_time_ns(raw: bytes) -> Optional[int]:
+    match = SENDING_TIME_PATTERN.search(raw)
+    return str_to_epoch_ns(match.group(1).decode()) if match is not None else None
+
+
+def open_history_file(filename: str):
+    if filename.endswith(COMPRESSION_SUFFIX[Compression.GZIP]):
+        return gzip.open(filename, "rb")
+    if filename.endswith(COMPRESSION_SUFFIX[Compression.ZSTD]):
+        return check_zstandard().open(filename, "rb")
+    return open(filename, "rb")
+
+
+def history_file_records(filename: str, name: str) -> Iterator[ReplayRecord]:
+    """
+    Records of a pipe delimited history file as written by save_fix_message_history.
+    """
+    with open_history_file(filename) as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if line:
+                raw = line.replace(PIPE, SOH) + SOH
+                yield ReplayRecord(name, "", sending_time_ns(raw), raw)
+
+
+def history_files(directory: str, name: str, pre: Optional[str] = None, post: Optional[str] = None,
+                  fmt: str = "csv") -> List[str]:
+    """
+    History files of a name in directory, either saved or streamed to rotating files.
+    """
+    pre_ = pre + "_" if pre is not None else ""
+    _post = "_" + post if post is not None else ""
+    for suffix in COMPRESSION_SUFFIX.values():
+        filename = os.path.join(directory, f"{pre_}{name}{_post}.{fmt}{suffix}")
+        if os.path.exists(filename):
+            return [filename]
+    return sorted(glob.glob(os.path.join(glob.escape(directory), f"{pre_}{name}_[0-9][0-9][0-9][0-9].{fmt}*")))
+
+
+def history_records(
+        directory: str,
+        pre: Optional[str] = None,
+        post: Optional[str] = None,
+        fmt: str = "csv",
+        include_sent: bool = False,
+) -> Iterator[ReplayRecord]:
+    """
+    Records of the history files in directory merged by sending time.
+    """
+    names = [RECEIVED_ADMIN, RECEIVED_APP] + ([SENT_ADMIN, SENT_APP] if include_sent else [])
+    streams = []
+    for name in names:
+        files = history_files(directory, name, pre, post, fmt)
+        streams.append(record for filename in files for record in history_file_records(filename, name))
+    return heapq.merge(*streams, key=lambda record: record.time_ns or 0)
+
+
+def capture_records(filename: str, include_sent: bool = False, **filters) -> Iterator[ReplayRecord]:
+    """
+    Records of a binary capture file in recorded order, filters as for CaptureReader.records.
+    """
+    with CaptureReader(filename) as reader:
+        for record in reader.records(sent=None if include_sent else False, **filters):
+            yield ReplayRecord(
+                HISTORY_OF_FLAGS[record.flags & (SENT | ADMIN)], record.session, record.monotonic_ns, record.raw
+            )
+
+
+class ReplayRunner(object):
+    """
+    Replacement of AppRunner which feeds recorded messages through App
+    instead of running a QuickFIX initiator. Received messages go through
+    App.fromApp and App.fromAdmin, logon and logout messages also trigger
+    the onLogon and onLogout callbacks, so that a PhxApi created with this
+    runner dispatches the replayed session as if it was live. Stopping the
+    runner logs out the sessions still logged on.
+
+    Messages are replayed as fast as possible or, with speed set, at the
+    recorded pace scaled by speed. Sent messages are only recorded to the
+    App history if include_sent is set.
+
+        app = App(queue.Queue(), fix.SessionSettings(), logger, export_dir)
+        runner = ReplayRunner(app, capture_records(filename), logger)
+        api = MyApi(runner, config, exchange, symbols, symbols, logger)
+    """
+
+    def __init__(
+            self,
+            app: App,
+            records: Iterable[ReplayRecord],
+            logger: Logger,
+            speed: Optional[float] = None,
+            data_dictionary: Optional[str] = None,
+            session_id: Optional[fix.SessionID] = None,
+            include_sent: bool = False,
+    ):
+        self.app = app
+        self.records = records
+        self.logger = logger
+        self.speed = speed
+        self.data_dictionary = fix.DataDictionary(data_dictionary or DEFAULT_DATA_DICTIONARY)
+        self.session_id = session_id
+        self.include_sent = include_sent
+        self.session_ids: Dict[str, fix.SessionID] = {}
+        self.logged_on: Set[fix.SessionID] = set()
+        self.is_fix_session_up = False
+        self.to_stop = False
+        self.thread: Optional[threading.Thread] = None
+        self.done = threading.Event()
+        self.num_replayed = 0
+        self.elapsed = 0.0
+
+    def start(self):
+        self.to_stop = False
+        self.done.clear()
+        self.is_fix_session_up = True
+        self.thread = threading.Thread(target=self.replay, name="Replay", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.to_stop = True
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        # sessions still logged on are logged out as by stopping an initiator
+        for session_id in list(self.logged_on):
+            self.logged_on.discard(session_id)
+            self.app.onLogout(session_id)
+        self.is_fix_session_up = False
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    def to_message(self, raw: bytes) -> fix.Message:
+        return fix.Message(raw.decode(), self.data_dictionary, False)
+
+    def session_of(self, record: ReplayRecord) -> fix.SessionID:
+        if self.session_id is not None:
+            return self.session_id
+        session = record.session
+        if not session:
+            # history files do not record the session, take it from the header from our side
+            header = {tag: value.decode() for tag, value in HEADER_FIELD_PATTERN.findall(record.raw[:256])}
+            is_sent = record.name in (SENT_APP, SENT_ADMIN)
+            sender_comp_id = header.get(b"49" if is_sent else b"56", "")
+            target_comp_id = header.get(b"56" if is_sent else b"49", "")
+            session = f"{header.get(b'8', '')}:{sender_comp_id}->{target_comp_id}"
+        session_id = self.session_ids.get(session, None)
+        if session_id is None:
+            begin_string, comp_ids = session.split(":", 1)
+            sender_comp_id, target_comp_id = comp_ids.split("->", 1)
+            session_id = self.session_ids[session] = fix.SessionID(begin_string, sender_comp_id, target_comp_id)
+            self.app.onCreate(session_id)
+        return session_id
+
+    def replay(self):
+        fn = "replay"
+        app = self.app
+        histories = app.message_histories()
+        self.num_replayed = 0
+        start = time.perf_counter()
+        first_time_ns = None
+        try:
+            if self.session_id is not None:
+                app.onCreate(self.session_id)
+            for record in self.records:
+                if self.to_stop:
+                    break
+                if record.name in (SENT_APP, SENT_ADMIN) and not self.include_sent:
+                    continue
+                if self.speed and record.time_ns is not None:
+                    if first_time_ns is None:
+                        first_time_ns = record.time_ns
+                    delay = (record.time_ns - first_time_ns) / self.speed * 1e-9 - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                session_id = self.session_of(record)
+                message = self.to_message(record.raw)
+                if record.name == RECEIVED_APP:
+                    app.fromApp(message, session_id)
+                elif record.name == RECEIVED_ADMIN:
+                    app.fromAdmin(message, session_id)
+                    msg_type = msg_type_of(record.raw)
+                    if msg_type == b"A":
+                        self.logged_on.add(session_id)
+                        app.onLogon(session_id)
+                    elif msg_type == b"5":
+                        self.logged_on.discard(session_id)
+                        app.onLogout(session_id)
+                else:
+                    app.record_history(record.name, histories[record.name], message, session_id)
+                self.num_replayed += 1
+        except Exception as e:
+            self.logger.exception(f"{fn}: exception {e}")
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.logger.info(
+                f"{fn}: replayed {self.num_replayed} messages in {self.elapsed:.3f}s "
+                f"({self.num_replayed / max(self.elapsed, 1e-9):,.0f} msgs/s)"
+            )
+            self.done.set()
+
+    def __str__(self):
+        return (f"ReplayRunner["
+                f"num_replayed={self.num_replayed}, "
+                f"elapsed={self.elapsed:.3f}, "
+                f"speed={self.speed}"
+                f"]")
@@ -6,12 +6,54 @@ from datetime import datetime
 
 from phx.fix_base.fix.model.message import Message
 from phx.fix_base.fix.model.order import Order
-from phx.fix_base.fix.utils import extract_message_field_value, side_to_string, order_status_to_string
+from phx.fix_base.fix.utils import ExtractionPlan, FieldSpec, side_to_string, order_status_to_string
 from phx.fix_base.fix.utils import exec_type_to_string, order_type_to_string, time_in_force_to_string
-from phx.fix_base.utils import str_to_datetime
+
+# enum like and repeated fields are interned so that retained reports share one string per value
+EXEC_REPORT_PLAN = ExtractionPlan([
+    FieldSpec(fix.ExecID().getField(), "exec_id"),
+    FieldSpec(fix.OrderID().getField(), "ord_id"),
+    FieldSpec(fix.ClOrdID().getField(), "cl_ord_id"),
+    FieldSpec(fix.OrdStatus().getField(), "ord_status", "intern"),
+    FieldSpec(fix.ExecType().getField(), "exec_type", "intern"),
+    FieldSpec(fix.OrdType().getField(), "ord_type", "intern"),
+    FieldSpec(fix.Price().getField(), "price", "float"),
+    FieldSpec(fix.Side().getField(), "side", "intern"),
+    FieldSpec(fix.Symbol().getField(), "symbol", "intern"),
+    FieldSpec(fix.SecurityExchange().getField(), "exchange", "intern"),
+    FieldSpec(fix.Account().getField(), "account", "intern"),
+    FieldSpec(fix.TimeInForce().getField(), "tif", "intern"),
+    FieldSpec(fix.OrderQty().getField(), "order_qty", "float"),
+    FieldSpec(fix.MinQty().getField(), "min_qty", "float"),
+    FieldSpec(fix.LeavesQty().getField(), "leaves_qty", "float"),
+    FieldSpec(fix.CumQty().getField(), "cum_qty", "float"),
+    FieldSpec(fix.LastQty().getField(), "last_qty", "float"),
+    FieldSpec(fix.AvgPx().getField(), "avg_px", "float"),
+    FieldSpec(fix.LastPx().getField(), "last_px", "float"),
+    FieldSpec(fix.TransactTime().getField(), "tx_time", "datetime"),
+    FieldSpec(fix.Text().getField(), "text"),
+])
+
+MASS_STATUS_REQ_ID = fix.MassStatusReqID().getField()
+
+MASS_STATUS_PLAN = ExtractionPlan([
+    FieldSpec(MASS_STATUS_REQ_ID, "status_req_id"),
+    FieldSpec(fix.TotNumReports().getField(), "tot_num_reports", "int"),
+    FieldSpec(fix.LastRptRequested().getField(), "last_rpt_requested", "bool"),
+])
+
+ORDER_STATUS_PLAN = ExtractionPlan([
+    FieldSpec(fix.OrdStatusReqID().getField(), "status_req_id"),
+])
 
 
 class ExecReport(Message):
+    __slots__ = (
+        "exchange", "symbol", "account", "tx_time", "exec_id", "exec_type", "cl_ord_id", "ord_id", "side",
+        "price", "avg_px", "last_px", "ord_type", "ord_status", "order_qty", "min_qty", "cum_qty", "leaves_qty",
+        "last_qty", "tif", "status_req_id", "text", "is_mass_status", "tot_num_reports", "last_rpt_requested",
+    )
+
     def __init__(
             self,
             exchange,
@@ -86,70 +128,20 @@ class ExecReport(Message):
              - leaves_qty = order_qty - cum_qty otherwise
 
         """
-        exec_id = extract_message_field_value(fix.ExecID(), message, "str")
-        ord_id = extract_message_field_value(fix.OrderID(), message, "str")
-        cl_ord_id = extract_message_field_value(fix.ClOrdID(), message, "str")
-        ord_status = extract_message_field_value(fix.OrdStatus(), message, "str")
-        exec_type = extract_message_field_value(fix.ExecType(), message, "")
-        ord_type = extract_message_field_value(fix.OrdType(), message, "str")
-        price = extract_message_field_value(fix.Price(), message, "float")
-        side = extract_message_field_value(fix.Side(), message, "str")
-        symbol = extract_message_field_value(fix.Symbol(), message, "str")
-        exchange = extract_message_field_value(fix.SecurityExchange(), message, "str")
-        account = extract_message_field_value(fix.Account(), message, "str")
-        tif = extract_message_field_value(fix.TimeInForce(), message, "str")
-        order_qty = extract_message_field_value(fix.OrderQty(), message, "float")
-        min_qty = extract_message_field_value(fix.MinQty(), message, "float")
-        leaves_qty = extract_message_field_value(fix.LeavesQty(), message, "float")
-        cum_qty = extract_message_field_value(fix.CumQty(), message, "float")
-        last_qty = extract_message_field_value(fix.LastQty(), message, "float")
-        last_qty = 0 if last_qty is None else last_qty
-        avg_px = extract_message_field_value(fix.AvgPx(), message, "float")
-        last_px = extract_message_field_value(fix.LastPx(), message, "float")
-        tx_time = extract_message_field_value(fix.StringField(60), message, "str")  # bug in QuickFix
-        tx_time = str_to_datetime(tx_time)
-        text = extract_message_field_value(fix.Text(), message, "str")
-
-        is_mass_status = None
-        status_req_id = None
-        tot_num_reports = None
-        last_rpt_requested = None
+        values = EXEC_REPORT_PLAN.extract(message)
+        if values["last_qty"] is None:
+            values["last_qty"] = 0
+
+        exec_type = values["exec_type"]
         if exec_type == "I":
-            is_mass_status = message.isSetField(fix.MassStatusReqID().getField())
+            is_mass_status = message.isSetField(MASS_STATUS_REQ_ID)
+            values["is_mass_status"] = is_mass_status
             if is_mass_status:
-                status_req_id = extract_message_field_value(fix.MassStatusReqID(), message, "str")
-                tot_num_reports = extract_message_field_value(fix.TotNumReports(), message, "int")
-                last_rpt_requested = extract_message_field_value(fix.LastRptRequested(), message, "bool")
+                values.update(MASS_STATUS_PLAN.extract(message))
             else:
-                status_req_id = extract_message_field_value(fix.OrdStatusReqID(), message, "str")
-
-        return ExecReport(
-            exchange=exchange,
-            symbol=symbol,
-            account=account,
-            tx_time=tx_time,
-            exec_id=exec_id,
-            exec_type=exec_type,
-            cl_ord_id=cl_ord_id,
-            ord_id=ord_id,
-            side=side,
-            price=price,
-            avg_px=avg_px,
-            last_px=last_px,
-            ord_type=ord_type,
-            ord_status=ord_status,
-            order_qty=order_qty,
-            min_qty=min_qty,
-            cum_qty=cum_qty,
-            leaves_qty=leaves_qty,
-            last_qty=last_qty,
-            tif=tif,
-            text=text,
-            status_req_id=status_req_id,
-            is_mass_status=is_mass_status,
-            tot_num_reports=tot_num_reports,
-            last_rpt_requested=last_rpt_requested,
-        )
+                values.update(ORDER_STATUS_PLAN.extract(message))
+
+        return ExecReport(**values)
 
     def key(self):
         return self.exchange, self.symbol
@@ -282,6 +274,7 @@ class ExecReport(Message):
 
 
 class MassStatusExecReport(Message):
+    __slots__ = "reports",
 
     def __init__(self, reports: List[ExecReport]):
         Message.__init__(self)
@@ -297,6 +290,7 @@ class MassStatusExecReport(Message):
 
 
 class MassStatusExecReportNoOrders(Message):
+    __slots__ = "exchange", "symbol", "text"
 
     def __init__(self, exchange, symbol, text):
         Message.__init__(self)
@@ -2,11 +2,19 @@ import quickfix as fix
 
 
 class Message(object):
+    # monotonic ns times at which the message was received by App.fromApp, parsed and put to
+    # the queue, and dequeued for dispatch; only set if App stamps latency
+    # subclasses declare __slots__ too so that messages carry no instance __dict__
+    __slots__ = "received_ns", "parsed_ns", "dequeued_ns"
+
     def __init__(self):
-        pass
+        self.received_ns = None
+        self.parsed_ns = None
+        self.dequeued_ns = None
 
 
 class Create(Message):
+    __slots__ = "session_id",
 
     def __init__(self, session_id: str):
         Message.__init__(self)
@@ -17,6 +25,7 @@ class Create(Message):
 
 
 class Logon(Message):
+    __slots__ = "session_id",
 
     def __init__(self, session_id: str):
         Message.__init__(self)
@@ -27,6 +36,7 @@ class Logon(Message):
 
 
 class Logout(Message):
+    __slots__ = "session_id",
 
     def __init__(self, session_id: str):
         Message.__init__(self)
@@ -37,6 +47,7 @@ class Logout(Message):
 
 
 class Heartbeat(Message):
+    __slots__ = "receive_ts",
 
     def __init__(self, receive_ts):
         Message.__init__(self)
@@ -47,6 +58,7 @@ class Heartbeat(Message):
 
 
 class GatewayNotReady(Message):
+    __slots__ = "report",
 
     def __init__(self, report):
         Message.__init__(self)
@@ -57,6 +69,7 @@ class GatewayNotReady(Message):
 
 
 class NotConnected(Message):
+    __slots__ = "report",
 
     def __init__(self, report):
         Message.__init__(self)
@@ -67,6 +80,7 @@ class NotConnected(Message):
 
 
 class PositionRequestAck(Message):
+    __slots__ = "status",
 
     def __init__(self, status):
         Message.__init__(self)
@@ -83,6 +97,7 @@ class PositionRequestAck(Message):
 
 
 class TradeCaptureReportRequestAck(Message):
+    __slots__ = "symbol", "result", "status"
 
     def __init__(self, symbol, result, status):
         Message.__init__(self)
@@ -99,6 +114,7 @@ class TradeCaptureReportRequestAck(Message):
 
 
 class OrderMassCancelReport(Message):
+    __slots__ = "exchange", "symbol", "response", "request_type", "reject_reason", "text"
 
     def __init__(self, exchange, symbol, response, request_type, reject_reason, text):
         Message.__init__(self)
@@ -121,6 +137,7 @@ class OrderMassCancelReport(Message):
 
 
 class BusinessMessageReject(Message):
+    __slots__ = "ref_msg_seq_num", "ref_msg_type", "reason", "text"
 
     def __init__(self, ref_msg_seq_num, ref_msg_type, reason, text):
         Message.__init__(self)
@@ -139,6 +156,7 @@ class BusinessMessageReject(Message):
 
 
 class Reject(Message):
+    __slots__ = "ref_msg_seq_num", "ref_msg_type", "ref_tag", "reason", "text"
 
     def __init__(self, ref_msg_seq_num, ref_msg_type, ref_tag, reason, text):
         Message.__init__(self)
@@ -159,6 +177,8 @@ class Reject(Message):
 
 
 class OrderCancelReject(Message):
+    __slots__ = "ord_id", "cl_ord_id", "orig_cl_ord_id", "reason", "text"
+
     def __init__(self, ord_id: str, cl_ord_id, orig_cl_ord_id, reason, text):
         super().__init__()
         self.ord_id = ord_id
@@ -180,6 +200,7 @@ class OrderCancelReject(Message):
 
 
 class MarketDataRequestReject(Message):
+    __slots__ = "reason", "text"
 
     def __init__(self, reason, text):
         Message.__init__(self)
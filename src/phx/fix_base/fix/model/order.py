@@ -1,3 +1,4 @@
+import copy
 import pandas as pd
 import quickfix as fix
 from typing import List, Dict, Any
@@ -7,6 +8,12 @@ from phx.fix_base.fix.utils import order_type_to_string, side_to_string, order_s
 
 
 class Order:
+    __slots__ = (
+        "cl_ord_id", "cl_ord_ids", "exchange", "symbol", "account", "side", "ord_type", "order_qty", "price",
+        "ord_status", "min_qty", "tif", "ord_id", "open_time", "leaves_qty", "cum_qty", "last_qty", "avg_px",
+        "last_px", "transact_time", "error", "text",
+    )
+
     def __init__(
             self, exchange, symbol, account, cl_ord_id, side, ord_type, order_qty,
             price=None, ord_status=None, min_qty=0, tif=None, ord_id=None,
@@ -39,11 +46,17 @@ class Order:
             self.error = error
             self.text = text
         else:
-            self.__dict__.update(_dict)
+            for name, value in _dict.items():
+                setattr(self, name, value)
 
     def key(self):
         return self.exchange, self.symbol
 
+    def copy(self) -> "Order":
+        order = copy.copy(self)
+        order.cl_ord_ids = list(self.cl_ord_ids)
+        return order
+
     def __eq__(self, other):
         if not isinstance(other, Order):
             return False
@@ -21,26 +21,155 @@ def price_impact(prices: npt.ArrayLike, cum_vols: npt.ArrayLike,
     return impact_prices, impact_pips
 
 
+# minimal number of levels added when the cumulative depth cache is extended
+CUMULATIVE_DEPTH_CHUNK = 64
+
+
+class CumulativeDepth:
+    """
+    Cumulative volume and notional of one side of a book, ordered from the top
+    of book outward.
+
+    Only the first `valid` entries are up to date. A book update invalidates
+    the cache from the rank of the touched level outward and queries extend it
+    lazily to the depth they need, so repeated impact queries between updates
+    are binary searches on the cached arrays.
+
+    The book provides `num_depth_levels(is_bid)` and
+    `depth_levels(is_bid, start, stop) -> (prices, volumes)` by rank.
+    """
+    __slots__ = "book", "is_bid", "prices", "cum_volumes", "cum_notionals", "valid"
+
+    def __init__(self, book, is_bid):
+        self.book = book
+        self.is_bid = is_bid
+        self.prices = np.empty(0, dtype=np.float64)
+        self.cum_volumes = np.empty(0, dtype=np.float64)
+        self.cum_notionals = np.empty(0, dtype=np.float64)
+        self.valid = 0
+
+    def invalidate(self, rank=0):
+        if rank < self.valid:
+            self.valid = max(0, rank)
+
+    def ensure(self, volume=None, levels=None) -> int:
+        """
+        Extend the cache until its cumulative volume exceeds volume and it
+        covers at least levels entries, or the side is exhausted.
+        """
+        n = self.book.num_depth_levels(self.is_bid)
+        valid = self.valid
+        while valid < n and (
+                (levels is not None and valid < levels) or
+                (volume is not None and (valid == 0 or self.cum_volumes[valid - 1] <= volume))
+        ):
+            stop = min(n, max(2 * valid, valid + CUMULATIVE_DEPTH_CHUNK, levels or 0))
+            prices, volumes = self.book.depth_levels(self.is_bid, valid, stop)
+            base_volume = self.cum_volumes[valid - 1] if valid else 0.0
+            base_notional = self.cum_notionals[valid - 1] if valid else 0.0
+            # accumulate from the base so results equal a cumsum over the full side
+            cum_volumes = np.cumsum(np.concatenate(([base_volume], volumes)))[1:]
+            cum_notionals = np.cumsum(np.concatenate(([base_notional], prices * volumes)))[1:]
+            self.prices = np.concatenate((self.prices[:valid], prices))
+            self.cum_volumes = np.concatenate((self.cum_volumes[:valid], cum_volumes))
+            self.cum_notionals = np.concatenate((self.cum_notionals[:valid], cum_notionals))
+            valid = stop
+        self.valid = valid
+        return valid
+
+    def cumulative_volumes(self, levels=None) -> npt.NDArray:
+        n = self.book.num_depth_levels(self.is_bid)
+        valid = self.ensure(levels=n if levels is None else min(levels, n))
+        return self.cum_volumes[:valid if levels is None else min(levels, valid)]
+
+    def impact_price(self, volume) -> float:
+        """
+        Price of the level at which the cumulative volume exceeds volume,
+        nan if the side does not have enough volume.
+        """
+        valid = self.ensure(volume=volume)
+        if valid == 0 or not np.isfinite(volume) or volume >= self.cum_volumes[valid - 1]:
+            return np.nan
+        return float(self.prices[np.searchsorted(self.cum_volumes[:valid], volume, side="right")])
+
+    def impact_pips(self, volume) -> float:
+        price = self.impact_price(volume)
+        if np.isnan(price):
+            return np.nan
+        ref_price = self.prices[0]
+        return float(abs(ref_price - price) / ref_price * 10000)
+
+    def vwap(self, volume) -> float:
+        """
+        Volume weighted average price of taking volume from this side,
+        nan if the side does not have enough volume.
+        """
+        valid = self.ensure(volume=volume)
+        if valid == 0 or not volume > 0 or volume > self.cum_volumes[valid - 1]:
+            return np.nan
+        i = int(np.searchsorted(self.cum_volumes[:valid], volume, side="left"))
+        prev_volume = self.cum_volumes[i - 1] if i else 0.0
+        prev_notional = self.cum_notionals[i - 1] if i else 0.0
+        return float((prev_notional + (volume - prev_volume) * self.prices[i]) / volume)
+
+    def impacts(self, impact_volumes: List) -> Tuple[List[float], List[float]]:
+        """
+        Impact prices and pips for several volumes, same result as price_impact.
+        """
+        impact_prices = [self.impact_price(v) for v in impact_volumes]
+        if self.valid == 0:
+            return impact_prices, [np.nan for _ in impact_prices]
+        ref_price = self.prices[0]
+        impact_pips = [
+            abs(ref_price - p) / ref_price * 10000 if not np.isnan(p) else np.nan for p in impact_prices
+        ]
+        return impact_prices, impact_pips
+
+
 class TopOfBook(Message):
-    __slots__ = "bid_price", "bid_volume", "ask_price", "ask_volume"
+    """
+    Best bid and ask of a book. Published as immutable value, a changed top of
+    book is a new object.
+    """
+    __slots__ = "bid_price", "bid_volume", "ask_price", "ask_volume", "exchange", "symbol", "exchange_ts", "local_ts"
 
-    def __init__(self, bid_price, bid_volume, ask_price, ask_volume):
+    def __init__(
+            self, bid_price, bid_volume, ask_price, ask_volume,
+            exchange=None, symbol=None, exchange_ts=None, local_ts=None
+    ):
         Message.__init__(self)
         self.bid_price = bid_price
         self.bid_volume = bid_volume
         self.ask_price = ask_price
         self.ask_volume = ask_volume
+        self.exchange = exchange
+        self.symbol = symbol
+        self.exchange_ts = exchange_ts
+        self.local_ts = local_ts
+
+    def key(self) -> Tuple[str, str]:
+        return self.exchange, self.symbol
+
+    def same_quote(self, bid_price, bid_volume, ask_price, ask_volume) -> bool:
+        return (
+            self.bid_price == bid_price and self.bid_volume == bid_volume and
+            self.ask_price == ask_price and self.ask_volume == ask_volume
+        )
 
     def __str__(self):
         return (f"TopOfBook["
+                f"exchange={self.exchange}, "
+                f"symbol={self.symbol}, "
                 f"bid_price={self.bid_price}, "
                 f"bid_volume={self.bid_volume}, "
                 f"ask_price={self.ask_price}, "
-                f"ask_volume={self.ask_volume}"
+                f"ask_volume={self.ask_volume}, "
+                f"exchange_ts={self.exchange_ts}"
                 f"]")
 
 
 class OrderBookSnapshot(Message):
+    __slots__ = "exchange", "symbol", "exchange_ts", "local_ts", "bids", "asks"
 
     def __init__(self, exchange, symbol, exchange_ts, local_ts, bids, asks):
         Message.__init__(self)
@@ -68,6 +197,7 @@ class OrderBookSnapshot(Message):
 
 
 class OrderBookUpdate(Message):
+    __slots__ = "exchange", "symbol", "exchange_ts", "local_ts", "updates"
 
     def __init__(self, exchange, symbol, exchange_ts, local_ts):
         Message.__init__(self)
@@ -108,6 +238,8 @@ class OrderBook:
         self.asks = asks if isinstance(asks, SortedDict) else SortedDict(asks)
         self.cum_bids = None
         self.cum_asks = None
+        self.bid_cum_depth = CumulativeDepth(self, True)
+        self.ask_cum_depth = CumulativeDepth(self, False)
         self.exchange_ts = exchange_ts
         self.local_ts = local_ts
 
@@ -126,6 +258,8 @@ class OrderBook:
     def snapshot(self, bids, asks):
         self.bids = SortedDict(bids)
         self.asks = SortedDict(asks)
+        self.bid_cum_depth.invalidate()
+        self.ask_cum_depth.invalidate()
 
     def timestamp(self, exchange_ts, local_ts):
         self.exchange_ts = exchange_ts
@@ -133,11 +267,17 @@ class OrderBook:
 
     def update(self, price, amount, is_bid):
         if is_bid:
+            depth = self.bid_cum_depth
+            if depth.valid and price >= depth.prices[depth.valid - 1]:
+                depth.invalidate(len(self.bids) - self.bids.bisect_right(price))
             if amount == 0:
                 self.bids.pop(price, None)
             else:
                 self.bids[price] = amount
         else:
+            depth = self.ask_cum_depth
+            if depth.valid and price <= depth.prices[depth.valid - 1]:
+                depth.invalidate(self.asks.bisect_left(price))
             if amount == 0:
                 self.asks.pop(price, None)
             else:
@@ -163,7 +303,9 @@ class OrderBook:
         ask = self.top_ask
         if bid is None or ask is None:
             return None
-        return TopOfBook(bid[0], bid[1], ask[0], ask[1])
+        return TopOfBook(
+            bid[0], bid[1], ask[0], ask[1], self.exchange, self.symbol, self.exchange_ts, self.local_ts
+        )
 
     @property
     def top_of_book_price(self) -> Optional[Tuple[float, float]]:
@@ -217,6 +359,335 @@ class OrderBook:
             ask_levels = ask_levels[0:levels, :]
         return bid_levels, ask_levels
 
+    def num_depth_levels(self, is_bid) -> int:
+        return len(self.bids) if is_bid else len(self.asks)
+
+    def depth_levels(self, is_bid, start, stop) -> Tuple[npt.NDArray, npt.NDArray]:
+        """
+        Prices and volumes of the levels with rank start to stop from the top of book.
+        """
+        if is_bid:
+            n = len(self.bids)
+            items = self.bids.items()[n - stop:n - start][::-1]
+        else:
+            items = self.asks.items()[start:stop]
+        levels = np.asarray(items, dtype=np.float64).reshape(-1, 2)
+        return levels[:, 0], levels[:, 1]
+
+    def cumulative_levels(self, levels=None):
+        """
+        Cumulative volumes from the top of book, served from the depth cache.
+        """
+        return self.bid_cum_depth.cumulative_volumes(levels), self.ask_cum_depth.cumulative_volumes(levels)
+
+    def update_cumulative_levels(self, levels=None):
+        self.cum_bids, self.cum_asks = self.cumulative_levels(levels)
+
+    def impact_price(self, volume, is_bid) -> float:
+        """
+        Price at which taking volume from the bid or ask side is exhausted.
+        """
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impact_price(volume)
+
+    def impact_pips(self, volume, is_bid) -> float:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impact_pips(volume)
+
+    def impact_vwap(self, volume, is_bid) -> float:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).vwap(volume)
+
+    def impacts(self, impact_volumes: List, is_bid) -> Tuple[List[float], List[float]]:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impacts(impact_volumes)
+
+    def tabulate_spread_lob(self, levels=None, float_fmt=".2f", table_fmt="psql"):
+        n = min(len(self.bids), len(self.asks)) if levels is None else levels
+        bid_levels, ask_levels = self.levels(n)
+        data = np.hstack((np.fliplr(bid_levels), ask_levels))
+        headers = ["vol", "bid", "ask", "vol"]
+        return tabulate(data, headers=headers, tablefmt=table_fmt, floatfmt=float_fmt)
+
+
+def price_decimals(tick_size: float, max_decimals=12) -> int:
+    """
+    Number of decimals required to represent prices on the tick grid.
+    """
+    for decimals in range(max_decimals + 1):
+        if abs(round(tick_size, decimals) - tick_size) <= 1e-9 * tick_size:
+            return decimals
+    return max_decimals
+
+
+class ArrayOrderBook:
+    """
+        L2 book on tick indexed contiguous NumPy arrays.
+
+        Prices are mapped to array positions by the instrument's minimum price
+        increment, so updates and top of book are O(1) apart from a scan to the
+        next populated tick when the best level is removed. The arrays grow
+        when a price falls outside of the allocated range.
+
+        Keeps the API of OrderBook and adds zero-copy per tick depth views.
+        The depth cache used for impact queries is ranked by tick distance
+        from the best price, so empty ticks appear as zero volume entries.
+    """
+
+    def __init__(
+            self, exchange, symbol, min_price_increment, bids=None, asks=None,
+            exchange_ts=None, local_ts=None, capacity=4096
+    ):
+        if min_price_increment is None or min_price_increment <= 0:
+            raise ValueError(f"invalid min_price_increment {min_price_increment} for {exchange} {symbol}")
+        self.exchange = exchange
+        self.symbol = symbol
+        self.tick_size = float(min_price_increment)
+        self.ticks_per_unit = 1.0 / self.tick_size
+        self.decimals = price_decimals(self.tick_size)
+        self.capacity = int(capacity)
+        self.offset = 0  # tick index of array position 0
+        self.bid_qty = np.zeros(self.capacity, dtype=np.float64)
+        self.ask_qty = np.zeros(self.capacity, dtype=np.float64)
+        self.best_bid = -1  # array position of best bid, -1 if no bids
+        self.best_ask = -1  # array position of best ask, -1 if no asks
+        self.best_bid_price = None
+        self.best_ask_price = None
+        self.num_bids = 0
+        self.num_asks = 0
+        self.cum_bids = None
+        self.cum_asks = None
+        self.bid_cum_depth = CumulativeDepth(self, True)
+        self.ask_cum_depth = CumulativeDepth(self, False)
+        self.exchange_ts = exchange_ts
+        self.local_ts = local_ts
+        self.snapshot(bids if bids is not None else {}, asks if asks is not None else {})
+
+    def key(self) -> Tuple[str, str]:
+        return self.exchange, self.symbol
+
+    def __str__(self):
+        return (f'exchange={self.exchange}, '
+                f'symbol={self.symbol}, '
+                f'exchange_ts={self.exchange_ts}, '
+                f'local_ts={self.local_ts}, '
+                f'top_bid={self.top_bid}, '
+                f'top_ask={self.top_ask}, '
+                f'spread={self.spread}')
+
+    def tick_index(self, price) -> int:
+        return round(price * self.ticks_per_unit)
+
+    def price_at(self, pos) -> float:
+        return round((self.offset + pos) * self.tick_size, self.decimals)
+
+    def prices_at(self, positions: npt.NDArray) -> npt.NDArray:
+        return np.round((self.offset + positions) * self.tick_size, self.decimals)
+
+    def snapshot(self, bids, asks):
+        bid_prices = np.fromiter(bids.keys(), dtype=np.float64, count=len(bids))
+        ask_prices = np.fromiter(asks.keys(), dtype=np.float64, count=len(asks))
+        ticks = np.rint(np.concatenate((bid_prices, ask_prices)) / self.tick_size).astype(np.int64)
+        if len(ticks):
+            lo, hi = int(ticks.min()), int(ticks.max())
+            self.capacity = max(self.capacity, 2 * (hi - lo + 1))
+            self.offset = lo - (self.capacity - (hi - lo + 1)) // 2
+        self.bid_qty = np.zeros(self.capacity, dtype=np.float64)
+        self.ask_qty = np.zeros(self.capacity, dtype=np.float64)
+        positions = ticks - self.offset
+        self.bid_qty[positions[:len(bids)]] = np.fromiter(bids.values(), dtype=np.float64, count=len(bids))
+        self.ask_qty[positions[len(bids):]] = np.fromiter(asks.values(), dtype=np.float64, count=len(asks))
+        bid_nz = np.flatnonzero(self.bid_qty)
+        ask_nz = np.flatnonzero(self.ask_qty)
+        self.num_bids = len(bid_nz)
+        self.num_asks = len(ask_nz)
+        self.best_bid = int(bid_nz[-1]) if len(bid_nz) else -1
+        self.best_ask = int(ask_nz[0]) if len(ask_nz) else -1
+        self.best_bid_price = self.price_at(self.best_bid) if self.best_bid >= 0 else None
+        self.best_ask_price = self.price_at(self.best_ask) if self.best_ask >= 0 else None
+        self.bid_cum_depth.invalidate()
+        self.ask_cum_depth.invalidate()
+
+    def timestamp(self, exchange_ts, local_ts):
+        self.exchange_ts = exchange_ts
+        self.local_ts = local_ts
+
+    def reserve(self, pos) -> int:
+        """
+        Grow the arrays so that position pos is valid and return its new position.
+        """
+        if 0 <= pos < self.capacity:
+            return pos
+        new_capacity = max(2 * self.capacity, self.capacity + abs(pos) + 1)
+        shift = new_capacity - self.capacity if pos < 0 else 0
+        for name in ("bid_qty", "ask_qty"):
+            grown = np.zeros(new_capacity, dtype=np.float64)
+            grown[shift:shift + self.capacity] = getattr(self, name)
+            setattr(self, name, grown)
+        self.capacity = new_capacity
+        self.offset -= shift
+        if self.best_bid >= 0:
+            self.best_bid += shift
+        if self.best_ask >= 0:
+            self.best_ask += shift
+        return pos + shift
+
+    def update(self, price, amount, is_bid):
+        pos = round(price * self.ticks_per_unit) - self.offset
+        if pos < 0 or pos >= self.capacity:
+            if amount == 0:
+                return  # delete of a level outside the arrays, which does not exist
+            if self.best_bid < 0 and self.best_ask < 0:
+                # empty book, center the arrays on the first price instead of growing them towards it
+                self.offset += pos - self.capacity // 2
+                pos = self.capacity // 2
+            else:
+                pos = self.reserve(pos)
+        if is_bid:
+            best = self.best_bid
+            qty = self.bid_qty
+            prev = qty[pos]
+            if prev == 0 and amount == 0:
+                return  # delete of a level which does not exist
+            qty[pos] = amount
+            if amount == 0:
+                if prev != 0:
+                    self.num_bids -= 1
+                    if pos == self.best_bid:
+                        nz = np.flatnonzero(qty[:pos]) if self.num_bids else ()
+                        self.best_bid = new_best = int(nz[-1]) if len(nz) else -1
+                        self.best_bid_price = self.price_at(new_best) if new_best >= 0 else None
+            else:
+                if prev == 0:
+                    self.num_bids += 1
+                if pos > self.best_bid:
+                    self.best_bid = pos
+                    self.best_bid_price = self.price_at(pos)
+            if self.bid_cum_depth.valid:
+                self.bid_cum_depth.invalidate(best - pos if best == self.best_bid else 0)
+        else:
+            best = self.best_ask
+            qty = self.ask_qty
+            prev = qty[pos]
+            if prev == 0 and amount == 0:
+                return  # delete of a level which does not exist
+            qty[pos] = amount
+            if amount == 0:
+                if prev != 0:
+                    self.num_asks -= 1
+                    if pos == self.best_ask:
+                        nz = np.flatnonzero(qty[pos + 1:]) if self.num_asks else ()
+                        self.best_ask = new_best = pos + 1 + int(nz[0]) if len(nz) else -1
+                        self.best_ask_price = self.price_at(new_best) if new_best >= 0 else None
+            else:
+                if prev == 0:
+                    self.num_asks += 1
+                if self.best_ask < 0 or pos < self.best_ask:
+                    self.best_ask = pos
+                    self.best_ask_price = self.price_at(pos)
+            if self.ask_cum_depth.valid:
+                self.ask_cum_depth.invalidate(pos - best if best == self.best_ask else 0)
+
+    @property
+    def bids(self) -> dict:
+        """
+        Bid levels as dict price -> volume, materialized on each access.
+        """
+        b, _ = self.levels()
+        return dict(zip(b[:, 0].tolist(), b[:, 1].tolist()))
+
+    @property
+    def asks(self) -> dict:
+        """
+        Ask levels as dict price -> volume, materialized on each access.
+        """
+        _, a = self.levels()
+        return dict(zip(a[:, 0].tolist(), a[:, 1].tolist()))
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_bid >= 0 and self.best_ask >= 0:
+            return self.best_ask_price - self.best_bid_price
+        else:
+            return None
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if self.best_bid >= 0 and self.best_ask >= 0:
+            return (self.best_bid_price + self.best_ask_price)/2.0
+        else:
+            return None
+
+    @property
+    def top_of_book(self) -> Optional[TopOfBook]:
+        bid = self.top_bid
+        ask = self.top_ask
+        if bid is None or ask is None:
+            return None
+        return TopOfBook(
+            bid[0], bid[1], ask[0], ask[1], self.exchange, self.symbol, self.exchange_ts, self.local_ts
+        )
+
+    @property
+    def top_of_book_price(self) -> Optional[Tuple[float, float]]:
+        bid = self.top_bid_price
+        ask = self.top_ask_price
+        return (bid, ask) if (bid is not None and ask is not None) else None
+
+    @property
+    def top_bid(self) -> Optional[Tuple[float, float]]:
+        """
+        Price and volume at best bid.
+        """
+        if self.best_bid >= 0:
+            return self.best_bid_price, float(self.bid_qty[self.best_bid])
+        else:
+            return None
+
+    @property
+    def top_bid_price(self) -> Optional[float]:
+        return self.best_bid_price
+
+    @property
+    def top_ask(self) -> Optional[Tuple[float, float]]:
+        """
+        Price and volume at best ask.
+        """
+        if self.best_ask >= 0:
+            return self.best_ask_price, float(self.ask_qty[self.best_ask])
+        else:
+            return None
+
+    @property
+    def top_ask_price(self) -> Optional[float]:
+        return self.best_ask_price
+
+    def bid_depth(self) -> npt.NDArray:
+        """
+        Zero-copy view of the bid volume per tick starting at the best bid and
+        moving away from it, i.e. element k is the volume at top_bid_price - k * tick_size.
+        """
+        return self.bid_qty[self.best_bid::-1] if self.best_bid >= 0 else self.bid_qty[0:0]
+
+    def ask_depth(self) -> npt.NDArray:
+        """
+        Zero-copy view of the ask volume per tick starting at the best ask and
+        moving away from it, i.e. element k is the volume at top_ask_price + k * tick_size.
+        """
+        return self.ask_qty[self.best_ask:] if self.best_ask >= 0 else self.ask_qty[0:0]
+
+    def levels(self, levels=None) -> Tuple[npt.NDArray, npt.NDArray]:
+        """
+        Get the populated levels as np arrays of (price, volume) rows,
+        bids in descending and asks in ascending price order.
+        """
+        bid_pos = np.flatnonzero(self.bid_qty[:self.best_bid + 1])[::-1] if self.best_bid >= 0 \
+            else np.empty(0, dtype=np.int64)
+        ask_pos = self.best_ask + np.flatnonzero(self.ask_qty[self.best_ask:]) if self.best_ask >= 0 \
+            else np.empty(0, dtype=np.int64)
+        if levels is not None:
+            bid_pos = bid_pos[0:levels]
+            ask_pos = ask_pos[0:levels]
+        bid_levels = np.column_stack((self.prices_at(bid_pos), self.bid_qty[bid_pos]))
+        ask_levels = np.column_stack((self.prices_at(ask_pos), self.ask_qty[ask_pos]))
+        return bid_levels, ask_levels
+
     def cumulative_levels(self, levels=None):
         b, a = self.levels(levels)
         cum_b = np.cumsum(b[:, 1])
@@ -226,9 +697,40 @@ class OrderBook:
     def update_cumulative_levels(self, levels=None):
         self.cum_bids, self.cum_asks = self.cumulative_levels(levels)
 
+    def num_depth_levels(self, is_bid) -> int:
+        if is_bid:
+            return self.best_bid + 1 if self.best_bid >= 0 else 0
+        else:
+            return self.capacity - self.best_ask if self.best_ask >= 0 else 0
+
+    def depth_levels(self, is_bid, start, stop) -> Tuple[npt.NDArray, npt.NDArray]:
+        """
+        Prices and volumes of the ticks start to stop away from the best price.
+        """
+        ticks = np.arange(start, stop)
+        if is_bid:
+            return self.prices_at(self.best_bid - ticks), self.bid_depth()[start:stop]
+        else:
+            return self.prices_at(self.best_ask + ticks), self.ask_depth()[start:stop]
+
+    def impact_price(self, volume, is_bid) -> float:
+        """
+        Price at which taking volume from the bid or ask side is exhausted.
+        """
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impact_price(volume)
+
+    def impact_pips(self, volume, is_bid) -> float:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impact_pips(volume)
+
+    def impact_vwap(self, volume, is_bid) -> float:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).vwap(volume)
+
+    def impacts(self, impact_volumes: List, is_bid) -> Tuple[List[float], List[float]]:
+        return (self.bid_cum_depth if is_bid else self.ask_cum_depth).impacts(impact_volumes)
+
     def tabulate_spread_lob(self, levels=None, float_fmt=".2f", table_fmt="psql"):
-        n = min(len(self.bids), len(self.asks)) if levels is None else levels
+        n = min(self.num_bids, self.num_asks) if levels is None else levels
         bid_levels, ask_levels = self.levels(n)
-        data = np.hstack(np.fliplr(bid_levels), ask_levels)
+        data = np.hstack((np.fliplr(bid_levels), ask_levels))
         headers = ["vol", "bid", "ask", "vol"]
         return tabulate(data, headers=headers, tablefmt=table_fmt, floatfmt=float_fmt)
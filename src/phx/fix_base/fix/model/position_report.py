@@ -5,6 +5,7 @@ from phx.fix_base.fix.model.message import Message
 
 
 class Position:
+    __slots__ = "symbol", "account", "long_qty", "short_qty", "pos_type"
 
     def __init__(self, symbol, account, long_qty, short_qty, pos_type=None):
         self.symbol = symbol
@@ -42,6 +43,10 @@ class Position:
 
 
 class PositionReport(object):
+    __slots__ = (
+        "exchange", "pos_maint_rpt_id", "pos_req_id", "pos_req_type", "settle_price", "clearing_business_date",
+        "positions", "text", "part_of_many",
+    )
 
     def __init__(self, exchange, pos_maint_rpt_id, pos_req_id, pos_req_type,
                  settle_price, clearing_business_date,
@@ -90,6 +95,7 @@ class PositionReport(object):
 
 
 class PositionReports(Message):
+    __slots__ = "reports",
 
     def __init__(self, reports: List[PositionReport]):
         Message.__init__(self)
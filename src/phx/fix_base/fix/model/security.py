@@ -4,6 +4,8 @@ from phx.fix_base.fix.model.message import Message
 
 
 class Security(object):
+    __slots__ = "exchange", "symbol", "multiplier", "min_trade_vol", "min_price_increment"
+
     def __init__(self, exchange, symbol, multiplier, min_trade_vol, min_price_increment):
         self.exchange = exchange
         self.symbol = symbol
@@ -22,6 +24,8 @@ class Security(object):
 
 
 class SecurityReport(Message):
+    __slots__ = "securities",
+
     def __init__(self, securities: Dict[Tuple[str, str], Security]):
         Message.__init__(self)
         self.securities = securities
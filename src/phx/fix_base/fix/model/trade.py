@@ -5,6 +5,8 @@ from phx.fix_base.fix.model.message import Message
 
 
 class Trade:
+    __slots__ = "exchange", "symbol", "exchange_ts", "local_ts", "side", "price", "quantity"
+
     def __init__(self, exchange, symbol, exchange_ts, local_ts, side, price, quantity):
         self.exchange = exchange
         self.symbol = symbol
@@ -28,6 +30,7 @@ class Trade:
 
 
 class Trades(Message):
+    __slots__ = "trades",
 
     def __init__(self, trades: List[Trade]):
         Message.__init__(self)
@@ -6,6 +6,7 @@ from phx.fix_base.fix.model.message import Message
 
 
 class TradeReportParty(object):
+    __slots__ = "party_id", "party_id_source", "party_role"
 
     def __init__(self, party_id, party_id_source, party_role):
         self.party_id = party_id
@@ -21,6 +22,7 @@ class TradeReportParty(object):
 
 
 class TradeReportSide(object):
+    __slots__ = "side", "order_id", "account", "parties"
 
     def __init__(self, side, order_id, account, parties: List[TradeReportParty]):
         self.side = side
@@ -38,6 +40,10 @@ class TradeReportSide(object):
 
 
 class TradeReport(object):
+    __slots__ = (
+        "exchange", "symbol", "trade_report_id", "trade_req_id", "previously_reported", "exec_id", "exec_type",
+        "last_px", "last_qty", "transact_time", "trade_date", "sides",
+    )
 
     def __init__(
             self, exchange, symbol, trade_report_id, trade_req_id, previously_reported,
@@ -115,6 +121,7 @@ class TradeReport(object):
 
 
 class TradeCaptureReport(Message):
+    __slots__ = "reports",
 
     def __init__(self, reports: List[TradeReport]):
         Message.__init__(self)
@@ -0,0 +1,3 @@
+from .market import SyntheticBook
+from .app import SimulatorApp
+from .simulator import ExchangeSimulator
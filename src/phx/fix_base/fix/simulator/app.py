@@ -0,0 +1,620 @@
+import base64
+import hashlib
+import hmac
+import itertools
+import threading
+from collections import deque
+from datetime import datetime
+from logging import Logger
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+import quickfix as fix
+import quickfix44 as fix44
+
+from phx.fix_base.fix.simulator.market import Entry, SyntheticBook
+from phx.fix_base.fix.utils import fix_message_string
+
+Ticker = Tuple[str, str]
+
+NO_ORDERS = "NO ORDERS"
+ORDER_NOT_FOUND = "not_found"
+
+# trade of an order kept for trade capture reports: exchange, symbol, side, ord_id, account, exec_id, px, qty, time
+SimulatedTrade = Tuple[str, str, str, str, str, str, float, float, str]
+
+
+def get_field(message: fix.FieldMap, tag: int, default=None) -> Optional[str]:
+    return message.getField(tag) if message.isSetField(tag) else default
+
+
+def utc_timestamp() -> str:
+    return datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3]
+
+
+def new_message(msg_type: str) -> fix.Message:
+    message = fix.Message()
+    message.getHeader().setField(fix.MsgType(msg_type))
+    return message
+
+
+class SimulatedOrder(object):
+
+    def __init__(self, ord_id, cl_ord_id, account, exchange, symbol, side, ord_type, price, order_qty, tif):
+        self.ord_id = ord_id
+        self.cl_ord_id = cl_ord_id
+        self.cl_ord_ids = [cl_ord_id]  # all cl_ord_ids the order had, to unindex it when closed
+        self.account = account
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side
+        self.ord_type = ord_type
+        self.price = price
+        self.order_qty = order_qty
+        self.tif = tif
+        self.cum_qty = 0.0
+        self.avg_px = 0.0
+        self.ord_status = fix.OrdStatus_PENDING_NEW
+
+    def key(self) -> Ticker:
+        return self.exchange, self.symbol
+
+    def leaves_qty(self) -> float:
+        if self.ord_status in (fix.OrdStatus_CANCELED, fix.OrdStatus_REJECTED, fix.OrdStatus_FILLED):
+            return 0.0
+        return self.order_qty - self.cum_qty
+
+    def is_open(self) -> bool:
+        return self.ord_status in (fix.OrdStatus_NEW, fix.OrdStatus_PARTIALLY_FILLED)
+
+    def __str__(self):
+        return (f"SimulatedOrder["
+                f"ord_id={self.ord_id}, "
+                f"cl_ord_id={self.cl_ord_id}, "
+                f"symbol={self.symbol}, "
+                f"side={self.side}, "
+                f"price={self.price}, "
+                f"order_qty={self.order_qty}, "
+                f"cum_qty={self.cum_qty}, "
+                f"ord_status={self.ord_status}"
+                f"]")
+
+
+class SimulatorApp(fix.Application):
+    """
+    Acceptor side of a Phoenix Prime like FIX gateway for local testing.
+
+        - logon with password or HMAC_SHA256 signature as sent by App.toAdmin
+        - security list, mass status, position and trade capture requests
+        - book and trade subscriptions on synthetic books, streamed by publish
+        - orders, cancels, replaces and mass cancels, orders crossing the
+          book are filled at the touch, resting orders are filled when the
+          market trades through their price
+
+    Only open orders are kept, indexed by ticker, so that the cost of a market
+    move does not grow with the orders placed over a run. The latest max_trades
+    fills are kept for trade capture reports.
+    """
+
+    def __init__(
+            self,
+            books: Dict[Ticker, SyntheticBook],
+            users: Dict[str, str],
+            logger: Logger,
+            account: str = "T1",
+            entries_per_update: int = 1,
+            max_trades: int = 10000,
+    ):
+        fix.Application.__init__(self)
+        self.books = books
+        self.users = users
+        self.logger = logger
+        self.account = account
+        self.entries_per_update = entries_per_update
+        self.lock = threading.RLock()
+        self.sessions: Set[fix.SessionID] = set()
+        self.book_subscriptions: Dict[Ticker, Dict[fix.SessionID, str]] = {ticker: {} for ticker in books}
+        self.trade_subscriptions: Dict[Ticker, Dict[fix.SessionID, str]] = {ticker: {} for ticker in books}
+        # open orders by ord_id, by any of their cl_ord_ids and by ticker, closed orders are removed
+        self.orders: Dict[str, SimulatedOrder] = {}
+        self.orders_by_cl_ord_id: Dict[str, SimulatedOrder] = {}
+        self.orders_by_ticker: Dict[Ticker, Dict[str, SimulatedOrder]] = {ticker: {} for ticker in books}
+        self.num_closed = 0
+        self.positions: Dict[Ticker, float] = {ticker: 0.0 for ticker in books}
+        self.trades: Deque[SimulatedTrade] = deque(maxlen=max_trades)
+        self.ids = itertools.count(1)
+        self.num_received = 0
+        self.num_sent = 0
+
+    def next_id(self, prefix: str) -> str:
+        return f"{prefix}{next(self.ids)}"
+
+    def send(self, message: fix.Message, session_id: fix.SessionID):
+        if fix.Session.sendToTarget(message, session_id):
+            self.num_sent += 1
+
+    def onCreate(self, session_id: fix.SessionID):
+        self.logger.info(f"simulator onCreate: session {session_id}")
+
+    def onLogon(self, session_id: fix.SessionID):
+        self.logger.info(f"simulator onLogon: session {session_id} logged in")
+        with self.lock:
+            self.sessions.add(session_id)
+
+    def onLogout(self, session_id: fix.SessionID):
+        self.logger.info(f"simulator onLogout: session {session_id} logged out")
+        with self.lock:
+            self.sessions.discard(session_id)
+            for subscriptions in list(self.book_subscriptions.values()) + list(self.trade_subscriptions.values()):
+                subscriptions.pop(session_id, None)
+
+    def toAdmin(self, message: fix.Message, session_id: fix.SessionID):
+        pass
+
+    def fromAdmin(self, message: fix.Message, session_id: fix.SessionID):
+        if message.getHeader().getField(fix.MsgType().getField()) == fix.MsgType_Logon:
+            self.authenticate(message)
+
+    def authenticate(self, message: fix.Message):
+        username = get_field(message, fix.Username().getField())
+        password = get_field(message, fix.Password().getField())
+        raw_data = get_field(message, fix.RawData().getField())
+        secret = self.users.get(username, None)
+        if secret is None or password is None:
+            raise fix.RejectLogon(f"unknown user {username}")
+        if raw_data is not None:
+            signature = hmac.new(secret.encode("utf-8"), raw_data.encode("utf-8"), digestmod=hashlib.sha256).digest()
+            valid = hmac.compare_digest(base64.b64encode(signature).decode("ascii"), password)
+        else:
+            valid = hmac.compare_digest(secret, password)
+        if not valid:
+            raise fix.RejectLogon(f"invalid signature for user {username}")
+
+    def toApp(self, message: fix.Message, session_id: fix.SessionID):
+        pass
+
+    def fromApp(self, message: fix.Message, session_id: fix.SessionID):
+        self.num_received += 1
+        msg_type = message.getHeader().getField(fix.MsgType().getField())
+        handler = self.handlers().get(msg_type, None)
+        if handler is None:
+            self.logger.warning(f"simulator: unsupported message | {fix_message_string(message)}")
+            return
+        with self.lock:
+            handler(message, session_id)
+
+    def handlers(self):
+        return {
+            fix.MsgType_SecurityListRequest: self.on_security_list_request,
+            fix.MsgType_MarketDataRequest: self.on_market_data_request,
+            fix.MsgType_OrderMassStatusRequest: self.on_order_mass_status_request,
+            fix.MsgType_RequestForPositions: self.on_request_for_positions,
+            fix.MsgType_TradeCaptureReportRequest: self.on_trade_capture_report_request,
+            fix.MsgType_NewOrderSingle: self.on_new_order_single,
+            fix.MsgType_OrderCancelRequest: self.on_order_cancel_request,
+            fix.MsgType_OrderCancelReplaceRequest: self.on_order_cancel_replace_request,
+            fix.MsgType_OrderMassCancelRequest: self.on_order_mass_cancel_request,
+        }
+
+    # reference data, positions and trades
+
+    def on_security_list_request(self, message: fix.Message, session_id: fix.SessionID):
+        reply = new_message(fix.MsgType_SecurityList)
+        reply.setField(fix.SecurityReqID(get_field(message, fix.SecurityReqID().getField(), "")))
+        reply.setField(fix.SecurityResponseID(self.next_id("sec_")))
+        reply.setField(fix.SecurityRequestResult(fix.SecurityRequestResult_VALID_REQUEST))
+        reply.setField(fix.NoRelatedSym(len(self.books)))
+        for (exchange, symbol), book in self.books.items():
+            group = fix44.SecurityList.NoRelatedSym()
+            group.setField(fix.Symbol(symbol))
+            group.setField(fix.SecurityExchange(exchange))
+            group.setField(fix.ContractMultiplier(1))
+            group.setField(fix.MinTradeVol(1))
+            group.setField(fix.MinPriceIncrement(book.tick_size))
+            reply.addGroup(group)
+        self.send(reply, session_id)
+
+    def on_order_mass_status_request(self, message: fix.Message, session_id: fix.SessionID):
+        req_id = get_field(message, fix.MassStatusReqID().getField(), "")
+        exchange = get_field(message, fix.SecurityExchange().getField())
+        symbol = get_field(message, fix.Symbol().getField())
+        orders = [
+            order for order in self.orders.values()
+            if symbol is None or order.key() == (exchange, symbol)
+        ]
+        if not orders:
+            reply = self.exec_report(None, fix.ExecType_ORDER_STATUS, exchange=exchange, symbol=symbol)
+            reply.setField(fix.OrdStatus(fix.OrdStatus_REJECTED))
+            reply.setField(fix.MassStatusReqID(req_id))
+            reply.setField(fix.Text(NO_ORDERS))
+            self.send(reply, session_id)
+        for i, order in enumerate(orders):
+            reply = self.exec_report(order, fix.ExecType_ORDER_STATUS)
+            reply.setField(fix.MassStatusReqID(req_id))
+            reply.setField(fix.TotNumReports(len(orders)))
+            reply.setField(fix.LastRptRequested(i == len(orders) - 1))
+            self.send(reply, session_id)
+
+    def on_request_for_positions(self, message: fix.Message, session_id: fix.SessionID):
+        req_id = get_field(message, fix.PosReqID().getField(), "")
+        exchange = get_field(message, fix.SecurityExchange().getField())
+        symbol = get_field(message, fix.Symbol().getField())
+        tickers = [
+            ticker for ticker in self.positions
+            if (exchange is None or ticker[0] == exchange) and (symbol is None or ticker[1] == symbol)
+        ]
+        ack = new_message(fix.MsgType_RequestForPositionsAck)
+        ack.setField(fix.PosMaintRptID(self.next_id("pos_ack_")))
+        ack.setField(fix.PosReqID(req_id))
+        ack.setField(fix.TotalNumPosReports(len(tickers)))
+        ack.setField(fix.PosReqResult(fix.PosReqResult_VALID_REQUEST))
+        ack.setField(fix.PosReqStatus(fix.PosReqStatus_COMPLETED))
+        ack.setField(fix.Account(self.account))
+        ack.setField(fix.AccountType(fix.AccountType_CARRIED_CUSTOMER_SIDE))
+        self.send(ack, session_id)
+        for ticker in tickers:
+            position = self.positions[ticker]
+            report = new_message(fix.MsgType_PositionReport)
+            report.setField(fix.PosMaintRptID(self.next_id("pos_")))
+            report.setField(fix.PosReqID(req_id))
+            report.setField(fix.PosReqType(fix.PosReqType_POSITIONS))
+            report.setField(fix.TotalNumPosReports(len(tickers)))
+            report.setField(fix.PosReqResult(fix.PosReqResult_VALID_REQUEST))
+            report.setField(fix.Account(self.account))
+            report.setField(fix.AccountType(fix.AccountType_CARRIED_CUSTOMER_SIDE))
+            report.setField(fix.SecurityExchange(ticker[0]))
+            report.setField(fix.Symbol(ticker[1]))
+            report.setField(fix.SettlPrice(self.books[ticker].best_bid()))
+            report.setField(fix.ClearingBusinessDate(datetime.utcnow().strftime("%Y%m%d")))
+            report.setField(fix.NoPositions(1))
+            group = fix44.PositionReport.NoPositions()
+            group.setField(fix.PosType(fix.PosType_TOTAL_TRANSACTION_QTY))
+            group.setField(fix.LongQty(max(position, 0.0)))
+            group.setField(fix.ShortQty(max(-position, 0.0)))
+            report.addGroup(group)
+            self.send(report, session_id)
+
+    def on_trade_capture_report_request(self, message: fix.Message, session_id: fix.SessionID):
+        req_id = get_field(message, fix.TradeRequestID().getField(), "")
+        ack = new_message(fix.MsgType_TradeCaptureReportRequestAck)
+        ack.setField(fix.TradeRequestID(req_id))
+        ack.setField(fix.TradeRequestType(int(get_field(message, fix.TradeRequestType().getField(), "0"))))
+        ack.setField(fix.TradeRequestResult(fix.TradeRequestResult_SUCCESSFUL))
+        ack.setField(fix.TradeRequestStatus(fix.TradeRequestStatus_ACCEPTED))
+        self.send(ack, session_id)
+        for exchange, symbol, side, ord_id, account, exec_id, last_px, last_qty, tx_time in list(self.trades):
+            report = new_message(fix.MsgType_TradeCaptureReport)
+            report.setField(fix.TradeReportID(self.next_id("trade_")))
+            report.setField(fix.TradeRequestID(req_id))
+            report.setField(fix.TotNumTradeReports(len(self.trades)))
+            report.setField(fix.PreviouslyReported(True))
+            report.setField(fix.ExecID(exec_id))
+            report.setField(fix.ExecType(fix.ExecType_TRADE))
+            report.setField(fix.LastPx(last_px))
+            report.setField(fix.LastQty(last_qty))
+            transact_time = fix.TransactTime()
+            transact_time.setString(tx_time)
+            report.setField(transact_time)
+            report.setField(fix.TradeDate(tx_time[:8]))
+            report.setField(fix.Symbol(symbol))
+            report.setField(fix.SecurityExchange(exchange))
+            report.setField(fix.NoSides(1))
+            group = fix44.TradeCaptureReport.NoSides()
+            group.setField(fix.Side(side))
+            group.setField(fix.OrderID(ord_id))
+            group.setField(fix.Account(account))
+            report.addGroup(group)
+            self.send(report, session_id)
+
+    # market data
+
+    def on_market_data_request(self, message: fix.Message, session_id: fix.SessionID):
+        req_id = get_field(message, fix.MDReqID().getField(), "")
+        entry_types = set()
+        group = fix44.MarketDataRequest.NoMDEntryTypes()
+        for i in range(int(get_field(message, fix.NoMDEntryTypes().getField(), "0"))):
+            message.getGroup(i + 1, group)
+            entry_types.add(group.getField(fix.MDEntryType().getField()))
+        group = fix44.MarketDataRequest.NoRelatedSym()
+        for i in range(int(get_field(message, fix.NoRelatedSym().getField(), "0"))):
+            message.getGroup(i + 1, group)
+            ticker = (group.getField(fix.SecurityExchange().getField()), group.getField(fix.Symbol().getField()))
+            if ticker not in self.books:
+                reject = new_message(fix.MsgType_MarketDataRequestReject)
+                reject.setField(fix.MDReqID(req_id))
+                reject.setField(fix.MDReqRejReason(fix.MDReqRejReason_UNKNOWN_SYMBOL))
+                reject.setField(fix.Text(f"unknown symbol {ticker}"))
+                self.send(reject, session_id)
+                continue
+            if entry_types & {fix.MDEntryType_BID, fix.MDEntryType_OFFER}:
+                self.book_subscriptions[ticker][session_id] = req_id
+                self.send(self.snapshot(self.books[ticker], req_id), session_id)
+            if fix.MDEntryType_TRADE in entry_types:
+                self.trade_subscriptions[ticker][session_id] = req_id
+
+    def snapshot(self, book: SyntheticBook, req_id: str) -> fix.Message:
+        date, time_of_day = utc_timestamp().split("-")
+        entries = book.snapshot()
+        message = new_message(fix.MsgType_MarketDataSnapshotFullRefresh)
+        message.setField(fix.Symbol(book.symbol))
+        message.setField(fix.SecurityExchange(book.exchange))
+        message.setField(fix.MDReqID(req_id))
+        message.setField(fix.NoMDEntries(len(entries)))
+        for entry_type, price, size in entries:
+            group = fix44.MarketDataSnapshotFullRefresh.NoMDEntries()
+            group.setField(fix.MDEntryType(entry_type))
+            group.setField(fix.MDEntryPx(price))
+            group.setField(fix.MDEntrySize(size))
+            group.setField(fix.MDEntryDate(date))
+            group.setField(fix.MDEntryTime(time_of_day))
+            group.setField(fix.ExecutingTrader(book.exchange))
+            message.addGroup(group)
+        return message
+
+    def incremental(self, book: SyntheticBook, req_id: str, entries: List[Entry]) -> fix.Message:
+        date, time_of_day = utc_timestamp().split("-")
+        message = new_message(fix.MsgType_MarketDataIncrementalRefresh)
+        message.setField(fix.MDReqID(req_id))
+        message.setField(fix.NoMDEntries(len(entries)))
+        for action, entry_type, price, size in entries:
+            group = fix44.MarketDataIncrementalRefresh.NoMDEntries()
+            group.setField(fix.MDUpdateAction(action))
+            group.setField(fix.MDEntryType(entry_type))
+            group.setField(fix.Symbol(book.symbol))
+            group.setField(fix.SecurityExchange(book.exchange))
+            group.setField(fix.MDEntryPx(price))
+            group.setField(fix.MDEntrySize(size))
+            group.setField(fix.MDEntryDate(date))
+            group.setField(fix.MDEntryTime(time_of_day))
+            group.setField(fix.ExecutingTrader(book.exchange))
+            message.addGroup(group)
+        return message
+
+    def publish(self, ticker: Ticker) -> int:
+        """
+        Advances the book of ticker by entries_per_update steps and sends the updates to its subscribers.
+        """
+        with self.lock:
+            book = self.books[ticker]
+            book_entries = []
+            trade_entries = []
+            for _ in range(self.entries_per_update):
+                entries, trade = book.step()
+                book_entries.extend(entries)
+                if trade is not None:
+                    side, price, size = trade
+                    trade_entries.append((fix.MDUpdateAction_NEW, fix.MDEntryType_TRADE, price, size))
+                    self.fill_resting_orders(ticker, side, price)
+            for session_id, req_id in self.book_subscriptions[ticker].items():
+                self.send(self.incremental(book, req_id, book_entries), session_id)
+            if trade_entries:
+                for session_id, req_id in self.trade_subscriptions[ticker].items():
+                    self.send(self.incremental(book, req_id, trade_entries), session_id)
+            return len(book_entries) + len(trade_entries)
+
+    # orders
+
+    def exec_report(
+            self,
+            order: Optional[SimulatedOrder],
+            exec_type: str,
+            last_px: float = 0.0,
+            last_qty: float = 0.0,
+            exchange: str = None,
+            symbol: str = None,
+            orig_cl_ord_id: str = None,
+            text: str = None,
+    ) -> fix.Message:
+        report = new_message(fix.MsgType_ExecutionReport)
+        exec_id = self.next_id("exec_")
+        report.setField(fix.ExecID(exec_id))
+        report.setField(fix.ExecType(exec_type))
+        transact_time = fix.TransactTime()
+        transact_time.setString(utc_timestamp())
+        report.setField(transact_time)
+        if text is not None:
+            report.setField(fix.Text(text))
+        if order is None:
+            report.setField(fix.OrderID("NONE"))
+            report.setField(fix.Side(fix.Side_BUY))
+            report.setField(fix.LeavesQty(0))
+            report.setField(fix.CumQty(0))
+            report.setField(fix.AvgPx(0))
+            if exchange is not None:
+                report.setField(fix.SecurityExchange(exchange))
+            if symbol is not None:
+                report.setField(fix.Symbol(symbol))
+            return report
+        report.setField(fix.OrderID(order.ord_id))
+        report.setField(fix.ClOrdID(order.cl_ord_id))
+        if orig_cl_ord_id is not None:
+            report.setField(fix.OrigClOrdID(orig_cl_ord_id))
+        report.setField(fix.OrdStatus(order.ord_status))
+        report.setField(fix.Account(order.account))
+        report.setField(fix.SecurityExchange(order.exchange))
+        report.setField(fix.Symbol(order.symbol))
+        report.setField(fix.Side(order.side))
+        report.setField(fix.OrdType(order.ord_type))
+        if order.price is not None:
+            report.setField(fix.Price(order.price))
+        if order.tif is not None:
+            report.setField(fix.TimeInForce(order.tif))
+        report.setField(fix.OrderQty(order.order_qty))
+        report.setField(fix.LeavesQty(order.leaves_qty()))
+        report.setField(fix.CumQty(order.cum_qty))
+        report.setField(fix.AvgPx(order.avg_px))
+        report.setField(fix.LastPx(last_px))
+        report.setField(fix.LastQty(last_qty))
+        return report
+
+    def reject(self, message: fix.Message, session_id: fix.SessionID, text: str):
+        report = self.exec_report(
+            None,
+            fix.ExecType_REJECTED,
+            exchange=get_field(message, fix.SecurityExchange().getField()),
+            symbol=get_field(message, fix.Symbol().getField()),
+            text=text,
+        )
+        report.setField(fix.ClOrdID(get_field(message, fix.ClOrdID().getField(), "")))
+        report.setField(fix.OrdStatus(fix.OrdStatus_REJECTED))
+        self.send(report, session_id)
+
+    def cancel_reject(self, message: fix.Message, session_id: fix.SessionID, response_to: str, text: str):
+        reject = new_message(fix.MsgType_OrderCancelReject)
+        reject.setField(fix.OrderID(get_field(message, fix.OrderID().getField(), "NONE")))
+        reject.setField(fix.ClOrdID(get_field(message, fix.ClOrdID().getField(), "")))
+        reject.setField(fix.OrigClOrdID(get_field(message, fix.OrigClOrdID().getField(), "")))
+        reject.setField(fix.OrdStatus(fix.OrdStatus_REJECTED))
+        reject.setField(fix.CxlRejResponseTo(response_to))
+        reject.setField(fix.CxlRejReason(fix.CxlRejReason_UNKNOWN_ORDER))
+        reject.setField(fix.Text(text))
+        self.send(reject, session_id)
+
+    def on_new_order_single(self, message: fix.Message, session_id: fix.SessionID):
+        exchange = get_field(message, fix.SecurityExchange().getField())
+        symbol = get_field(message, fix.Symbol().getField())
+        if (exchange, symbol) not in self.books:
+            self.reject(message, session_id, f"unknown symbol {symbol}")
+            return
+        price = get_field(message, fix.Price().getField())
+        order = SimulatedOrder(
+            self.next_id("ord_"),
+            get_field(message, fix.ClOrdID().getField()),
+            get_field(message, fix.Account().getField(), self.account),
+            exchange,
+            symbol,
+            get_field(message, fix.Side().getField()),
+            get_field(message, fix.OrdType().getField(), fix.OrdType_LIMIT),
+            float(price) if price is not None else None,
+            float(get_field(message, fix.OrderQty().getField())),
+            get_field(message, fix.TimeInForce().getField()),
+        )
+        self.open(order)
+        # acknowledged in two steps as by the gateway, the order tracker opens the order on pending new
+        self.send(self.exec_report(order, fix.ExecType_PENDING_NEW), session_id)
+        order.ord_status = fix.OrdStatus_NEW
+        self.send(self.exec_report(order, fix.ExecType_NEW), session_id)
+        self.fill_if_crossing(order, session_id)
+
+    def open(self, order: SimulatedOrder):
+        self.orders[order.ord_id] = order
+        self.orders_by_cl_ord_id[order.cl_ord_id] = order
+        self.orders_by_ticker[order.key()][order.ord_id] = order
+
+    def close(self, order: SimulatedOrder):
+        """
+        Removes a cancelled or filled order from the open orders.
+        """
+        if self.orders.pop(order.ord_id, None) is None:
+            return
+        for cl_ord_id in order.cl_ord_ids:
+            self.orders_by_cl_ord_id.pop(cl_ord_id, None)
+        del self.orders_by_ticker[order.key()][order.ord_id]
+        self.num_closed += 1
+
+    def set_cl_ord_id(self, order: SimulatedOrder, cl_ord_id: str):
+        order.cl_ord_id = cl_ord_id
+        order.cl_ord_ids.append(cl_ord_id)
+        self.orders_by_cl_ord_id[cl_ord_id] = order
+
+    def find_order(self, message: fix.Message) -> Optional[SimulatedOrder]:
+        ord_id = get_field(message, fix.OrderID().getField())
+        if ord_id is not None and ord_id in self.orders:
+            return self.orders[ord_id]
+        return self.orders_by_cl_ord_id.get(get_field(message, fix.OrigClOrdID().getField()), None)
+
+    def on_order_cancel_request(self, message: fix.Message, session_id: fix.SessionID):
+        order = self.find_order(message)
+        if order is None or not order.is_open():
+            self.cancel_reject(message, session_id, fix.CxlRejResponseTo_ORDER_CANCEL_REQUEST, ORDER_NOT_FOUND)
+            return
+        orig_cl_ord_id = order.cl_ord_id
+        self.set_cl_ord_id(order, get_field(message, fix.ClOrdID().getField(), orig_cl_ord_id))
+        order.ord_status = fix.OrdStatus_CANCELED
+        self.close(order)
+        self.send(self.exec_report(order, fix.ExecType_CANCELED, orig_cl_ord_id=orig_cl_ord_id), session_id)
+
+    def on_order_cancel_replace_request(self, message: fix.Message, session_id: fix.SessionID):
+        order = self.find_order(message)
+        if order is None or not order.is_open():
+            self.cancel_reject(
+                message, session_id, fix.CxlRejResponseTo_ORDER_CANCEL_REPLACE_REQUEST, ORDER_NOT_FOUND
+            )
+            return
+        orig_cl_ord_id = order.cl_ord_id
+        self.set_cl_ord_id(order, get_field(message, fix.ClOrdID().getField(), orig_cl_ord_id))
+        price = get_field(message, fix.Price().getField())
+        if price is not None:
+            order.price = float(price)
+        order_qty = get_field(message, fix.OrderQty().getField())
+        if order_qty is not None:
+            order.order_qty = float(order_qty)
+        self.send(self.exec_report(order, fix.ExecType_REPLACED, orig_cl_ord_id=orig_cl_ord_id), session_id)
+        self.fill_if_crossing(order, session_id)
+
+    def on_order_mass_cancel_request(self, message: fix.Message, session_id: fix.SessionID):
+        exchange = get_field(message, fix.SecurityExchange().getField())
+        symbol = get_field(message, fix.Symbol().getField())
+        side = get_field(message, fix.Side().getField())
+        request_type = get_field(
+            message, fix.MassCancelRequestType().getField(), fix.MassCancelRequestType_CANCEL_ALL_ORDERS
+        )
+        canceled = 0
+        for order in list(self.orders.values()):
+            if request_type == fix.MassCancelRequestType_CANCEL_ORDERS_FOR_A_SECURITY and \
+                    order.key() != (exchange, symbol):
+                continue
+            if side is not None and order.side != side:
+                continue
+            order.ord_status = fix.OrdStatus_CANCELED
+            self.close(order)
+            self.send(self.exec_report(order, fix.ExecType_CANCELED), session_id)
+            canceled += 1
+        report = new_message(fix.MsgType_OrderMassCancelReport)
+        report.setField(fix.ClOrdID(get_field(message, fix.ClOrdID().getField(), "")))
+        report.setField(fix.OrderID(self.next_id("mass_cancel_")))
+        report.setField(fix.MassCancelRequestType(request_type))
+        report.setField(fix.MassCancelResponse(
+            fix.MassCancelResponse_CANCEL_ORDERS_FOR_A_SECURITY
+            if request_type == fix.MassCancelRequestType_CANCEL_ORDERS_FOR_A_SECURITY
+            else fix.MassCancelResponse_CANCEL_ALL_ORDERS
+        ))
+        report.setField(fix.TotalAffectedOrders(canceled))
+        if exchange is not None:
+            report.setField(fix.SecurityExchange(exchange))
+        if symbol is not None:
+            report.setField(fix.Symbol(symbol))
+        self.send(report, session_id)
+
+    def fill(self, order: SimulatedOrder, price: float, qty: float, session_id: Optional[fix.SessionID]):
+        order.avg_px = (order.avg_px * order.cum_qty + price * qty) / (order.cum_qty + qty)
+        order.cum_qty += qty
+        order.ord_status = fix.OrdStatus_FILLED if order.leaves_qty() <= 0 else fix.OrdStatus_PARTIALLY_FILLED
+        self.positions[order.key()] += qty if order.side == fix.Side_BUY else -qty
+        if not order.is_open():
+            self.close(order)
+        report = self.exec_report(order, fix.ExecType_TRADE, last_px=price, last_qty=qty)
+        self.trades.append((
+            order.exchange, order.symbol, order.side, order.ord_id, order.account,
+            report.getField(fix.ExecID().getField()), price, qty, utc_timestamp(),
+        ))
+        for target in [session_id] if session_id is not None else list(self.sessions):
+            self.send(report, target)
+
+    def fill_if_crossing(self, order: SimulatedOrder, session_id: fix.SessionID):
+        book = self.books[order.key()]
+        if order.side == fix.Side_BUY:
+            touch = book.best_ask()
+            crossing = order.price is None or order.price >= touch
+        else:
+            touch = book.best_bid()
+            crossing = order.price is None or order.price <= touch
+        if crossing:
+            self.fill(order, touch, order.leaves_qty(), session_id)
+
+    def fill_resting_orders(self, ticker: Ticker, aggressor_side: str, price: float):
+        for order in list(self.orders_by_ticker[ticker].values()):
+            if order.side == aggressor_side:
+                continue
+            if (order.side == fix.Side_SELL and order.price <= price) or \
+                    (order.side == fix.Side_BUY and order.price >= price):
+                self.fill(order, order.price, order.leaves_qty(), None)
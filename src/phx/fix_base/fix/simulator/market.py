@@ -0,0 +1,115 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+import quickfix as fix
+
+from phx.fix_base.fix.model.order_book import price_decimals
+
+# incremental entries as (update action, entry type, price, size)
+Entry = Tuple[str, str, float, float]
+
+
+class SyntheticBook(object):
+    """
+    Synthetic order book on a tick grid with num_levels levels per side
+    around a random walk mid price. Every step either changes the size of a
+    random level or moves the market by one tick, which prints a trade at
+    the level taken out.
+    """
+
+    def __init__(
+            self,
+            exchange: str,
+            symbol: str,
+            mid_price: float = 25000.0,
+            tick_size: float = 0.5,
+            num_levels: int = 20,
+            level_size: float = 10.0,
+            move_probability: float = 0.1,
+            seed: Optional[int] = None,
+    ):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.decimals = price_decimals(tick_size)
+        self.num_levels = num_levels
+        self.level_size = level_size
+        self.move_probability = move_probability
+        self.rng = random.Random(seed)
+        self.best_bid_tick = int(round(mid_price / tick_size))
+        self.bids: Dict[int, float] = {}
+        self.asks: Dict[int, float] = {}
+        for i in range(num_levels):
+            self.bids[self.best_bid_tick - i] = self.random_size()
+            self.asks[self.best_bid_tick + 1 + i] = self.random_size()
+
+    def random_size(self) -> float:
+        return float(self.rng.randint(1, 2 * int(self.level_size)))
+
+    def price(self, tick: int) -> float:
+        return round(tick * self.tick_size, self.decimals)
+
+    def best_bid(self) -> float:
+        return self.price(self.best_bid_tick)
+
+    def best_ask(self) -> float:
+        return self.price(self.best_bid_tick + 1)
+
+    def snapshot(self) -> List[Tuple[str, float, float]]:
+        return (
+            [(fix.MDEntryType_BID, self.price(tick), size) for tick, size in sorted(self.bids.items(), reverse=True)]
+            + [(fix.MDEntryType_OFFER, self.price(tick), size) for tick, size in sorted(self.asks.items())]
+        )
+
+    def step(self) -> Tuple[List[Entry], Optional[Tuple[str, float, float]]]:
+        """
+        Advances the book by one event, returns the incremental entries and the trade if the market moved.
+        """
+        if self.rng.random() >= self.move_probability:
+            is_bid = self.rng.random() < 0.5
+            levels = self.bids if is_bid else self.asks
+            tick = self.rng.choice(list(levels.keys()))
+            levels[tick] = self.random_size()
+            entry_type = fix.MDEntryType_BID if is_bid else fix.MDEntryType_OFFER
+            return [(fix.MDUpdateAction_CHANGE, entry_type, self.price(tick), levels[tick])], None
+        return self.move(self.rng.random() < 0.5)
+
+    def move(self, up: bool) -> Tuple[List[Entry], Tuple[str, float, float]]:
+        b, n = self.best_bid_tick, self.num_levels
+        if up:
+            # best ask is taken out and becomes the new best bid
+            taken = self.asks.pop(b + 1)
+            trade = (fix.Side_BUY, self.price(b + 1), taken)
+            self.asks[b + 1 + n] = self.random_size()
+            self.bids.pop(b - n + 1)
+            self.bids[b + 1] = self.random_size()
+            entries = [
+                (fix.MDUpdateAction_DELETE, fix.MDEntryType_OFFER, self.price(b + 1), 0.0),
+                (fix.MDUpdateAction_NEW, fix.MDEntryType_OFFER, self.price(b + 1 + n), self.asks[b + 1 + n]),
+                (fix.MDUpdateAction_DELETE, fix.MDEntryType_BID, self.price(b - n + 1), 0.0),
+                (fix.MDUpdateAction_NEW, fix.MDEntryType_BID, self.price(b + 1), self.bids[b + 1]),
+            ]
+            self.best_bid_tick = b + 1
+        else:
+            # best bid is taken out and becomes the new best ask
+            taken = self.bids.pop(b)
+            trade = (fix.Side_SELL, self.price(b), taken)
+            self.bids[b - n] = self.random_size()
+            self.asks.pop(b + n)
+            self.asks[b] = self.random_size()
+            entries = [
+                (fix.MDUpdateAction_DELETE, fix.MDEntryType_BID, self.price(b), 0.0),
+                (fix.MDUpdateAction_NEW, fix.MDEntryType_BID, self.price(b - n), self.bids[b - n]),
+                (fix.MDUpdateAction_DELETE, fix.MDEntryType_OFFER, self.price(b + n), 0.0),
+                (fix.MDUpdateAction_NEW, fix.MDEntryType_OFFER, self.price(b), self.asks[b]),
+            ]
+            self.best_bid_tick = b - 1
+        return entries, trade
+
+    def __str__(self):
+        return (f"SyntheticBook["
+                f"exchange={self.exchange}, "
+                f"symbol={self.symbol}, "
+                f"best_bid={self.best_bid()}, "
+                f"best_ask={self.best_ask()}"
+                f"]")
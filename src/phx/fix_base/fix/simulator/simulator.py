@@ -0,0 +1,145 @@
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import quickfix as fix
+
+from phx.fix_base.fix.simulator.app import SimulatorApp
+from phx.fix_base.fix.simulator.market import SyntheticBook
+from phx.fix_base.fix.utils import dict_to_fix_dict, fix_session_default_config
+
+DEFAULT_DATA_DICTIONARY = str(Path(__file__).resolve().parents[1] / "specs" / "FIX44.xml")
+
+
+class ExchangeSimulator(object):
+    """
+    In-process FIX acceptor simulating the Phoenix Prime gateway for load
+    and integration tests. Runs a QuickFIX SocketAcceptor for the session
+    sender_comp_id -> target_comp_id, i.e. the reverse of the initiator
+    session created by FixSessionConfig, and a market data thread that
+    advances the synthetic books and streams incremental refreshes to the
+    subscribers at updates_per_second per symbol.
+
+        simulator = ExchangeSimulator("deribit", ["BTC-PERPETUAL"], {"trader": "secret"}, logger)
+        simulator.start()
+        ...
+        simulator.stop()
+    """
+
+    def __init__(
+            self,
+            exchange: str,
+            symbols: List[str],
+            users: Dict[str, str],
+            logger: logging.Logger,
+            port: int = 1238,
+            sender_comp_id: str = "phoenix-prime",
+            target_comp_id: str = "test",
+            begin_string: str = "FIX.4.4",
+            updates_per_second: float = 10.0,
+            entries_per_update: int = 1,
+            num_levels: int = 20,
+            mid_price: float = 25000.0,
+            tick_size: float = 0.5,
+            move_probability: float = 0.1,
+            seed: Optional[int] = None,
+            data_dictionary: Optional[str] = None,
+            data_dir: Optional[str] = None,
+    ):
+        self.logger = logger
+        self.updates_per_second = updates_per_second
+        self.data_dir = Path(data_dir if data_dir is not None else tempfile.mkdtemp(prefix="phx_simulator_"))
+        books = {
+            (exchange, symbol): SyntheticBook(
+                exchange,
+                symbol,
+                mid_price=mid_price,
+                tick_size=tick_size,
+                num_levels=num_levels,
+                move_probability=move_probability,
+                seed=seed + i if seed is not None else None,
+            )
+            for i, symbol in enumerate(symbols)
+        }
+        self.app = SimulatorApp(books, users, logger, entries_per_update=entries_per_update)
+        self.session_id = fix.SessionID(begin_string, sender_comp_id, target_comp_id)
+        self.session_settings = self.create_session_settings(port, data_dictionary or DEFAULT_DATA_DICTIONARY)
+        self.store_factory = fix.FileStoreFactory(self.session_settings)
+        self.log_factory = fix.FileLogFactory(self.session_settings)
+        self.acceptor = None
+        self.to_stop = False
+        self.md_thread: Optional[threading.Thread] = None
+        self.num_updates = 0
+
+    def create_session_settings(self, port: int, data_dictionary: str) -> fix.SessionSettings:
+        default_config = fix_session_default_config(str(self.data_dir / "logs"))
+        default_config.update({
+            "ConnectionType": "acceptor",
+            "SocketAcceptPort": port,
+            "SocketNodelay": "Y",
+            "ValidateFieldsOutOfOrder": "N",
+            "ValidateFieldsHaveValues": "N",
+        })
+        settings = fix.SessionSettings()
+        settings.set(dict_to_fix_dict(default_config))
+        settings.set(
+            self.session_id,
+            dict_to_fix_dict({
+                "BeginString": self.session_id.getBeginString().getValue(),
+                "SenderCompID": self.session_id.getSenderCompID().getValue(),
+                "TargetCompID": self.session_id.getTargetCompID().getValue(),
+                "DataDictionary": data_dictionary,
+                "FileStorePath": str(self.data_dir / "sessions"),
+            })
+        )
+        return settings
+
+    def start(self):
+        self.to_stop = False
+        self.acceptor = fix.SocketAcceptor(self.app, self.store_factory, self.session_settings, self.log_factory)
+        self.acceptor.start()
+        if self.updates_per_second > 0:
+            self.md_thread = threading.Thread(target=self.stream_market_data, name="SimulatorMarketData", daemon=True)
+            self.md_thread.start()
+        self.logger.info(f"ExchangeSimulator.start: accepting session {self.session_id}")
+
+    def stop(self):
+        self.to_stop = True
+        if self.md_thread is not None:
+            self.md_thread.join()
+            self.md_thread = None
+        if self.acceptor is not None:
+            self.acceptor.stop()
+            self.acceptor = None
+        self.logger.info(f"ExchangeSimulator.stop: {self}")
+
+    def stream_market_data(self):
+        fn = "stream_market_data"
+        tickers = list(self.app.books.keys())
+        interval = 1.0 / self.updates_per_second
+        next_time = time.perf_counter()
+        try:
+            while not self.to_stop:
+                for ticker in tickers:
+                    self.num_updates += self.app.publish(ticker)
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # behind schedule, do not try to catch up with a burst
+                    next_time = time.perf_counter()
+        except Exception as e:
+            self.logger.exception(f"{fn}: exception {e}")
+
+    def __str__(self):
+        return (f"ExchangeSimulator["
+                f"session_id={self.session_id}, "
+                f"updates_per_second={self.updates_per_second}, "
+                f"num_updates={self.num_updates}, "
+                f"num_received={self.app.num_received}, "
+                f"num_sent={self.app.num_sent}"
+                f"]")
@@ -1,2 +1,5 @@
+from .order_index import OrderIndex
 from .order_tracker import OrderTracker
 from .position_tracker import PositionTracker
+from .report_store import ReportStore
+from .latency_tracker import OrderLatencyTracker
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import quickfix as fix
+
+from phx.fix_base.fix.model.exec_report import ExecReport
+from phx.fix_base.utils.prometheus import Metrics
+
+# latency kinds
+ACK = "ack"
+FILL = "fill"
+CANCEL = "cancel"
+REPLACE = "replace"
+
+# order requests sent by App
+NEW = "new"
+
+# execution types acknowledging a cancel or cancel replace request
+ACK_EXEC_TYPES = {
+    CANCEL: fix.ExecType_CANCELED,
+    REPLACE: fix.ExecType_REPLACED,
+}
+
+# execution types of a fill
+FILL_EXEC_TYPES = {fix.ExecType_TRADE, fix.ExecType_FILL, fix.ExecType_PARTIAL_FILL}
+
+# order states after which no fill can follow
+DONE_ORD_STATUS = {
+    fix.OrdStatus_CANCELED, fix.OrdStatus_REJECTED, fix.OrdStatus_FILLED,
+    fix.OrdStatus_DONE_FOR_DAY, fix.OrdStatus_EXPIRED,
+}
+
+Key = Tuple[str, str, str]  # kind, exchange, symbol
+
+
+class OrderLatencyTracker(object):
+    """
+    Latency of order requests keyed by cl_ord_id, from the monotonic time the
+    request was sent until the execution report answering it is received
+
+        - ack: new order sent until the first execution report which is not a reject
+        - fill: new order sent until its first fill
+        - cancel: cancel request sent until CANCELED
+        - replace: cancel replace request sent until REPLACED
+
+    Requests answered by a reject or an order cancel reject are dropped, as are
+    the requests of an order once it is done. Requests still unanswered after
+    max_age seconds, orders without a fill after max_fill_age seconds and the
+    oldest entries beyond max_pending are dropped as well, so that lost answers
+    do not accumulate. The latest max_samples latencies are kept per kind,
+    exchange and symbol for percentiles and all of them are observed in the
+    order latency histogram.
+    """
+
+    def __init__(
+            self,
+            metrics: Optional[Metrics] = None,
+            max_samples: int = 10000,
+            max_pending: int = 10000,
+            max_age: float = 60.0,
+            max_fill_age: float = 3600.0,
+    ):
+        self.metrics = metrics
+        self.max_samples = max_samples
+        self.max_pending = max_pending
+        self.max_age_ns = int(max_age * 1e9)
+        self.max_fill_age_ns = int(max_fill_age * 1e9)
+        self.lock = threading.Lock()
+
+        # requests sent and not yet answered in sent order, cl_ord_id -> (request, exchange, symbol, sent_ns, ord_id)
+        self.pending: Dict[str, Tuple[str, str, str, int, Optional[str]]] = {}
+
+        # cancel and replace requests pending per order, ord_id -> cl_ord_ids
+        self.pending_of_order: Dict[str, List[str]] = {}
+
+        # acknowledged new orders waiting for the first fill, ord_id -> (exchange, symbol, sent_ns)
+        self.awaiting_fill: Dict[str, Tuple[str, str, int]] = {}
+        self.num_expired = 0
+
+        self.samples: Dict[Key, Deque[int]] = {}
+        self.histograms: Dict[Key, object] = {}
+
+    def sent(self, request: str, cl_ord_id: str, exchange: str, symbol: str, ord_id: Optional[str] = None):
+        """
+        Request sent with cl_ord_id, ord_id is the order a cancel or replace request refers to.
+        """
+        sent_ns = time.monotonic_ns()
+        with self.lock:
+            self.expire(sent_ns)
+            self.pending[cl_ord_id] = (request, exchange, symbol, sent_ns, ord_id)
+            if ord_id is not None:
+                self.pending_of_order.setdefault(ord_id, []).append(cl_ord_id)
+            while len(self.pending) > self.max_pending:
+                self.pop_pending(next(iter(self.pending)))
+                self.num_expired += 1
+
+    def rejected(self, cl_ord_id: str):
+        with self.lock:
+            self.pop_pending(cl_ord_id)
+
+    def pop_pending(self, cl_ord_id: str):
+        pending = self.pending.pop(cl_ord_id, None)
+        if pending is not None and pending[4] is not None:
+            cl_ord_ids = self.pending_of_order.get(pending[4], None)
+            if cl_ord_ids is not None:
+                cl_ord_ids.remove(cl_ord_id)
+                if not cl_ord_ids:
+                    del self.pending_of_order[pending[4]]
+        return pending
+
+    def expire(self, now_ns: int):
+        """
+        Drops the requests and orders awaiting a fill older than their maximum age, oldest first.
+        """
+        while self.pending:
+            cl_ord_id, pending = next(iter(self.pending.items()))
+            if now_ns - pending[3] <= self.max_age_ns:
+                break
+            self.pop_pending(cl_ord_id)
+            self.num_expired += 1
+        while self.awaiting_fill:
+            ord_id, awaiting = next(iter(self.awaiting_fill.items()))
+            if now_ns - awaiting[2] <= self.max_fill_age_ns and len(self.awaiting_fill) <= self.max_pending:
+                break
+            del self.awaiting_fill[ord_id]
+            self.num_expired += 1
+
+    def on_exec_report(self, report: ExecReport):
+        received_ns = time.monotonic_ns()
+        with self.lock:
+            pending = self.pending.get(report.cl_ord_id, None)
+            if pending is not None and report.exec_type != fix.ExecType_ORDER_STATUS:
+                request, exchange, symbol, sent_ns, _ = pending
+                if report.exec_type == fix.ExecType_REJECTED:
+                    self.pop_pending(report.cl_ord_id)
+                elif request == NEW:
+                    self.pop_pending(report.cl_ord_id)
+                    self.record(ACK, exchange, symbol, received_ns - sent_ns)
+                    if report.ord_id is not None:
+                        self.awaiting_fill[report.ord_id] = (exchange, symbol, sent_ns)
+                elif report.exec_type == ACK_EXEC_TYPES[request]:
+                    self.pop_pending(report.cl_ord_id)
+                    self.record(request, exchange, symbol, received_ns - sent_ns)
+            awaiting = self.awaiting_fill.get(report.ord_id, None)
+            if awaiting is not None:
+                if report.exec_type in FILL_EXEC_TYPES:
+                    exchange, symbol, sent_ns = self.awaiting_fill.pop(report.ord_id)
+                    self.record(FILL, exchange, symbol, received_ns - sent_ns)
+                elif report.ord_status in DONE_ORD_STATUS:
+                    del self.awaiting_fill[report.ord_id]
+            if report.ord_status in DONE_ORD_STATUS and report.ord_id in self.pending_of_order:
+                # cancel or replace requests of an order done otherwise, e.g. filled, are not answered anymore
+                for cl_ord_id in list(self.pending_of_order[report.ord_id]):
+                    self.pop_pending(cl_ord_id)
+            self.expire(received_ns)
+
+    def record(self, kind: str, exchange: str, symbol: str, latency_ns: int):
+        key = (kind, exchange, symbol)
+        samples = self.samples.get(key, None)
+        if samples is None:
+            samples = self.samples[key] = deque(maxlen=self.max_samples)
+            if self.metrics is not None:
+                self.histograms[key] = self.metrics.order_latency.labels(kind, exchange, symbol)
+        samples.append(latency_ns)
+        if self.metrics is not None:
+            self.histograms[key].observe(latency_ns * 1e-9)
+
+    def to_frame(self, quantiles=(0.5, 0.9, 0.99)) -> pd.DataFrame:
+        """
+        Count, mean, quantiles and max of the kept samples in microseconds per kind, exchange and symbol.
+        """
+        with self.lock:
+            samples = {key: np.array(values, dtype=np.float64) * 1e-3 for key, values in self.samples.items()}
+        rows = []
+        for (kind, exchange, symbol), values in samples.items():
+            row = {
+                "kind": kind,
+                "exchange": exchange,
+                "symbol": symbol,
+                "count": len(values),
+                "mean_us": values.mean(),
+            }
+            for q in quantiles:
+                row[f"p{q * 100:g}_us"] = np.quantile(values, q)
+            row["max_us"] = values.max()
+            rows.append(row)
+        return pd.DataFrame(rows).set_index(["kind", "exchange", "symbol"]) if rows else pd.DataFrame()
+
+    def __str__(self):
+        return (f"OrderLatencyTracker["
+                f"pending={len(self.pending)}, "
+                f"awaiting_fill={len(self.awaiting_fill)}, "
+                f"expired={self.num_expired}, "
+                f"samples={sum(len(values) for values in self.samples.values())}"
+                f"]")
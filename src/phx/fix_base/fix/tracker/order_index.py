@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import quickfix as fix
+from sortedcontainers import SortedList
+
+from phx.fix_base.fix.model.order import Order
+
+Ticker = Tuple[str, str]  # exchange, symbol
+
+# (sort price, ord_id), the price is negated for buy orders so that the best price comes first on both sides
+Entry = Tuple[float, str]
+
+
+def sort_price(side, price) -> float:
+    if price is None:
+        return float("inf")  # market orders after all limit orders
+    return -price if side == fix.Side_BUY else price
+
+
+class OrderIndex(object):
+    """
+    Secondary indexes of open orders
+
+        - per ticker and side, ord_ids sorted by price from the best price
+        - cl_ord_id to ord_id, for all cl_ord_ids an order had across replaces
+
+    The index holds ord_ids only, the orders are looked up in the open orders
+    of the tracker which keeps the index in sync on each transition.
+    """
+
+    def __init__(self, orders: Optional[Iterable[Order]] = None):
+        self.by_ticker: Dict[Ticker, Dict[str, SortedList]] = {}
+        self.entries: Dict[str, Tuple[Ticker, str, Entry]] = {}  # ord_id -> ticker, side, entry
+        self.cl_ord_ids: Dict[str, List[str]] = {}  # ord_id -> cl_ord_ids mapped to it
+        self.ord_ids: Dict[str, str] = {}  # cl_ord_id -> ord_id
+        for order in orders or []:
+            self.add(order)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return f"OrderIndex[orders={len(self.entries)}, tickers={len(self.by_ticker)}]"
+
+    def add(self, order: Order):
+        """
+        Add an open order or update its position after a change of price or cl_ord_id.
+        """
+        ord_id = order.ord_id
+        ticker = (order.exchange, order.symbol)
+        entry = (sort_price(order.side, order.price), ord_id)
+        current = self.entries.get(ord_id, None)
+        if current != (ticker, order.side, entry):
+            if current is not None:
+                self.remove_entry(current)
+            sides = self.by_ticker.get(ticker, None)
+            if sides is None:
+                sides = self.by_ticker[ticker] = {}
+            entries = sides.get(order.side, None)
+            if entries is None:
+                entries = sides[order.side] = SortedList()
+            entries.add(entry)
+            self.entries[ord_id] = (ticker, order.side, entry)
+
+        if self.ord_ids.get(order.cl_ord_id, None) != ord_id:
+            cl_ord_ids = self.cl_ord_ids.setdefault(ord_id, [])
+            for cl_ord_id in order.cl_ord_ids + [order.cl_ord_id]:
+                if self.ord_ids.get(cl_ord_id, None) != ord_id:
+                    self.ord_ids[cl_ord_id] = ord_id
+                    cl_ord_ids.append(cl_ord_id)
+
+    def remove(self, ord_id: str):
+        current = self.entries.pop(ord_id, None)
+        if current is not None:
+            self.remove_entry(current)
+        for cl_ord_id in self.cl_ord_ids.pop(ord_id, []):
+            if self.ord_ids.get(cl_ord_id, None) == ord_id:
+                del self.ord_ids[cl_ord_id]
+
+    def remove_entry(self, current: Tuple[Ticker, str, Entry]):
+        ticker, side, entry = current
+        sides = self.by_ticker[ticker]
+        entries = sides[side]
+        entries.remove(entry)
+        if not entries:
+            del sides[side]
+            if not sides:
+                del self.by_ticker[ticker]
+
+    def ord_ids_for(self, ticker: Ticker, side: Optional[str] = None) -> List[str]:
+        """
+        ord_ids of the open orders of ticker on side or on all sides, from the best price.
+        """
+        sides = self.by_ticker.get(ticker, None)
+        if sides is None:
+            return []
+        if side is not None:
+            entries = sides.get(side, None)
+            return [ord_id for _, ord_id in entries] if entries is not None else []
+        return [ord_id for entries in sides.values() for _, ord_id in entries]
+
+    def best_price(self, ticker: Ticker, side: str) -> Optional[float]:
+        sides = self.by_ticker.get(ticker, None)
+        entries = sides.get(side, None) if sides is not None else None
+        if not entries:
+            return None
+        price = entries[0][0]
+        if price == float("inf"):
+            return None
+        return -price if side == fix.Side_BUY else price
@@ -1,13 +1,23 @@
 import abc
+import os
+import threading
+import pandas as pd
 import quickfix as fix
-import copy
-from typing import Optional, Tuple, Dict, List, Union
+from typing import Callable, Optional, Tuple, Dict, List, Mapping, NamedTuple, Sequence, Union
 from more_itertools import partition
 
 from phx.fix_base.fix.model.exec_report import ExecReport
 from phx.fix_base.fix.model.order import Order
-from phx.fix_base.fix.utils import order_status_to_string
-from phx.fix_base.utils import dict_diff
+from phx.fix_base.fix.tracker.order_index import OrderIndex, Ticker
+from phx.fix_base.fix.tracker.report_store import EXEC_REPORT_COLUMNS, FILL_COLUMNS, ReportStore
+from phx.fix_base.fix.utils import exec_type_dict, exec_type_to_string, order_status_dict, order_status_to_string
+from phx.fix_base.utils import dict_diff, make_dirs_for_file
+from phx.fix_base.utils.columnar import write_parquet
+from phx.fix_base.utils.snapshot import CowDict, SequenceView
+
+
+def order_dict(orders: Optional[Dict[str, Order]] = None) -> CowDict:
+    return CowDict(orders, Order.copy)
 
 
 class OrderTrackerBase(object):
@@ -16,21 +26,32 @@ class OrderTrackerBase(object):
         self.name = name
         self.logger = logger
 
+        # guards updates against snapshots taken from other threads
+        self.lock = threading.RLock()
+
+        # order dicts are copied on write so that get_orders returns snapshots without copying
         # pending new orders by cl_ord_id assigned when submitting a new order
         # can be used by client app to monitor execution timeout
-        self.pending_orders: Dict[str, Order] = {}
-        self.rejected_pending_orders: Dict[str, Order] = {}  # rejected order new
+        self.pending_orders: CowDict = order_dict()
+        self.rejected_pending_orders: CowDict = order_dict()  # rejected order new
 
         # open working order by ord_id
-        self.open_orders: Dict[str, Order] = {}
-        self.rejected_open_orders: Dict[str, Order] = {}  # rejected order modifications
+        self.open_orders: CowDict = order_dict()
+        self.rejected_open_orders: CowDict = order_dict()  # rejected order modifications
 
         # historical orders for canceled, filled, done orders by ord_id
-        self.history_orders: Dict[str, Order] = {}
+        self.history_orders: CowDict = order_dict()
+
+        # open orders by ticker and side sorted by price and ord_id by cl_ord_id, kept in sync with open_orders
+        self.index = OrderIndex()
 
-        # execution reports
+        # execution reports, only appended to so that a prefix of it is a snapshot
         self.exec_reports: List[ExecReport] = []
 
+        # columnar history of all processed execution reports and of the fills for reconciliation
+        self.report_store = ReportStore(EXEC_REPORT_COLUMNS)
+        self.fill_store = ReportStore(FILL_COLUMNS)
+
         self.order_snapshots_obtained = False
         self.last_update_time = None
         self.snapshots_obtained = False
@@ -39,24 +60,77 @@ class OrderTrackerBase(object):
     def process(self, report: ExecReport, sending_time) -> Tuple[Optional[Order], Optional[str]]:
         pass
 
-    def purge_history(self):
+    def purge_history(self, purge_unsaved=False):
+        """
+        Drops the execution reports and historical orders. Rows of the report and fill stores
+        are only dropped once written by save_stores, unless purge_unsaved is set.
+        """
         # keep other dicts such as pending_orders, open_orders, rejected_open_orders
-        self.exec_reports = []
-        self.history_orders = {}
-
-    def get_orders(self, with_history=True):
-        orders = {
-            "pending_orders": copy.deepcopy(self.pending_orders),
-            "rejected_pending_orders": copy.deepcopy(self.rejected_pending_orders),
-            "open_orders": copy.deepcopy(self.open_orders),
-            "rejected_open_orders": copy.deepcopy(self.rejected_open_orders),
-        }
-        if with_history:
-            orders["history_orders"] = copy.deepcopy(self.history_orders)
+        with self.lock:
+            self.exec_reports = []
+            self.history_orders = order_dict()
+            for store in (self.report_store, self.fill_store):
+                if purge_unsaved:
+                    store.clear()
+                else:
+                    store.purge()
+
+    def get_orders(self, with_history=True) -> Dict[str, Mapping[str, Order]]:
+        """
+        Read-only point-in-time snapshots of the order dicts, taken in O(1).
+        The orders in it are not updated by the tracker and must not be modified.
+        """
+        with self.lock:
+            orders = {
+                "pending_orders": self.pending_orders.snapshot(),
+                "rejected_pending_orders": self.rejected_pending_orders.snapshot(),
+                "open_orders": self.open_orders.snapshot(),
+                "rejected_open_orders": self.rejected_open_orders.snapshot(),
+            }
+            if with_history:
+                orders["history_orders"] = self.history_orders.snapshot()
         return orders
 
-    def get_exec_reports(self):
-        return copy.deepcopy(self.exec_reports)
+    def get_exec_reports(self) -> Sequence[ExecReport]:
+        with self.lock:
+            return SequenceView(self.exec_reports)
+
+    def exec_reports_df(self) -> pd.DataFrame:
+        """
+        All processed execution reports since the last purge, built from the report store without copying.
+        """
+        with self.lock:
+            return self.report_store.to_df()
+
+    def fills_df(self) -> pd.DataFrame:
+        with self.lock:
+            return self.fill_store.to_df()
+
+    def save_stores(self, path: str, pre=None, purge=True) -> Dict[str, int]:
+        """
+        Write the execution reports and fills appended since the last save to Parquet files in path
+        and purge them from memory if purge is set. Returns the number of rows written per store.
+        """
+        stores = {"exec_reports": self.report_store, "fills": self.fill_store}
+        with self.lock:
+            num_taken = {name: store.num_taken for name, store in stores.items()}
+            frames = {name: store.take() for name, store in stores.items()}
+        pre_ = pre + "_" if pre is not None else ""
+        try:
+            for name, df in frames.items():
+                if len(df) > 0:
+                    write_parquet(df, make_dirs_for_file(os.path.join(path, f"{pre_}{name}.parquet")))
+        except Exception:
+            # keep the rows for the next save
+            with self.lock:
+                for name, store in stores.items():
+                    store.num_taken = num_taken[name]
+            raise
+        if purge:
+            with self.lock:
+                for store in stores.values():
+                    store.purge()
+        return {name: len(df) for name, df in frames.items()}
 
     def compare_open_orders(self, other: Dict[str, Order]) -> Dict[str, Tuple[Optional[Order], Optional[Order]]]:
         return dict_diff(self.open_orders, other)
@@ -68,6 +142,35 @@ class OrderTrackerBase(object):
         else:
             return (True, this) if this == order else (False, this)
 
+    def open_orders_for(self, ticker: Ticker, side: Optional[str] = None) -> List[Order]:
+        """
+        Open orders of ticker on side or on all sides, from the best price.
+        """
+        with self.lock:
+            open_orders = self.open_orders
+            return [open_orders[ord_id] for ord_id in self.index.ord_ids_for(ticker, side)]
+
+    def best_own_price(self, ticker: Ticker, side: str) -> Optional[float]:
+        """
+        Highest price of the open buy orders or lowest price of the open sell orders of ticker.
+        """
+        with self.lock:
+            return self.index.best_price(ticker, side)
+
+    def open_order_by_cl_ord_id(self, cl_ord_id: str) -> Optional[Order]:
+        """
+        Open order which has or had cl_ord_id, also before it was replaced.
+        """
+        with self.lock:
+            ord_id = self.index.ord_ids.get(cl_ord_id, None)
+            return self.open_orders.get(ord_id, None) if ord_id is not None else None
+
+    def reindex(self, order: Order):
+        if order.ord_id in self.open_orders:
+            self.index.add(self.open_orders[order.ord_id])
+        else:
+            self.index.remove(order.ord_id)
+
     def set_snapshots(self, reports: List[ExecReport], last_update_time, overwrite=False):
         if self.snapshots_obtained and not overwrite:
             return
@@ -77,23 +180,28 @@ class OrderTrackerBase(object):
         self.logger.info(
             f"set_snapshots {orders=}"
         )
-        self.pending_orders = orders["pending"]
-        self.open_orders = orders["working"]
-        self.history_orders = orders["historical"]
+        with self.lock:
+            self.pending_orders = order_dict(orders["pending"])
+            self.open_orders = order_dict(orders["working"])
+            self.history_orders = order_dict(orders["historical"])
+            self.index = OrderIndex(self.open_orders.values())
         self.snapshots_obtained = True
 
     def set_order_state(self, order):
-        if order.is_working_order():
-            if order.ord_id is not None:
-                self.open_orders[order.ord_id] = order
-            elif order.cl_ord_id is not None:
-                self.pending_orders[order.cl_ord_id] = order
+        with self.lock:
+            if order.is_working_order():
+                if order.ord_id is not None:
+                    self.open_orders[order.ord_id] = order
+                elif order.cl_ord_id is not None:
+                    self.pending_orders[order.cl_ord_id] = order
+                else:
+                    self.logger.error(
+                        f"error in {self.__class__.__name__}: "
+                        f"order with both ord_id=None and cl_ord_id=None not allowed"
+                    )
             else:
-                self.logger.error(
-                    f"error in {self.__class__.__name__}: order with both ord_id=None and cl_ord_id=None not allowed"
-                )
-        else:
-            self.history_orders[order.ord_id] = order
+                self.history_orders[order.ord_id] = order
+            self.reindex(order)
 
     def to_orders(self, reports: List[ExecReport]) -> dict:
         """
@@ -122,7 +230,57 @@ class OrderTrackerBase(object):
         }
 
 
+# actions selected by the execution type take precedence over the ones selected by the order status
+EXEC_TYPE_ACTIONS: Dict[str, str] = {
+    fix.ExecType_ORDER_STATUS: "order_status",
+    fix.ExecType_REJECTED: "exec_rejected",
+    fix.ExecType_REPLACED: "replaced",
+}
+
+ORD_STATUS_ACTIONS: Dict[str, str] = {
+    fix.OrdStatus_REJECTED: "rejected",
+    fix.OrdStatus_PENDING_NEW: "pending_new",
+    fix.OrdStatus_NEW: "new",
+    fix.OrdStatus_PENDING_CANCEL: "pending",
+    fix.OrdStatus_PENDING_REPLACE: "pending",
+    fix.OrdStatus_PENDING_CANCEL_REPLACE: "pending",
+    fix.OrdStatus_CANCELED: "canceled",
+    fix.OrdStatus_PARTIALLY_FILLED: "partially_filled",
+    fix.OrdStatus_FILLED: "filled",
+    fix.OrdStatus_DONE_FOR_DAY: "done_for_day",
+}
+
+UNEXPECTED = "unexpected"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+# actions updating an order which has to be open
+REQUIRES_OPEN_ORDER = {"replaced", "new", "pending", "canceled", "partially_filled", "filled", "done_for_day"}
+
+# (current, reported) order status an open order cannot move back to
+INVALID_TRANSITIONS = {
+    (current, fix.OrdStatus_PENDING_NEW) for current in order_status_dict if current != fix.OrdStatus_PENDING_NEW
+} | {
+    (fix.OrdStatus_PARTIALLY_FILLED, fix.OrdStatus_NEW),
+}
+
+# current order status (None if not an open order), execution type, reported order status
+TransitionKey = Tuple[Optional[str], str, str]
+
+
+class Transition(NamedTuple):
+    name: str
+    action: Callable[[ExecReport, Optional[Order]], Tuple[Optional[Order], Optional[str]]]
+
+
 class OrderTracker(OrderTrackerBase):
+    """
+    Applies execution reports to the orders with a transition table from
+    (current order status, execution type, reported order status) to an
+    action, compiled once for all known status values and extended for
+    unknown ones on first use. Each applied transition is counted, reports
+    moving an open order back to an earlier state are rejected as invalid.
+    """
 
     def __init__(
             self,
@@ -134,284 +292,261 @@ class OrderTracker(OrderTrackerBase):
         OrderTrackerBase.__init__(self, name, logger)
         self.position_tracker = position_tracker
         self.print_reports = print_reports
+        self.transitions: Dict[TransitionKey, Transition] = self.compile_transitions()
+        self.transition_counts: Dict[TransitionKey, int] = {}
 
-    def process(self, report: ExecReport, sending_time) -> Tuple[Optional[Order], Optional[str]]:
-        order = None
-        error = None
+    def compile_transitions(self) -> Dict[TransitionKey, Transition]:
+        return {
+            (current, exec_type, ord_status): self.compile_transition(current, exec_type, ord_status)
+            for current in [None] + list(order_status_dict.keys())
+            for exec_type in exec_type_dict.keys()
+            for ord_status in order_status_dict.keys()
+        }
 
-        if report.exec_type == "I":
-            error = f"{self.__class__.__name__}: execution report cannot be of type 'I'"
+    def compile_transition(self, current: Optional[str], exec_type: str, ord_status: str) -> Transition:
+        name = EXEC_TYPE_ACTIONS.get(exec_type, None)
+        if name is None:
+            name = ORD_STATUS_ACTIONS.get(ord_status, UNEXPECTED)
+            if (current, ord_status) in INVALID_TRANSITIONS:
+                name = INVALID
+        if current is None and name in REQUIRES_OPEN_ORDER:
+            name = NOT_FOUND
+        return Transition(name, getattr(self, f"on_{name}"))
 
-        elif report.cl_ord_id is None:
-            error = f"{self.__class__.__name__}: cl_ord_id is None"
+    def process(self, report: ExecReport, sending_time) -> Tuple[Optional[Order], Optional[str]]:
+        with self.lock:
+            if report.cl_ord_id is None and report.exec_type != fix.ExecType_ORDER_STATUS:
+                order, error = None, f"{self.__class__.__name__}: cl_ord_id is None"
+            else:
+                current = self.open_orders.get(report.ord_id, None)
+                key = (current.ord_status if current is not None else None, report.exec_type, report.ord_status)
+                transition = self.transitions.get(key, None)
+                if transition is None:
+                    transition = self.transitions[key] = self.compile_transition(*key)
+                self.transition_counts[key] = self.transition_counts.get(key, 0) + 1
+                self.report_store.append_report(report)
+                order, error = transition.action(report, current)
+                if order is not None:
+                    self.reindex(order)
 
-        elif report.exec_type == fix.ExecType_REJECTED:
-            error = (
-                f"{self.__class__.__name__}: ExecType_REJECTED {report.text} "
-                f"exchange {report.exchange} "
-                f"account {report.account} "
-                f"symbol {report.symbol}"
-            )
+        if error:
+            self.logger.error(error)
 
-        # this is an order cancel replace
-        elif report.exec_type == fix.ExecType_REPLACED:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    cl_ord_id=report.cl_ord_id,
-                    ord_status=report.ord_status,
-                    ord_type=report.ord_type,
-                    tif=report.tif,
-                    order_qty=report.order_qty,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    transact_time=report.tx_time,
-                    price=report.price
-                )
+        return order, error
 
-            if order is None:
-                error = (
-                    f"on_execution_report (Cancel Replace) : "
-                    f"{report.ord_id} not found in open orders! "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
+    def transitions_frame(self) -> pd.DataFrame:
+        """
+        Count of each applied transition by current status, execution type, reported status and action.
+        """
+        rows = [
+            {
+                "current": order_status_to_string(current) if current is not None else None,
+                "exec_type": exec_type_to_string(exec_type),
+                "ord_status": order_status_to_string(ord_status),
+                "action": self.transitions[current, exec_type, ord_status].name,
+                "count": count,
+            }
+            for (current, exec_type, ord_status), count in list(self.transition_counts.items())
+        ]
+        return pd.DataFrame(rows, columns=["current", "exec_type", "ord_status", "action", "count"])
+
+    def move_to_history(self, order: Order):
+        self.history_orders[order.ord_id] = order
+        del self.open_orders[order.ord_id]
+
+    def add_fill_position(self, report: ExecReport, order: Order):
+        # last_qty is calculated in order.update
+        report.last_qty = order.last_qty
+        self.fill_store.append_report(report)
+        self.position_tracker.add_position(
+            report.exchange, report.symbol, report.account, report.side, order.last_qty, report.tx_time
+        )
 
-        elif report.ord_status == fix.OrdStatus_REJECTED:
-            self.logger.error(
-                f"{self.__class__.__name__}: OrdStatus_REJECTED {report.text} "
-                f"exchange {report.exchange} "
-                f"account {report.account} "
-                f"cl_ord_id {report.cl_ord_id} "
-                f"ord_id {report.ord_id}"
+        if self.print_reports:
+            table = self.position_tracker.tabulate(
+                report.exchange, report.symbol, report.account
             )
+            self.logger.info(f"<==== position_tracker_calculated.add_position\n{table}")
+
+    def update_execution(self, report: ExecReport) -> Order:
+        order = self.open_orders.get_for_update(report.ord_id)
+        order.update(
+            ord_status=report.ord_status,
+            leaves_qty=report.leaves_qty,
+            cum_qty=report.cum_qty,
+            last_qty=report.last_qty,
+            avg_px=report.avg_px,
+            last_px=report.last_px,
+            transact_time=report.tx_time
+        )
+        return order
 
-            if report.cl_ord_id in self.pending_orders:
-                order = self.pending_orders[report.cl_ord_id]
-                order.ord_status = report.ord_status
-                self.rejected_pending_orders[report.cl_ord_id] = order
-                del self.pending_orders[report.cl_ord_id]
+    def on_order_status(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        return None, f"{self.__class__.__name__}: execution report cannot be of type 'I'"
 
-            elif report.ord_id in self.open_orders:
-                order = self.open_orders[report.ord_id]
+    def on_exec_rejected(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        return None, (
+            f"{self.__class__.__name__}: ExecType_REJECTED {report.text} "
+            f"exchange {report.exchange} "
+            f"account {report.account} "
+            f"symbol {report.symbol}"
+        )
 
-                if order.cl_ord_id != report.cl_ord_id:
-                    self.logger.error(
-                        f"{self.__class__.__name__}: error cl_ord_id differ {order.cl_ord_id} != {report.cl_ord_id}"
-                    )
+    def on_replaced(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.open_orders.get_for_update(report.ord_id)
+        order.update(
+            cl_ord_id=report.cl_ord_id,
+            ord_status=report.ord_status,
+            ord_type=report.ord_type,
+            tif=report.tif,
+            order_qty=report.order_qty,
+            leaves_qty=report.leaves_qty,
+            cum_qty=report.cum_qty,
+            last_qty=report.last_qty,
+            transact_time=report.tx_time,
+            price=report.price
+        )
+        return order, None
+
+    def on_rejected(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        self.logger.error(
+            f"{self.__class__.__name__}: OrdStatus_REJECTED {report.text} "
+            f"exchange {report.exchange} "
+            f"account {report.account} "
+            f"cl_ord_id {report.cl_ord_id} "
+            f"ord_id {report.ord_id}"
+        )
 
-                order.update(
-                    ord_status=report.ord_status,
-                    tif=report.tif,
-                    ord_type=report.ord_type,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    avg_px=report.avg_px,
-                    last_px=report.last_px,
-                    transact_time=report.tx_time
-                )
+        if report.cl_ord_id in self.pending_orders:
+            order = self.pending_orders.get_for_update(report.cl_ord_id)
+            order.ord_status = report.ord_status
+            self.rejected_pending_orders[report.cl_ord_id] = order
+            del self.pending_orders[report.cl_ord_id]
 
-                # store it but do not remove it as it is still active but failed to be updated
-                self.rejected_open_orders[report.ord_id] = order
-                if order.ord_status == fix.OrdStatus_PENDING_NEW:
-                    del self.open_orders[report.cl_ord_id]
+        elif order is not None:
+            order = self.open_orders.get_for_update(report.ord_id)
 
-            if order is None:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_REJECTED "
-                    f"{report.cl_ord_id} not found in pending orders and "
-                    f"{report.ord_id} not found in open orders"
+            if order.cl_ord_id != report.cl_ord_id:
+                self.logger.error(
+                    f"{self.__class__.__name__}: error cl_ord_id differ {order.cl_ord_id} != {report.cl_ord_id}"
                 )
 
-        elif report.ord_status == fix.OrdStatus_PENDING_NEW:
-            self.logger.info(
-                f"{self.__class__.__name__}: process fix.OrdStatus_PENDING_NEW "
-                f"{str(report)}"
+            order.update(
+                ord_status=report.ord_status,
+                tif=report.tif,
+                ord_type=report.ord_type,
+                leaves_qty=report.leaves_qty,
+                cum_qty=report.cum_qty,
+                last_qty=report.last_qty,
+                avg_px=report.avg_px,
+                last_px=report.last_px,
+                transact_time=report.tx_time
             )
-            pending = self.pending_orders.get(report.cl_ord_id, None)
-            if pending:
-                del self.pending_orders[report.cl_ord_id]
-
-            order = report.to_order(self.logger.error)
-            self.open_orders[report.ord_id] = order
-
-        elif report.ord_status == fix.OrdStatus_NEW:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_id=report.ord_id,
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    transact_time=report.tx_time
-                )
-                self.open_orders[order.ord_id] = order
-            else:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_NEW "
-                    f"{report.ord_id} not found in open orders!"
-                )
-
-        elif (report.ord_status == fix.OrdStatus_PENDING_CANCEL
-              or report.ord_status == fix.OrdStatus_PENDING_REPLACE
-              or report.ord_status == fix.OrdStatus_PENDING_CANCEL_REPLACE):
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    transact_time=report.tx_time
-                )
-            else:
-                error = (
-                    f"{self.__class__.__name__}: "
-                    f"OrdStatus_PENDING_CANCEL | OrdStatus_PENDING_REPLACE | OrdStatus_PENDING_CANCEL_REPLACE "
-                    f"{report.ord_id} not found in open orders! "
-                    f"num open orders {len(self.open_orders)} "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
-
-        elif report.ord_status == fix.OrdStatus_CANCELED:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    avg_px=report.avg_px,
-                    last_px=report.last_px,
-                    transact_time=report.tx_time
-                )
-                self.history_orders[report.ord_id] = order
-                del self.open_orders[report.ord_id]
-
-            if order is None:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_CANCELED "
-                    f"{report.ord_id} not found in open orders! "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
-
-        elif report.ord_status == fix.OrdStatus_PARTIALLY_FILLED:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    avg_px=report.avg_px,
-                    last_px=report.last_px,
-                    transact_time=report.tx_time
-                )
-                report.last_qty = order.last_qty
-
-                # last_qty is calculated in order.update
-                self.position_tracker.add_position(
-                    report.exchange, report.symbol, report.account, report.side, order.last_qty, report.tx_time
-                )
-
-                if self.print_reports:
-                    table = self.position_tracker.tabulate(
-                        report.exchange, report.symbol, report.account
-                    )
-                    self.logger.info(f"<==== position_tracker_calculated.add_position\n{table}")
 
-            if order is None:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_PARTIALLY_FILLED "
-                    f"{report.ord_id} not found in open orders! "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
-
-        elif report.ord_status == fix.OrdStatus_FILLED:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    avg_px=report.avg_px,
-                    last_px=report.last_px,
-                    transact_time=report.tx_time
-                )
-                report.last_qty = order.last_qty
-
-                self.history_orders[report.ord_id] = order
-                del self.open_orders[report.ord_id]
-
-                # last_qty is calculated in order.update
-                self.position_tracker.add_position(
-                    report.exchange, report.symbol, report.account, report.side, order.last_qty, report.tx_time
-                )
-
-                if self.print_reports:
-                    table = self.position_tracker.tabulate(
-                        report.exchange, report.symbol, report.account
-                    )
-                    self.logger.info(f"<==== position_tracker_calculated.add_position\n{table}")
-
-            if order is None:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_FILLED "
-                    f"{report.ord_id} not found in open orders! "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
-
-        elif report.ord_status == fix.OrdStatus_DONE_FOR_DAY:
-            order = self.open_orders.get(report.ord_id, None)
-            if order:
-                order.update(
-                    ord_status=report.ord_status,
-                    leaves_qty=report.leaves_qty,
-                    cum_qty=report.cum_qty,
-                    last_qty=report.last_qty,
-                    avg_px=report.avg_px,
-                    last_px=report.last_px,
-                    transact_time=report.tx_time
-                )
-                self.history_orders[report.ord_id] = order
-                del self.open_orders[report.ord_id]
-
-            if order is None:
-                error = (
-                    f"{self.__class__.__name__}: OrdStatus_DONE_FOR_DAY "
-                    f"{report.ord_id} not found in open orders! "
-                    f"order status {order_status_to_string(report.ord_status)}"
-                )
+            # store it but do not remove it as it is still active but failed to be updated
+            self.rejected_open_orders[report.ord_id] = order
 
         else:
-            self.exec_reports.append(report)
-
-            error = (
-                f"{self.__class__.__name__}: "
-                f"unexpected exec type / order status combination {report}"
+            return None, (
+                f"{self.__class__.__name__}: OrdStatus_REJECTED "
+                f"{report.cl_ord_id} not found in pending orders and "
+                f"{report.ord_id} not found in open orders"
             )
 
-        if error:
-            self.logger.error(error)
+        return order, None
+
+    def on_pending_new(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        self.logger.info("%s: process fix.OrdStatus_PENDING_NEW %s", self.__class__.__name__, report)
+        self.pending_orders.pop(report.cl_ord_id, None)
+        order = report.to_order(self.logger.error)
+        self.open_orders[report.ord_id] = order
+        return order, None
+
+    def on_new(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.open_orders.get_for_update(report.ord_id)
+        order.update(
+            ord_id=report.ord_id,
+            ord_status=report.ord_status,
+            leaves_qty=report.leaves_qty,
+            cum_qty=report.cum_qty,
+            last_qty=report.last_qty,
+            transact_time=report.tx_time
+        )
+        return order, None
+
+    def on_pending(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.open_orders.get_for_update(report.ord_id)
+        order.update(
+            ord_status=report.ord_status,
+            leaves_qty=report.leaves_qty,
+            cum_qty=report.cum_qty,
+            last_qty=report.last_qty,
+            transact_time=report.tx_time
+        )
+        return order, None
+
+    def on_canceled(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.update_execution(report)
+        self.move_to_history(order)
+        return order, None
+
+    def on_partially_filled(
+            self, report: ExecReport, order: Optional[Order]
+    ) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.update_execution(report)
+        self.add_fill_position(report, order)
+        return order, None
+
+    def on_filled(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.update_execution(report)
+        self.move_to_history(order)
+        self.add_fill_position(report, order)
+        return order, None
+
+    def on_done_for_day(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        order = self.update_execution(report)
+        self.move_to_history(order)
+        return order, None
+
+    def on_not_found(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        return None, (
+            f"{self.__class__.__name__}: "
+            f"{exec_type_to_string(report.exec_type)} {order_status_to_string(report.ord_status)} "
+            f"{report.ord_id} not found in open orders! "
+            f"num open orders {len(self.open_orders)}"
+        )
 
-        return order, error
+    def on_invalid(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        return None, (
+            f"{self.__class__.__name__}: invalid transition of {report.ord_id} from "
+            f"{order_status_to_string(order.ord_status)} to {order_status_to_string(report.ord_status)} "
+            f"by {exec_type_to_string(report.exec_type)} {report}"
+        )
+
+    def on_unexpected(self, report: ExecReport, order: Optional[Order]) -> Tuple[Optional[Order], Optional[str]]:
+        self.exec_reports.append(report)
+        return None, (
+            f"{self.__class__.__name__}: "
+            f"unexpected exec type / order status combination {report}"
+        )
 
     def remove_order(self, ord_id: str, cl_ord_id: str) -> bool:
         """Returns true if found and removed an order with those ids
-        False if not found"""
+        False if not found. An open order is also found by any of its cl_ord_ids."""
         fn = "remove_order"
-        order = self.open_orders.get(ord_id)
-        if order:
-            self.logger.info(
-                f"{fn}: found open order with {ord_id=}. Move it to history"
-            )
-            self.history_orders[ord_id] = order
-            del self.open_orders[ord_id]
-        else:
-            order = self.pending_orders.get(cl_ord_id)
+        with self.lock:
+            if ord_id not in self.open_orders:
+                ord_id = self.index.ord_ids.get(cl_ord_id, ord_id)
+            order = self.open_orders.get(ord_id)
             if order:
-                del self.pending_orders[cl_ord_id]
+                self.logger.info(
+                    f"{fn}: found open order with {ord_id=}. Move it to history"
+                )
+                self.history_orders[ord_id] = order
+                del self.open_orders[ord_id]
+                self.index.remove(ord_id)
+            else:
+                order = self.pending_orders.get(cl_ord_id)
+                if order:
+                    del self.pending_orders[cl_ord_id]
         return order is not None
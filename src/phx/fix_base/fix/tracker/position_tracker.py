@@ -1,12 +1,13 @@
-import copy
+import threading
 import pandas as pd
 import quickfix as fix
 from tabulate import tabulate
 from datetime import datetime
-from typing import Dict, Tuple, List, Final
+from typing import Tuple, List, Final
 
 from phx.fix_base.fix.model.position_report import PositionReport
 from phx.fix_base.fix.utils import signed_value
+from phx.fix_base.utils.snapshot import CowDict, SequenceView
 
 
 class PositionTracker(object):
@@ -23,10 +24,14 @@ class PositionTracker(object):
         self.name = name
         self.netting = netting
 
+        # guards updates against snapshots taken from other threads
+        self.lock = threading.RLock()
+
         # open net position for (exchange, symbol, account) value (last update time, signed quantity)
-        self.open_net_positions: Dict[Tuple[str, str, str], Tuple[datetime, float]] = {}
+        # copied on write so that get_positions returns snapshots without copying
+        self.open_net_positions: CowDict = CowDict()
 
-        # position update history (exchange, symbol, account, last update time, signed position)
+        # position update history (exchange, symbol, account, last update time, signed position), only appended to
         self.position_updates: List[Tuple[str, str, str, datetime, float]] = []
 
         self.snapshots_obtained = False
@@ -34,13 +39,18 @@ class PositionTracker(object):
         self.logger = logger
 
     def purge_history(self):
-        self.position_updates = []
+        with self.lock:
+            self.position_updates = []
 
     def get_positions(self) -> dict:
-        return {
-            "open_net_positions": copy.deepcopy(self.open_net_positions),
-            "position_updates": copy.deepcopy(self.position_updates),
-        }
+        """
+        Read-only point-in-time snapshots of the open net positions and position updates, taken in O(1).
+        """
+        with self.lock:
+            return {
+                "open_net_positions": self.open_net_positions.snapshot(),
+                "position_updates": SequenceView(self.position_updates),
+            }
 
     def get_position(self, exchange, symbol, account) -> Tuple[datetime, float]:
         return self.open_net_positions.get((exchange, symbol, account), None)
@@ -133,19 +143,21 @@ class PositionTracker(object):
         signed_qty = signed_value(side, qty)
         if signed_qty is not None:
             key = (exchange, symbol, account)
-            _, previous_qty = self.open_net_positions.get(key, (None, 0))
-            signed_delta = signed_qty - previous_qty
-            self.open_net_positions[key] = (transact_time, signed_qty)
-            if signed_delta != 0:
-                self.position_updates.append((exchange, symbol, account, transact_time, signed_delta))
+            with self.lock:
+                _, previous_qty = self.open_net_positions.get(key, (None, 0))
+                signed_delta = signed_qty - previous_qty
+                self.open_net_positions[key] = (transact_time, signed_qty)
+                if signed_delta != 0:
+                    self.position_updates.append((exchange, symbol, account, transact_time, signed_delta))
 
     def add_position(self, exchange, symbol, account, side, fill_qty, transact_time: datetime):
         signed_fill_qty = signed_value(side, fill_qty)
         if signed_fill_qty is not None:
             key = (exchange, symbol, account)
-            _, prev_qty = self.open_net_positions.get(key, (None, 0))
-            self.open_net_positions[key] = (transact_time, prev_qty + signed_fill_qty)
-            self.position_updates.append((exchange, symbol, account, transact_time, signed_fill_qty))
+            with self.lock:
+                _, prev_qty = self.open_net_positions.get(key, (None, 0))
+                self.open_net_positions[key] = (transact_time, prev_qty + signed_fill_qty)
+                self.position_updates.append((exchange, symbol, account, transact_time, signed_fill_qty))
 
     def tabulate(self, exchange, symbol, account, pos_name=None, float_fmt=".2f", table_fmt="psql"):
         key = (exchange, symbol, account)
@@ -173,8 +185,9 @@ class PositionTracker(object):
         return tabulate(data, headers=headers, tablefmt=table_fmt, floatfmt=float_fmt)
 
     def position_dfs(self):
-        position_updates = copy.deepcopy(self.position_updates)
-        open_net_positions = copy.deepcopy(self.open_net_positions)
+        positions = self.get_positions()
+        position_updates = list(positions["position_updates"])
+        open_net_positions = positions["open_net_positions"]
         position_update_df = pd.DataFrame(
             position_updates,
             columns=PositionTracker.POSITION_UPDATE_FIELDS
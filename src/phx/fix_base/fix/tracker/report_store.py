@@ -0,0 +1,61 @@
+from operator import attrgetter
+from typing import List, Sequence
+
+from phx.fix_base.fix.model.exec_report import ExecReport
+from phx.fix_base.utils.columnar import ColumnSpec, ColumnStore
+
+DATETIME = "datetime64[ns]"
+
+EXEC_REPORT_COLUMNS: List[ColumnSpec] = [
+    ColumnSpec("tx_time", DATETIME),
+    ColumnSpec("exchange"),
+    ColumnSpec("symbol"),
+    ColumnSpec("account"),
+    ColumnSpec("exec_id"),
+    ColumnSpec("exec_type"),
+    ColumnSpec("cl_ord_id"),
+    ColumnSpec("ord_id"),
+    ColumnSpec("ord_status"),
+    ColumnSpec("ord_type"),
+    ColumnSpec("side"),
+    ColumnSpec("order_qty", "float64"),
+    ColumnSpec("price", "float64"),
+    ColumnSpec("min_qty", "float64"),
+    ColumnSpec("leaves_qty", "float64"),
+    ColumnSpec("cum_qty", "float64"),
+    ColumnSpec("last_qty", "float64"),
+    ColumnSpec("last_px", "float64"),
+    ColumnSpec("avg_px", "float64"),
+    ColumnSpec("tif"),
+    ColumnSpec("text"),
+]
+
+FILL_COLUMNS: List[ColumnSpec] = [
+    ColumnSpec("tx_time", DATETIME),
+    ColumnSpec("exchange"),
+    ColumnSpec("symbol"),
+    ColumnSpec("account"),
+    ColumnSpec("exec_id"),
+    ColumnSpec("cl_ord_id"),
+    ColumnSpec("ord_id"),
+    ColumnSpec("side"),
+    ColumnSpec("last_qty", "float64"),
+    ColumnSpec("last_px", "float64"),
+    ColumnSpec("cum_qty", "float64"),
+    ColumnSpec("leaves_qty", "float64"),
+    ColumnSpec("avg_px", "float64"),
+]
+
+
+class ReportStore(ColumnStore):
+    """
+    Column store of execution reports, one row of report attributes per report.
+    FIX enum fields are kept as their FIX values.
+    """
+
+    def __init__(self, columns: Sequence[ColumnSpec], chunk_size: int = 4096):
+        super().__init__(columns, chunk_size)
+        self.row_of = attrgetter(*[column.name for column in columns])
+
+    def append_report(self, report: ExecReport):
+        self.append(self.row_of(report))
@@ -1 +1,2 @@
 from .fix import *
+from .extraction import CONVERTERS, ExtractionPlan, FieldSpec, to_int_from_float
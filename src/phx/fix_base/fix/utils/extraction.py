@@ -0,0 +1,126 @@
+import sys
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Tuple, Union
+
+from phx.fix_base.utils.utils import str_to_datetime, str_to_epoch_ns
+
+
+def to_str(value: str) -> str:
+    return value
+
+
+def to_int(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def to_int_from_float(value: str):
+    """
+    Integer value of a field of FIX type float such as ContractMultiplier, e.g. "10.0".
+    """
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def to_float(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def to_bool(value: str):
+    if value == "Y":
+        return True
+    elif value == "N":
+        return False
+    else:
+        return None
+
+
+# same field type names as used by extract_message_field_value
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "": to_str,
+    "str": to_str,
+    "char": to_str,
+    "intern": sys.intern,
+    "int": to_int,
+    "float": to_float,
+    "bool": to_bool,
+    "datetime": str_to_datetime,
+    "epoch_ns": str_to_epoch_ns,
+}
+
+
+class FieldSpec(NamedTuple):
+    tag: int
+    name: str
+    field_type: Union[str, Callable[[str], Any]] = "str"
+    default: Any = None
+
+
+class ExtractionPlan(object):
+    """
+    Declarative, precompiled extraction of FIX fields into model attributes.
+
+    A plan is built once per message type (usually at import) from a schema of
+    (tag, attribute name, field type or converter, default). Extraction reads
+    the raw field string directly by tag, so no quickfix field object has to be
+    allocated per field and the field type dispatch is resolved at compile time.
+
+    Usage:
+
+        PLAN = ExtractionPlan([
+            FieldSpec(55, "symbol"),
+            FieldSpec(44, "price", "float"),
+        ])
+        values = PLAN.extract(message)      # {"symbol": ..., "price": ...}
+        PLAN.fill(message, obj)             # sets obj.symbol, obj.price
+
+    Works on any quickfix field map, i.e. messages, headers and groups.
+    """
+
+    def __init__(self, specs: Iterable[Union[FieldSpec, Tuple]]):
+        self.specs: Tuple[FieldSpec, ...] = tuple(
+            spec if isinstance(spec, FieldSpec) else FieldSpec(*spec) for spec in specs
+        )
+        self.names: Tuple[str, ...] = tuple(spec.name for spec in self.specs)
+        self.compiled: Tuple[Tuple[int, str, Callable[[str], Any], Any], ...] = tuple(
+            (spec.tag, spec.name, ExtractionPlan.compile_converter(spec.field_type), spec.default)
+            for spec in self.specs
+        )
+
+    @staticmethod
+    def compile_converter(field_type: Union[str, Callable[[str], Any]]) -> Callable[[str], Any]:
+        if callable(field_type):
+            return field_type
+        converter = CONVERTERS.get(field_type, None)
+        if converter is None:
+            raise ValueError(f"unsupported field type '{field_type}'")
+        return converter
+
+    def extract(self, field_map) -> Dict[str, Any]:
+        is_set = field_map.isSetField
+        get = field_map.getField
+        values = {}
+        for tag, name, convert, default in self.compiled:
+            values[name] = convert(get(tag)) if is_set(tag) else default
+        return values
+
+    def fill(self, field_map, target):
+        is_set = field_map.isSetField
+        get = field_map.getField
+        for tag, name, convert, default in self.compiled:
+            setattr(target, name, convert(get(tag)) if is_set(tag) else default)
+        return target
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __str__(self):
+        return (f"ExtractionPlan["
+                f"{', '.join([f'{spec.tag}->{spec.name}' for spec in self.specs])}"
+                f"]")
@@ -0,0 +1,146 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+from phx.fix_base.utils.utils import str_to_datetime
+
+NO_MD_ENTRIES = 268
+MD_ENTRY_TYPE = 269
+MD_ENTRY_PX = 270
+MD_ENTRY_SIZE = 271
+MD_ENTRY_DATE = 272
+MD_ENTRY_TIME = 273
+MD_UPDATE_ACTION = 279
+SYMBOL = 55
+SECURITY_EXCHANGE = 207
+MD_REQ_ID = 262
+
+SOH = "\x01"
+
+
+def tokenize(raw: str) -> Tuple[npt.NDArray, npt.NDArray]:
+    """
+    Split a SOH delimited FIX string into a tag array and a value array.
+    """
+    fields = raw.split(SOH)
+    if fields and fields[-1] == "":
+        fields.pop()
+    if not fields:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=object)
+    pairs = [field.partition("=") for field in fields]
+    tags = np.fromiter((int(tag) for tag, _, _ in pairs), dtype=np.int32, count=len(pairs))
+    values = np.array([value for _, _, value in pairs], dtype=object)
+    return tags, values
+
+
+def to_floats(values: npt.NDArray) -> npt.NDArray:
+    """
+    Float values of a column as an object array with None where a value is empty
+    or not a number, as extract_message_field_value returns for a float field.
+    """
+    try:
+        numbers = values.astype(np.float64)
+    except ValueError:
+        numbers = np.asarray(pd.to_numeric(values, errors="coerce"), dtype=np.float64)
+    floats = numbers.astype(object)
+    floats[np.isnan(numbers)] = None
+    return floats
+
+
+class MarketDataEntries(object):
+    """
+    Market data entries of a 35=W or 35=X message in columnar form, one array
+    element per entry of the NoMDEntries repeating group.
+
+    Entries without a symbol or exchange of their own inherit the message level
+    values, which is how snapshots carry them. Prices and quantities are floats,
+    or None if missing or not a number, as the quickfix based parsing gives them.
+    """
+    __slots__ = ("exchange", "symbol", "md_req_id", "size", "entry_type", "update_action", "price",
+                 "quantity", "entry_date", "entry_time", "symbols", "exchanges")
+
+    def __init__(self, size: int, exchange=None, symbol=None, md_req_id=None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.md_req_id = md_req_id
+        self.size = size
+        self.entry_type = np.full(size, "", dtype="<U1")
+        self.update_action = np.full(size, "", dtype="<U1")
+        self.price = np.full(size, None, dtype=object)
+        self.quantity = np.full(size, None, dtype=object)
+        self.entry_date = np.full(size, None, dtype=object)
+        self.entry_time = np.full(size, None, dtype=object)
+        self.symbols = np.full(size, symbol, dtype=object)
+        self.exchanges = np.full(size, exchange, dtype=object)
+
+    def __len__(self):
+        return self.size
+
+    def timestamp(self, i):
+        return str_to_datetime(f"{self.entry_date[i]}-{self.entry_time[i]}")
+
+    def __str__(self):
+        return (f"MarketDataEntries["
+                f"exchange={self.exchange}, "
+                f"symbol={self.symbol}, "
+                f"md_req_id={self.md_req_id}, "
+                f"size={self.size}"
+                f"]")
+
+
+def parse_market_data(raw: str) -> MarketDataEntries:
+    """
+    Parse the raw string of a market data snapshot (35=W) or incremental
+    refresh (35=X) without walking the repeating group through quickfix.
+
+    The string is tokenized once, entries are numbered by occurrences of the
+    group delimiter tag (the first tag after 268) and every tag of interest is
+    scattered into preallocated arrays with a single vectorized assignment.
+    """
+    tags, values = tokenize(raw)
+    group_pos = np.flatnonzero(tags == NO_MD_ENTRIES)
+
+    header: Dict[int, Optional[str]] = {SYMBOL: None, SECURITY_EXCHANGE: None, MD_REQ_ID: None}
+    end = group_pos[0] if len(group_pos) else len(tags)
+    for tag, value in zip(tags[:end].tolist(), values[:end].tolist()):
+        if tag in header:
+            header[tag] = value
+
+    if not len(group_pos):
+        return MarketDataEntries(0, header[SECURITY_EXCHANGE], header[SYMBOL], header[MD_REQ_ID])
+
+    start = group_pos[0] + 1
+    size = int(values[group_pos[0]])
+    entries = MarketDataEntries(size, header[SECURITY_EXCHANGE], header[SYMBOL], header[MD_REQ_ID])
+    if size == 0 or start >= len(tags):
+        return entries
+
+    group_tags = tags[start:]
+    group_values = values[start:]
+    entry_index = np.cumsum(group_tags == group_tags[0]) - 1
+    in_group = entry_index < size
+
+    def column(tag):
+        mask = (group_tags == tag) & in_group
+        return entry_index[mask], group_values[mask]
+
+    index, column_values = column(MD_ENTRY_PX)
+    entries.price[index] = to_floats(column_values)
+    index, column_values = column(MD_ENTRY_SIZE)
+    entries.quantity[index] = to_floats(column_values)
+    index, column_values = column(MD_ENTRY_TYPE)
+    entries.entry_type[index] = column_values
+    index, column_values = column(MD_UPDATE_ACTION)
+    entries.update_action[index] = column_values
+    index, column_values = column(MD_ENTRY_DATE)
+    entries.entry_date[index] = column_values
+    index, column_values = column(MD_ENTRY_TIME)
+    entries.entry_time[index] = column_values
+    index, column_values = column(SYMBOL)
+    entries.symbols[index] = column_values
+    index, column_values = column(SECURITY_EXCHANGE)
+    entries.exchanges[index] = column_values
+
+    return entries
@@ -0,0 +1,144 @@
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def check_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet export of column stores requires the pyarrow package") from e
+    return pyarrow
+
+
+def write_parquet(df: pd.DataFrame, filename: str):
+    check_pyarrow()
+    df.to_parquet(filename, engine="pyarrow", index=False)
+
+
+class ColumnSpec(NamedTuple):
+    name: str
+    dtype: str = "object"  # NumPy dtype of the column, strings are kept as objects
+
+
+def to_column(column: ColumnSpec, values: Sequence):
+    if column.dtype.startswith("datetime64"):
+        # pandas converts datetime objects much faster than NumPy does element by element
+        index = pd.DatetimeIndex(values)
+        return index.tz_convert(None).to_numpy() if index.tz is not None else index.to_numpy()
+    return values
+
+
+class ColumnStore(object):
+    """
+    Append-only table with one preallocated NumPy array per column.
+
+    Appending a row only buffers the row tuple, the buffered rows are written
+    to the column arrays in one slice assignment per column when chunk_size
+    rows are buffered or the store is read. The arrays grow by doubling so that
+    appends are amortized O(1). Reads return views of the arrays, which stay
+    valid as later rows are written behind them, and frames built from the
+    views without copying.
+
+    Rows can be taken out periodically for a Parquet export and purged from
+    memory once written. The store is not thread safe, the owner guards it.
+    """
+
+    def __init__(self, columns: Sequence[ColumnSpec], chunk_size: int = 4096):
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.buffer: List[tuple] = []
+        self.arrays: Dict[str, np.ndarray] = self.allocate(chunk_size)
+        self.size = 0  # rows written to the arrays
+        self.num_taken = 0  # rows of the arrays already taken out for export
+        self.num_purged = 0  # rows dropped from memory after export
+
+    def __len__(self) -> int:
+        return self.size + len(self.buffer)
+
+    def __str__(self):
+        return (f"ColumnStore["
+                f"rows={len(self)}, "
+                f"capacity={self.capacity()}, "
+                f"taken={self.num_taken}, "
+                f"purged={self.num_purged}"
+                f"]")
+
+    def allocate(self, capacity: int) -> Dict[str, np.ndarray]:
+        return {column.name: np.empty(capacity, dtype=column.dtype) for column in self.columns}
+
+    def capacity(self) -> int:
+        return len(self.arrays[self.columns[0].name]) if self.columns else 0
+
+    def append(self, row: tuple):
+        """
+        Append a row with one value per column in column order.
+        """
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            self.consolidate()
+
+    def consolidate(self):
+        """
+        Write the buffered rows to the column arrays.
+        """
+        n = len(self.buffer)
+        if n == 0:
+            return
+        start, end = self.size, self.size + n
+        if end > self.capacity():
+            arrays = self.allocate(max(2 * self.capacity(), end))
+            for name, array in self.arrays.items():
+                arrays[name][:start] = array[:start]
+            self.arrays = arrays
+        for column, values in zip(self.columns, zip(*self.buffer)):
+            self.arrays[column.name][start:end] = to_column(column, values)
+        self.buffer = []
+        self.size = end
+
+    def views(self, start: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Read-only views of the columns from row start.
+        """
+        self.consolidate()
+        views = {}
+        for name, array in self.arrays.items():
+            view = array[start:self.size]
+            view.flags.writeable = False
+            views[name] = view
+        return views
+
+    def to_df(self, start: int = 0) -> pd.DataFrame:
+        return pd.DataFrame(self.views(start), copy=False)
+
+    def take(self) -> pd.DataFrame:
+        """
+        Rows appended since the last take, for export.
+        """
+        df = self.to_df(self.num_taken)
+        self.num_taken = self.size
+        return df
+
+    def purge(self):
+        """
+        Drop the rows taken out from memory, rows appended since are kept.
+        """
+        self.consolidate()
+        end = self.num_taken
+        if end == 0:
+            return
+        arrays = self.allocate(max(self.chunk_size, self.size - end))
+        for name, array in self.arrays.items():
+            arrays[name][:self.size - end] = array[end:self.size]
+        self.arrays = arrays
+        self.size -= end
+        self.num_taken = 0
+        self.num_purged += end
+
+    def clear(self):
+        self.buffer = []
+        self.arrays = self.allocate(self.chunk_size)
+        self.size = 0
+        self.num_taken = 0
+        self.num_purged = 0
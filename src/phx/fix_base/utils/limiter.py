@@ -1,73 +1,162 @@
 import logging
-from collections import deque
 from datetime import datetime, timedelta
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 import pandas as pd
-import numpy as np
+
+# datetime or seconds of a monotonic clock such as time.monotonic()
+Timestamp = Union[datetime, float]
+
+# tolerance for rounding of the theoretical arrival time
+EPSILON = 1e-9
+
+
+def to_seconds(timestamp: Timestamp) -> float:
+    return timestamp if isinstance(timestamp, (int, float)) else timestamp.timestamp()
 
 
 class Limiter:
-    def __init__(self, limit: int, period: Union[str, timedelta], logger: logging.Logger):
+    """
+    Token bucket of burst requests refilled at limit requests per period in
+    the GCRA form: instead of one timestamp per request only the theoretical
+    arrival time tat of the next request is kept, so memory and time per call
+    are constant. Without requests for a period the full burst is available.
+
+    The default burst=1 spaces requests by period / limit, so that no period
+    holds more than limit requests. A larger burst is opt-in for venues which
+    tolerate bursts: a full burst followed by requests at the refill rate puts
+    up to limit + burst - 1 requests into one period. With strict set the
+    refill rate is lowered to limit - burst + 1 requests per period instead,
+    so that the burst is available and still no period holds more than limit.
+
+    At most burst requests are ever available at once, so has_capacity is False
+    and wait_time is infinite for a count above burst.
+
+    Timestamps are datetimes or seconds of a monotonic clock, one kind per limiter.
+    """
+
+    def __init__(
+            self,
+            limit: int,
+            period: Union[str, timedelta],
+            logger: logging.Logger,
+            burst: Optional[int] = None,
+            strict: bool = False,
+    ):
         self.limit = int(limit)
         self.period = period if isinstance(period, timedelta) else pd.Timedelta(period).to_pytimedelta()
-        self.queue = deque()
+        self.burst = int(burst) if burst is not None else 1
+        self.strict = strict
+        if strict and not 0 < self.burst <= self.limit:
+            raise ValueError(f"strict limiter requires 0 < burst <= limit, got {self.burst=} {self.limit=}")
+        # emission interval between two requests
+        refill = self.limit - self.burst + 1 if strict else self.limit
+        self.interval = self.period.total_seconds() / refill
+        self.tolerance = self.burst * self.interval  # how far tat may run ahead of now
+        self.tat = float("-inf")
         self.logger = logger
+        self.capacity_gauge = None  # optional gauge set to the free capacity when checked or consumed
 
     def __str__(self) -> str:
-        return f"Limiter[{self.limit=}; {self.period=}]"
+        return f"Limiter[{self.limit=}; {self.period=}; {self.burst=}; {self.strict=}]"
+
+    def window(self) -> str:
+        return f"{self.limit}/{self.period.total_seconds():g}s"
 
-    def purge(self, cutoff):
-        while len(self.queue) > 0 and self.queue[0] <= cutoff:
-            self.queue.popleft()
+    def capacity_at(self, now: float) -> int:
+        if self.tat <= now:
+            return self.burst
+        return max(0, min(self.burst, int((now + self.tolerance - self.tat) / self.interval + EPSILON)))
 
-    def check_limit(self, timestamp: datetime) -> bool:
-        self.purge(timestamp - self.period)
-        return len(self.queue) < self.limit
+    def check_limit(self, timestamp: Timestamp) -> bool:
+        return self.free_capacity(timestamp) > 0
 
-    def has_capacity(self, timestamp: datetime, count: int) -> bool:
+    def has_capacity(self, timestamp: Timestamp, count: int) -> bool:
         return self.free_capacity(timestamp) >= count
 
-    def free_capacity(self, timestamp: datetime) -> int:
-        self.purge(timestamp - self.period)
-        if len(self.queue):
-            q_detail = "\n".join([str(dt) for dt in self.queue])
-            self.logger.debug(
-                f"{self} free_capacity queue:\n"
-                f"{q_detail}"
-            )
-        free_capacity = max(self.limit - len(self.queue), 0)
-        self.logger.debug(
-            f"{self} now:{str(timestamp)} {self.limit=} {free_capacity=}"
-        )
+    def free_capacity(self, timestamp: Timestamp) -> int:
+        return self.free_capacity_at(to_seconds(timestamp))
+
+    def free_capacity_at(self, now: float) -> int:
+        free_capacity = self.capacity_at(now)
+        if self.capacity_gauge is not None:
+            self.capacity_gauge.set(free_capacity)
         return free_capacity
 
-    def consume(self, timestamp: datetime, count: int = None):
-        self.logger.debug(f"{self} consume {str(timestamp)} {count=}")
-        if count is None or count == 1:
-            self.queue.append(timestamp)
-        else:
-            assert count > 0
-            self.queue.extend([timestamp]*count)
+    def wait_time(self, timestamp: Timestamp, count: int = 1) -> float:
+        return self.wait_time_at(to_seconds(timestamp), count)
+
+    def wait_time_at(self, now: float, count: int = 1) -> float:
+        """
+        Seconds until count requests are within capacity, 0 if they are now
+        and infinite if count exceeds the burst.
+        """
+        if count > self.burst:
+            return float("inf")
+        return max(0.0, self.tat - self.tolerance + count * self.interval - now)
+
+    def consume(self, timestamp: Timestamp, count: int = None):
+        self.consume_at(to_seconds(timestamp), count)
+
+    def consume_at(self, now: float, count: int = None):
+        count = 1 if count is None else count
+        assert count > 0
+        tat = self.tat
+        self.tat = (tat if tat > now else now) + count * self.interval
+        if self.capacity_gauge is not None:
+            self.capacity_gauge.set(self.capacity_at(now))
 
 
 class MultiPeriodLimiter:
-    def __init__(self, limits: List[Tuple[int, Union[str, timedelta]]], logger: logging.Logger):
-        self.limiters = [Limiter(limit, period, logger) for limit, period in limits]
+    """
+    Limiters for several periods, each limit given as (limit, period) or (limit, period, burst).
+
+    A limit without burst on the shortest period allows a burst of its limit, so
+    that the configured short term limit is available at once, and refills at its
+    rate. A limit without burst on a longer period is a strict cap: it allows the
+    same burst, at most its limit, and refills slower so that no longer period
+    exceeds its limit. Sustained throughput is therefore bounded by the tightest
+    rate, e.g. about 31.7/s for [(100, "1s"), (2000, "1min")] after a burst of 100,
+    and the shortest period can hold up to twice its limit less one in the worst
+    case. Limits with an explicit burst are used as given.
+    """
+
+    def __init__(self, limits: List[Union[Tuple[int, Union[str, timedelta]], Tuple]], logger: logging.Logger):
+        periods = [pd.Timedelta(limit[1]) for limit in limits]
+        shortest = min(range(len(limits)), key=lambda i: periods[i]) if limits else None
+        self.limiters = []
+        for i, limit in enumerate(limits):
+            if len(limit) > 2:
+                self.limiters.append(Limiter(limit[0], limit[1], logger, *limit[2:]))
+            elif i == shortest:
+                self.limiters.append(Limiter(limit[0], limit[1], logger, int(limit[0])))
+            else:
+                burst = min(int(limits[shortest][0]), int(limit[0]))
+                self.limiters.append(Limiter(limit[0], limit[1], logger, burst, strict=True))
 
     def __str__(self) -> str:
         return "\n".join([str(limiter) for limiter in self.limiters])
 
-    def check_limit(self, timestamp: datetime) -> bool:
-        return all([limiter.check_limit(timestamp) for limiter in self.limiters])
+    def check_limit(self, timestamp: Timestamp) -> bool:
+        return self.free_capacity(timestamp) > 0
 
-    def has_capacity(self, timestamp: datetime, count: int) -> bool:
+    def has_capacity(self, timestamp: Timestamp, count: int) -> bool:
         return self.free_capacity(timestamp) >= count
 
-    def free_capacity(self, timestamp: datetime) -> int:
-        capacities = [limiter.free_capacity(timestamp) for limiter in self.limiters]
-        return np.min(capacities)
+    def free_capacity(self, timestamp: Timestamp) -> int:
+        now = to_seconds(timestamp)
+        free_capacity = None
+        for limiter in self.limiters:
+            capacity = limiter.free_capacity_at(now)
+            if free_capacity is None or capacity < free_capacity:
+                free_capacity = capacity
+        return free_capacity
+
+    def wait_time(self, timestamp: Timestamp, count: int = 1) -> float:
+        now = to_seconds(timestamp)
+        return max(limiter.wait_time_at(now, count) for limiter in self.limiters)
 
-    def consume(self, timestamp: datetime, count: int = None):
+    def consume(self, timestamp: Timestamp, count: int = None):
+        now = to_seconds(timestamp)
         for limiter in self.limiters:
-            limiter.consume(timestamp, count)
+            limiter.consume_at(now, count)
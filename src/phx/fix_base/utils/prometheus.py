@@ -1,9 +1,214 @@
-import time
-import random
-from prometheus_client import start_http_server, Summary, Counter
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from prometheus_client import start_http_server, Counter, Gauge, Histogram, CollectorRegistry, REGISTRY
+
+# log spaced latency buckets in seconds, 1-2-5 per decade from 1us to 10s
+LATENCY_BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2, 5)) + (10.0,)
+
+# stages of a message from App.fromApp to the end of the PhxApi handler
+LATENCY_STAGES = ("parse", "queue_wait", "handler", "total")
 
 
 def start_prometheus_server(port=8000):
-    start_http_server(port=8000)
+    start_http_server(port=port)
+
+
+def bucket_quantile(cumulative: List[Tuple[float, float]], q: float) -> float:
+    """
+    Quantile of a histogram given as cumulative counts per bucket upper bound,
+    interpolated linearly within the bucket.
+    """
+    rank = q * cumulative[-1][1]
+    lower, below = 0.0, 0.0
+    for upper, count in cumulative:
+        if count >= rank and count > below:
+            if upper == float("inf"):
+                return lower
+            return lower + (upper - lower) * (rank - below) / (count - below)
+        lower, below = upper, count
+    return lower
+
+
+class MessageLatency(object):
+    """
+    Histograms of the time messages spend per message type and stage
+
+        - parse: entry of App.fromApp until the parsed message is put to the queue
+        - queue_wait: put to the queue until dequeued for dispatch
+        - handler: dequeued until the callbacks and the internal handler returned
+        - total: entry of App.fromApp until the handler returned
+
+    The labelled children are bound once per message type, observe does not
+    look up labels.
+    """
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY, name: str = "phx_message_latency_seconds"):
+        self.histogram = Histogram(
+            name,
+            "Latency of FIX messages from socket receive to strategy callback",
+            ["msg_type", "stage"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.children: Dict[type, Tuple] = {}
+
+    def bind(self, msg_type: type) -> Tuple:
+        children = tuple(self.histogram.labels(msg_type.__name__, stage) for stage in LATENCY_STAGES)
+        self.children[msg_type] = children
+        return children
+
+    def observe(self, msg, handled_ns: int):
+        children = self.children.get(type(msg), None)
+        if children is None:
+            children = self.bind(type(msg))
+        parse, queue_wait, handler, total = children
+        parse.observe((msg.parsed_ns - msg.received_ns) * 1e-9)
+        queue_wait.observe((msg.dequeued_ns - msg.parsed_ns) * 1e-9)
+        handler.observe((handled_ns - msg.dequeued_ns) * 1e-9)
+        total.observe((handled_ns - msg.received_ns) * 1e-9)
+
+    def to_frame(self, quantiles=(0.5, 0.9, 0.99)) -> pd.DataFrame:
+        """
+        Count, mean and quantiles estimated from the buckets, in microseconds, per message type and stage.
+        """
+        buckets: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        sums: Dict[Tuple[str, str], float] = {}
+        for metric in self.histogram.collect():
+            for sample in metric.samples:
+                key = (sample.labels["msg_type"], sample.labels["stage"])
+                if sample.name.endswith("_bucket"):
+                    buckets.setdefault(key, []).append((float(sample.labels["le"]), sample.value))
+                elif sample.name.endswith("_sum"):
+                    sums[key] = sample.value
+        rows = []
+        for (msg_type, stage), cumulative in buckets.items():
+            count = cumulative[-1][1]
+            if count == 0:
+                continue
+            row = {
+                "msg_type": msg_type,
+                "stage": stage,
+                "count": int(count),
+                "mean_us": sums[msg_type, stage] / count * 1e6,
+            }
+            for q in quantiles:
+                row[f"p{q * 100:g}_us"] = bucket_quantile(cumulative, q) * 1e6
+            rows.append(row)
+        return pd.DataFrame(rows).set_index(["msg_type", "stage"]) if rows else pd.DataFrame()
+
+
+class Metrics(object):
+    """
+    Metrics of App and PhxApi. Hot paths update children bound once per label
+    set, gauges of sizes held elsewhere are read by a function on collection.
+    The gauges are labelled by the instance owning them, see new_instance, so
+    that several App or PhxApi instances in one process do not overwrite each
+    other, and released with the instance so that they do not keep it alive.
+
+        - phx_fix_messages_total: FIX messages per direction and message type
+        - phx_message_queue_depth: messages pending in the App message queue
+        - phx_fix_message_history_bytes: bytes held per message history buffer
+        - phx_rate_limiter_free_capacity: free capacity per rate limit window
+        - phx_open_orders: open orders of the order tracker
+        - phx_order_latency_seconds: order request sent until answered, see OrderLatencyTracker
+        - phx_book_updates_total: order book updates applied per ticker
+        - phx_message_latency_seconds: see MessageLatency
+    """
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        self.fix_messages = Counter(
+            "phx_fix_messages", "FIX messages received and sent", ["direction", "msg_type"], registry=registry
+        )
+        self.message_queue_depth = Gauge(
+            "phx_message_queue_depth", "Messages pending in the App message queue", ["instance"], registry=registry
+        )
+        self.message_history_bytes = Gauge(
+            "phx_fix_message_history_bytes", "Bytes held in the FIX message history", ["instance", "history"],
+            registry=registry
+        )
+        self.rate_limiter_free_capacity = Gauge(
+            "phx_rate_limiter_free_capacity", "Free capacity of the rate limiter", ["instance", "window"],
+            registry=registry
+        )
+        self.open_orders = Gauge("phx_open_orders", "Open orders", ["instance"], registry=registry)
+        self.order_latency = Histogram(
+            "phx_order_latency_seconds",
+            "Time from sending an order request until the venue answered it",
+            ["kind", "exchange", "symbol"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.book_updates = Counter(
+            "phx_book_updates", "Order book updates applied", ["exchange", "symbol"], registry=registry
+        )
+        self.message_latency = MessageLatency(registry)
+        self.fix_message_children: Dict[Tuple[str, bytes], Counter] = {}
+        self.book_update_children: Dict[Tuple[str, str], Counter] = {}
+
+        # labelled children per instance, removed when the instance is released
+        self.lock = threading.Lock()
+        self.num_instances = 0
+        self.instance_children: Dict[str, List[Tuple[Gauge, Tuple[str, ...]]]] = {}
+
+    def new_instance(self, kind: str) -> str:
+        """
+        Unique instance label value for an owner of gauges, e.g. app-1.
+        """
+        with self.lock:
+            self.num_instances += 1
+            return f"{kind}-{self.num_instances}"
+
+    def bind(self, instance: str, gauge: Gauge, *labels: str) -> Gauge:
+        """
+        Child of gauge for instance and labels, removed by release(instance).
+        """
+        with self.lock:
+            self.instance_children.setdefault(instance, []).append((gauge, labels))
+        return gauge.labels(instance, *labels)
+
+    def release(self, instance: str):
+        with self.lock:
+            children = self.instance_children.pop(instance, [])
+        for gauge, labels in children:
+            try:
+                gauge.remove(instance, *labels)
+            except KeyError:
+                pass
+
+    def fix_message_counter(self, direction: str, msg_type: bytes) -> Counter:
+        key = (direction, msg_type)
+        child = self.fix_message_children.get(key, None)
+        if child is None:
+            label = direction.replace("_message_history", "")
+            child = self.fix_message_children[key] = self.fix_messages.labels(label, msg_type.decode())
+        return child
+
+    def book_update_counter(self, ticker: Tuple[str, str]) -> Counter:
+        child = self.book_update_children.get(ticker, None)
+        if child is None:
+            child = self.book_update_children[ticker] = self.book_updates.labels(*ticker)
+        return child
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def metrics() -> Metrics:
+    """
+    Process wide metrics registered with the default registry.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
 
 
+def message_latency() -> MessageLatency:
+    """
+    Process wide message latency histograms registered with the default registry.
+    """
+    return metrics().message_latency
@@ -0,0 +1,107 @@
+import copy
+from collections.abc import MutableMapping, Sequence
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Set
+
+
+class CowDict(MutableMapping):
+    """
+    Dict with copy-on-write snapshots. A snapshot is a read-only view of the
+    dict taken in O(1). The first write after a snapshot copies the dict
+    shallowly and a value fetched by get_for_update is copied with copy_value
+    once per snapshot, so that snapshots keep their point-in-time state while
+    the owner continues to update the values in place.
+
+    Values of a snapshot are shared with the owner and must not be modified.
+    """
+
+    def __init__(self, data: Optional[Dict] = None, copy_value: Callable[[Any], Any] = copy.copy):
+        self.data: Dict = dict(data) if data is not None else {}
+        self.copy_value = copy_value
+        self.version = 0  # incremented on each write
+        self.shared = False  # data is referenced by the last snapshot
+        self.snapshot_taken = False
+        self.owned: Set[Hashable] = set()  # keys with values set or copied since the last snapshot
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.own()[key] = value
+        self.owned.add(key)
+
+    def __delitem__(self, key):
+        del self.own()[key]
+        self.owned.discard(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __iter__(self) -> Iterator:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self):
+        return f"CowDict({self.data!r})"
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def own(self) -> Dict:
+        if self.shared:
+            self.data = dict(self.data)
+            self.shared = False
+        self.version += 1
+        return self.data
+
+    def get_for_update(self, key, default=None):
+        """
+        Value of key which can be updated in place without changing earlier snapshots.
+        """
+        value = self.data.get(key, None)
+        if value is None:
+            return default
+        if self.snapshot_taken and key not in self.owned:
+            value = self.copy_value(value)
+            self.own()[key] = value
+            self.owned.add(key)
+        return value
+
+    def snapshot(self) -> Mapping:
+        if not self.shared:
+            self.shared = True
+            self.snapshot_taken = True
+            self.owned = set()
+        return MappingProxyType(self.data)
+
+
+class SequenceView(Sequence):
+    """
+    Read-only view of the first length items of an append-only list, taken in O(1).
+    """
+
+    def __init__(self, items: List, length: Optional[int] = None):
+        self.items = items
+        self.length = len(items) if length is None else length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.items[:self.length][index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("SequenceView index out of range")
+        return self.items[index]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator:
+        items = self.items
+        for i in range(self.length):
+            yield items[i]
+
+    def __repr__(self):
+        return f"SequenceView(length={self.length})"
@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 import time
 from datetime import datetime, timedelta
 from threading import Event, Thread
@@ -112,3 +114,33 @@ class AlignedRepeatingTimer(Thread):
                 start += self.interval
             delay = (start - now).total_seconds()
             self.finished.wait(delay)
+
+
+async def aligned_repeating_task(
+        interval: pd.Timedelta,
+        function: Callable,
+        alignment_freq: str = "1s",
+        args=None,
+        kwargs=None,
+):
+    """
+    Coroutine version of AlignedRepeatingTimer to be run as asyncio task,
+    stops when the task is cancelled. Awaits function if it is a coroutine function.
+
+        task = asyncio.create_task(aligned_repeating_task(pd.Timedelta("00:00:20"), on_timer, "20s"))
+        ...
+        task.cancel()
+    """
+    args = args if args is not None else []
+    kwargs = kwargs if kwargs is not None else {}
+    now = pd.Timestamp.now()
+    start = now.floor(freq=alignment_freq) + interval
+    await asyncio.sleep((start - now).total_seconds())
+    while True:
+        result = function(*args, **kwargs)
+        if inspect.isawaitable(result):
+            await result
+        now = pd.Timestamp.now()
+        while start <= now:
+            start += interval
+        await asyncio.sleep((start - now).total_seconds())
@@ -1,16 +1,90 @@
 import operator as op
-from datetime import datetime
-from typing import Any, Optional
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Tuple
 
 
 def float_to_string(value: float, digits=2) -> str:
     return '{0:.{1}%}'.format(value, digits)
 
 
+NANOS_PER_SECOND = 1_000_000_000
+NANOS_PER_DAY = 86_400 * NANOS_PER_SECOND
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+FIX_TIMESTAMP_CACHE_SIZE = 1024
+
+# YYYYMMDD -> (date, epoch nanoseconds at midnight UTC)
+_fix_date_cache: Dict[str, Tuple[date, int]] = {}
+
+# YYYYMMDD-HH:MM:SS -> ((year, month, day, hour, minute, second), epoch nanoseconds)
+_fix_second_cache: Dict[str, Tuple[Tuple[int, ...], int]] = {}
+
+
+def _fix_date(date_str: str) -> Tuple[date, int]:
+    cached = _fix_date_cache.get(date_str, None)
+    if cached is None:
+        if len(date_str) != 8 or not (date_str.isascii() and date_str.isdigit()):
+            raise ValueError(f"invalid FIX date {date_str}")
+        day = date(int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]))
+        cached = (day, (day.toordinal() - EPOCH_ORDINAL) * NANOS_PER_DAY)
+        if len(_fix_date_cache) >= FIX_TIMESTAMP_CACHE_SIZE:
+            _fix_date_cache.clear()
+        _fix_date_cache[date_str] = cached
+    return cached
+
+
+def _fix_second(second_str: str) -> Tuple[Tuple[int, ...], int]:
+    cached = _fix_second_cache.get(second_str, None)
+    if cached is None:
+        day, day_nanos = _fix_date(second_str[0:8])
+        hms = second_str[9:11] + second_str[12:14] + second_str[15:17]
+        if (len(second_str) != 17 or second_str[8] != "-" or second_str[11] != ":" or second_str[14] != ":"
+                or not (hms.isascii() and hms.isdigit())):
+            raise ValueError(f"invalid FIX timestamp {second_str}")
+        hour, minute, second = int(hms[0:2]), int(hms[2:4]), int(hms[4:6])
+        fields = (day.year, day.month, day.day, hour, minute, second)
+        datetime(*fields)  # validates the time fields
+        cached = (fields, day_nanos + ((hour * 60 + minute) * 60 + second) * NANOS_PER_SECOND)
+        if len(_fix_second_cache) >= FIX_TIMESTAMP_CACHE_SIZE:
+            _fix_second_cache.clear()
+        _fix_second_cache[second_str] = cached
+    return cached
+
+
+def _fix_fraction_ns(date_time_str: str) -> int:
+    fraction = date_time_str[18:]
+    digits = len(fraction)
+    if digits == 0:
+        if len(date_time_str) != 17:
+            raise ValueError(f"invalid FIX timestamp {date_time_str}")
+        return 0
+    if date_time_str[17] != "." or digits > 9 or not (fraction.isascii() and fraction.isdigit()):
+        raise ValueError(f"invalid FIX timestamp {date_time_str}")
+    return int(fraction) * 10 ** (9 - digits)
+
+
 def str_to_datetime(date_time_str) -> Optional[datetime]:
+    """
+    Parse a FIX UTCTimestamp such as 20200720-07:32:15.114 into a naive datetime.
+
+    Gives the same result as datetime.strptime(date_time_str, '%Y%m%d-%H:%M:%S.%f')
+    but parses the fixed layout directly and caches the date and second part, which
+    are shared by most messages in a burst. In addition to strptime it accepts a
+    missing fraction and nanosecond fractions, the latter truncated to microseconds.
+    """
     try:
-        # 20200720-07:32:15.114
-        return datetime.strptime(date_time_str, '%Y%m%d-%H:%M:%S.%f')
+        fields, _ = _fix_second(date_time_str[0:17])
+        return datetime(*fields, _fix_fraction_ns(date_time_str) // 1000)
+    except:
+        return None
+
+
+def str_to_epoch_ns(date_time_str) -> Optional[int]:
+    """
+    Parse a FIX UTCTimestamp such as 20200720-07:32:15.114 into integer nanoseconds since epoch.
+    """
+    try:
+        _, nanos = _fix_second(date_time_str[0:17])
+        return nanos + _fix_fraction_ns(date_time_str)
     except:
         return None
 
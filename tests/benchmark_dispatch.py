@@ -0,0 +1,134 @@
+import logging
+import queue
+import random
+import tempfile
+import time
+
+import quickfix as fix
+
+from phx.fix_base.api import PhxApi
+from phx.fix_base.fix.app import App
+from phx.fix_base.fix.model import (
+    Create, ExecReport, Heartbeat, Logon, OrderBookSnapshot, OrderBookUpdate, Reject, Trade, Trades
+)
+from phx.fix_base.utils import setup_logger
+
+
+class IdleRunner(object):
+    """
+    App runner that does not open a FIX session, so PhxApi can be built offline.
+    """
+
+    def __init__(self, app, logger):
+        self.app = app
+        self.logger = logger
+        self.is_fix_session_up = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class BenchmarkApi(PhxApi):
+
+    def on_timer(self):
+        pass
+
+    def stop_timer_thread(self):
+        pass
+
+    def on_logon(self, msg: Logon):
+        pass
+
+
+def legacy_dispatch(api: PhxApi, msg, callbacks):
+    # class name lookup and structural match as dispatched before the dispatch table
+    msg_class_name = type(msg).__name__
+    if msg_class_name in callbacks:
+        callbacks[msg_class_name](msg, api.logger)
+    match msg:
+        case OrderBookUpdate():
+            if msg.symbol in api.set_of_symbol_names:
+                api.on_order_book_update(msg)
+        case Trades():
+            api.on_trades(msg)
+        case ExecReport():
+            api.on_exec_report(msg)
+        case Heartbeat():
+            api.on_heartbeat(msg)
+        case Reject():
+            api.on_reject(msg)
+        case OrderBookSnapshot():
+            if msg.symbol in api.set_of_symbol_names:
+                api.on_order_book_snapshot(msg)
+        case Logon():
+            api.on_logon(msg)
+        case Create():
+            api.on_create(msg)
+        case _:
+            api.logger.warning(f"unknown message type:{type(msg).__name__} {msg=}")
+
+
+def message_mix(n, symbols, seed=11):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        u = rng.random()
+        symbol = rng.choice(symbols)
+        if u < 0.75:
+            msg = OrderBookUpdate("deribit", symbol, None, None)
+            msg.add(25000 - rng.randint(1, 50) * 0.5, float(rng.randint(1, 100)), True)
+        elif u < 0.90:
+            msg = Trades([Trade("deribit", symbol, None, None, None, 25000.0, 1.0)])
+        elif u < 0.97:
+            msg = Heartbeat(None)
+        elif u < 0.99:
+            msg = Logon("session")
+        else:
+            msg = Create("session")
+        messages.append(msg)
+    return messages
+
+
+def bench(name, dispatch, messages):
+    start = time.perf_counter()
+    for msg in messages:
+        dispatch(msg)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<36} {len(messages) / elapsed:12,.0f} msgs/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_dispatch", level=logging.WARNING)
+    symbols = ["BTC-PERPETUAL", "ETH-PERPETUAL"]
+    app = App(queue.Queue(), fix.SessionSettings(), logger, tempfile.gettempdir())
+    api = BenchmarkApi(
+        IdleRunner(app, logger), {"queue_timeout": "00:00:00.1"}, "deribit", symbols, symbols, logger
+    )
+    api.to_stop = True
+    api.run_thread.join()
+
+    def count(msg, _logger):
+        pass
+
+    api.register_callback("OrderBookUpdate", count)
+    api.register_callback(Heartbeat, count)
+    legacy_callbacks = {"OrderBookUpdate": count, "Heartbeat": count}
+    for symbol in symbols:
+        api.on_order_book_snapshot(
+            OrderBookSnapshot("deribit", symbol, None, None, {25000 - i * 0.5: 1.0 for i in range(1, 51)}, {25001: 1.0})
+        )
+
+    messages = message_mix(500000, symbols)
+    legacy = bench("class name lookup and match", lambda m: legacy_dispatch(api, m, legacy_callbacks), messages)
+    table = bench("type indexed dispatch table", lambda m: api.dispatch_message(m, None), messages)
+    print(f"speedup {legacy / table:.2f}x")
+
+    control = message_mix(200000, symbols, seed=12)
+    control = [msg for msg in control if not isinstance(msg, OrderBookUpdate)]
+    legacy = bench("control messages only, match", lambda m: legacy_dispatch(api, m, legacy_callbacks), control)
+    table = bench("control messages only, table", lambda m: api.dispatch_message(m, None), control)
+    print(f"speedup {legacy / table:.2f}x")
@@ -0,0 +1,99 @@
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import quickfix as fix
+
+from phx.fix_base.fix.model import ExecReport
+
+EXCHANGE = "deribit"
+SYMBOLS = [f"SYM{i}-PERPETUAL" for i in range(20)]
+ACCOUNT = "A1"
+
+
+class DictExecReport(object):
+    """
+    Previous dict based ExecReport, as reference.
+    """
+
+    def __init__(
+            self, exchange, symbol, account, tx_time, exec_id, exec_type, cl_ord_id, ord_id, side,
+            price, avg_px, last_px, ord_type, ord_status, order_qty, min_qty, cum_qty, leaves_qty, last_qty,
+    ):
+        self.received_ns = None
+        self.parsed_ns = None
+        self.dequeued_ns = None
+        self.exchange = exchange
+        self.symbol = symbol
+        self.account = account
+        self.tx_time = tx_time
+        self.exec_id = exec_id
+        self.exec_type = exec_type
+        self.cl_ord_id = cl_ord_id
+        self.ord_id = ord_id
+        self.side = side
+        self.price = price
+        self.avg_px = avg_px
+        self.last_px = last_px
+        self.ord_type = ord_type
+        self.ord_status = ord_status
+        self.order_qty = order_qty
+        self.min_qty = min_qty
+        self.cum_qty = cum_qty
+        self.leaves_qty = leaves_qty
+        self.last_qty = last_qty
+        self.tif = None
+        self.status_req_id = None
+        self.text = None
+        self.is_mass_status = False
+        self.tot_num_reports = None
+        self.last_rpt_requested = None
+
+
+def fresh(value: str) -> str:
+    """
+    A new string object per call, as returned by the FIX message getters.
+    """
+    return "".join(list(value))
+
+
+def make_reports(cls, n, convert):
+    tx_time = datetime(2024, 1, 1)
+    reports = []
+    for i in range(n):
+        reports.append(cls(
+            convert(EXCHANGE), convert(SYMBOLS[i % len(SYMBOLS)]), convert(ACCOUNT), tx_time, f"e{i}",
+            convert(fix.ExecType_TRADE), f"c{i}", f"o{i}", convert(fix.Side_BUY), 25000.0, 25000.0, 25000.0,
+            convert(fix.OrdType_LIMIT), convert(fix.OrdStatus_PARTIALLY_FILLED), 10.0, 0, 1.0, 9.0, 1.0,
+        ))
+    return reports
+
+
+def measure(name, cls, n, convert):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    reports = make_reports(cls, n, convert)
+    elapsed_build = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    total = 0.0
+    for report in reports:
+        if report.side == fix.Side_BUY and report.ord_status == fix.OrdStatus_PARTIALLY_FILLED:
+            total += report.last_qty * report.last_px
+    elapsed_access = time.perf_counter() - start
+    print(f"    {name:<24} {size / n:8,.0f} bytes/report {size / 2**20:10,.1f} MB   "
+          f"build {elapsed_build / n * 1e9:8,.0f} ns/report   access {elapsed_access / n * 1e9:6,.0f} ns/report")
+    del reports
+
+
+if __name__ == "__main__":
+    for n in [100_000, 1_000_000]:
+        print(f"  {n:,} exec reports")
+        measure("dict, fresh strings", DictExecReport, n, fresh)
+        measure("slots, fresh strings", ExecReport, n, fresh)
+        measure("slots, interned strings", ExecReport, n, lambda value: sys.intern(fresh(value)))
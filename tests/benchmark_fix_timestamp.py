@@ -0,0 +1,54 @@
+import timeit
+from datetime import datetime, timezone
+
+from phx.fix_base.utils.utils import str_to_datetime, str_to_epoch_ns
+
+
+def strptime_to_datetime(date_time_str):
+    try:
+        return datetime.strptime(date_time_str, '%Y%m%d-%H:%M:%S.%f')
+    except:
+        return None
+
+
+EQUIVALENT_CASES = [
+    "20230913-14:15:47.102",         # millis
+    "20230913-14:15:47.102345",      # micros
+    "20230913-14:15:47.1",           # single fraction digit
+    "20231231-23:59:59.999",         # end of year
+    "20240229-00:00:00.000",         # leap day
+    "20230229-00:00:00.000",         # invalid date
+    "20230913-24:00:00.000",         # invalid hour
+    "20230913-14:15:47.",            # empty fraction
+    "20230913-14:15:47.10a",         # invalid fraction
+    "20230913 14:15:47.102",         # invalid separator
+    "",
+    None,
+]
+
+EXTENDED_CASES = {
+    "20230913-14:15:47": datetime(2023, 9, 13, 14, 15, 47),                   # missing fraction
+    "20230913-14:15:47.102345678": datetime(2023, 9, 13, 14, 15, 47, 102345),  # nanos truncated
+}
+
+
+if __name__ == "__main__":
+    for case in EQUIVALENT_CASES:
+        assert str_to_datetime(case) == strptime_to_datetime(case), case
+    for case, expected in EXTENDED_CASES.items():
+        assert str_to_datetime(case) == expected, case
+    for case in EQUIVALENT_CASES:
+        dt = strptime_to_datetime(case)
+        if dt is not None:
+            expected_ns = int(dt.replace(tzinfo=timezone.utc).timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+            assert str_to_epoch_ns(case) == expected_ns, case
+    print("equivalence checks passed")
+
+    number = 200_000
+    value = "20230913-14:15:47.102"
+    t_strptime = timeit.timeit(lambda: strptime_to_datetime(value), number=number)
+    t_datetime = timeit.timeit(lambda: str_to_datetime(value), number=number)
+    t_epoch_ns = timeit.timeit(lambda: str_to_epoch_ns(value), number=number)
+    print(f"strptime          {t_strptime / number * 1e9:8.0f} ns/call")
+    print(f"str_to_datetime   {t_datetime / number * 1e9:8.0f} ns/call  speedup {t_strptime / t_datetime:.1f}x")
+    print(f"str_to_epoch_ns   {t_epoch_ns / number * 1e9:8.0f} ns/call  speedup {t_strptime / t_epoch_ns:.1f}x")
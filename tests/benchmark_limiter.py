@@ -0,0 +1,114 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from phx.fix_base.utils.limiter import MultiPeriodLimiter
+from phx.fix_base.utils import setup_logger
+
+
+class DequeLimiter:
+    """
+    Previous limiter keeping one timestamp per consumed request, as reference.
+    """
+
+    def __init__(self, limit, period, logger):
+        self.limit = int(limit)
+        self.period = pd.Timedelta(period).to_pytimedelta()
+        self.queue = deque()
+        self.logger = logger
+
+    def purge(self, cutoff):
+        while len(self.queue) > 0 and self.queue[0] <= cutoff:
+            self.queue.popleft()
+
+    def free_capacity(self, timestamp):
+        self.purge(timestamp - self.period)
+        if len(self.queue):
+            q_detail = "\n".join([str(dt) for dt in self.queue])
+            self.logger.debug(f"{self} free_capacity queue:\n{q_detail}")
+        free_capacity = max(self.limit - len(self.queue), 0)
+        self.logger.debug(f"{self} now:{str(timestamp)} {self.limit=} {free_capacity=}")
+        return free_capacity
+
+    def consume(self, timestamp, count=None):
+        self.logger.debug(f"{self} consume {str(timestamp)} {count=}")
+        if count is None or count == 1:
+            self.queue.append(timestamp)
+        else:
+            self.queue.extend([timestamp] * count)
+
+
+class MultiPeriodDequeLimiter:
+
+    def __init__(self, limits, logger):
+        self.limiters = [DequeLimiter(limit, period, logger) for limit, period in limits]
+
+    def has_capacity(self, timestamp, count):
+        return np.min([limiter.free_capacity(timestamp) for limiter in self.limiters]) >= count
+
+    def consume(self, timestamp, count=None):
+        for limiter in self.limiters:
+            limiter.consume(timestamp, count)
+
+
+def run(limiter, timestamps):
+    admitted = []
+    start = time.perf_counter()
+    for timestamp in timestamps:
+        if limiter.has_capacity(timestamp, 1):
+            limiter.consume(timestamp)
+            admitted.append(timestamp)
+    return admitted, time.perf_counter() - start
+
+
+def max_per_window(admitted, period_seconds):
+    """
+    Largest number of admitted requests in any window (t - period, t].
+    """
+    seconds = np.array([t.timestamp() if isinstance(t, datetime) else t for t in admitted])
+    if len(seconds) == 0:
+        return 0
+    # round to the timestamp grid so that float noise does not move requests across the window boundary
+    seconds = np.round(seconds, 9)
+    starts = np.searchsorted(seconds, np.round(seconds - period_seconds, 9), side="right")
+    return int((np.arange(len(seconds)) - starts + 1).max())
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_limiter", level=logging.WARNING)
+    limits = [(100, "1s"), (2000, "1min")]
+    checks_per_second = 10000
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    # a count above the burst is never available, wait_time must not promise it
+    limiter = MultiPeriodLimiter(limits, logger)
+    assert limiter.has_capacity(0.0, limits[0][0]) and limiter.wait_time(0.0, limits[0][0]) == 0.0
+    assert not limiter.has_capacity(0.0, limits[0][0] + 1) and limiter.wait_time(0.0, limits[0][0] + 1) == float("inf")
+
+    print(f"checks at {checks_per_second:,}/s, limits {limits}")
+    for seconds in [1, 10, 60]:
+        n = checks_per_second * seconds
+        datetimes = [start + timedelta(seconds=i / checks_per_second) for i in range(n)]
+        monotonic = [i / checks_per_second for i in range(n)]
+        cases = [
+            ("gcra datetime", MultiPeriodLimiter(limits, logger), datetimes),
+            ("gcra monotonic", MultiPeriodLimiter(limits, logger), monotonic),
+            ("gcra burst=1", MultiPeriodLimiter([limit + (1,) for limit in limits], logger), monotonic),
+            ("gcra burst=limit", MultiPeriodLimiter([limit + (limit[0],) for limit in limits], logger), monotonic),
+        ]
+        if seconds == 1:
+            # cost of the previous limiter grows with the number of timestamps kept
+            cases.insert(0, ("deque of timestamps", MultiPeriodDequeLimiter(limits, logger), datetimes))
+        print(f"  {n:,} checks over {seconds}s")
+        for name, limiter, timestamps in cases:
+            admitted, elapsed = run(limiter, timestamps)
+            windows = [
+                f"max {max_per_window(admitted, pd.Timedelta(period).total_seconds()):,}/{period}"
+                for _, period in limits
+            ]
+            print(f"    {name:<20} admitted {len(admitted):7,d}   {elapsed / n * 1e9:10,.0f} ns/check   "
+                  f"{', '.join(windows)}")
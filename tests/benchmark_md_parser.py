@@ -0,0 +1,74 @@
+import logging
+import queue
+import tempfile
+import time
+
+import quickfix as fix
+import quickfix44 as fix44
+
+from phx.fix_base.fix.app import App
+from phx.fix_base.utils import setup_logger
+
+
+def make_snapshot(levels: int) -> fix.Message:
+    message = fix44.MarketDataSnapshotFullRefresh()
+    message.setField(fix.Symbol("BTC-PERPETUAL"))
+    message.setField(fix.SecurityExchange("deribit"))
+    message.setField(fix.MDReqID("req_id_1"))
+    for i in range(levels):
+        group = fix44.MarketDataSnapshotFullRefresh.NoMDEntries()
+        is_bid = i % 2 == 0
+        group.setField(fix.MDEntryType(fix.MDEntryType_BID if is_bid else fix.MDEntryType_OFFER))
+        group.setField(fix.MDEntryPx(25000 - i * 0.5 if is_bid else 25001 + i * 0.5))
+        group.setField(fix.MDEntrySize(1 + i % 7))
+        group.setField(fix.StringField(272, "20230913"))
+        group.setField(fix.StringField(273, "14:15:47.102"))
+        message.addGroup(group)
+    return message
+
+
+def make_incremental(entries: int) -> fix.Message:
+    message = fix44.MarketDataIncrementalRefresh()
+    message.setField(fix.MDReqID("req_id_1"))
+    for i in range(entries):
+        group = fix44.MarketDataIncrementalRefresh.NoMDEntries()
+        group.setField(fix.MDUpdateAction(fix.MDUpdateAction_CHANGE))
+        group.setField(fix.MDEntryType(fix.MDEntryType_BID if i % 2 == 0 else fix.MDEntryType_OFFER))
+        group.setField(fix.Symbol("BTC-PERPETUAL"))
+        group.setField(fix.SecurityExchange("deribit"))
+        group.setField(fix.MDEntryPx(25000 + i * 0.5))
+        group.setField(fix.MDEntrySize(1 + i % 7))
+        group.setField(fix.StringField(272, "20230913"))
+        group.setField(fix.StringField(273, "14:15:48.108"))
+        message.addGroup(group)
+    return message
+
+
+def bench(name, handler, message, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        handler(message, None)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<40} {elapsed * 1000:10.3f} ms")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_md_parser", level=logging.WARNING)
+    message_queue = queue.Queue()
+    app = App(message_queue, fix.SessionSettings(), logger, tempfile.gettempdir())
+
+    snapshot = make_snapshot(10000)
+    slow = bench("snapshot 10k levels, quickfix groups", app.on_market_data_refresh_full, snapshot, 5)
+    fast = bench("snapshot 10k levels, raw string", app.on_market_data_refresh_full_fast, snapshot, 5)
+    print(f"speedup {slow / fast:.1f}x")
+
+    snapshots = [message_queue.get() for _ in range(message_queue.qsize())]
+    expected, actual = snapshots[0], snapshots[-1]
+    assert expected.bids == actual.bids and expected.asks == actual.asks
+    assert expected.exchange_ts == actual.exchange_ts
+
+    incremental = make_incremental(20)
+    slow = bench("incremental 20 entries, quickfix groups", app.on_market_data_refresh_incremental, incremental, 2000)
+    fast = bench("incremental 20 entries, raw string", app.on_market_data_refresh_incremental_fast, incremental, 2000)
+    print(f"speedup {slow / fast:.1f}x")
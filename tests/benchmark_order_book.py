@@ -0,0 +1,115 @@
+import random
+import time
+
+import numpy as np
+
+from phx.fix_base.fix.model.order_book import ArrayOrderBook, OrderBook, price_impact
+
+
+def make_updates(n, tick_size, mid, depth, seed=7):
+    rng = random.Random(seed)
+    updates = []
+    for _ in range(n):
+        is_bid = rng.random() < 0.5
+        k = rng.randint(1, depth)
+        price = round(mid - k * tick_size if is_bid else mid + k * tick_size, 6)
+        amount = 0.0 if rng.random() < 0.3 else float(rng.randint(1, 100))
+        updates.append((price, amount, is_bid))
+    return updates
+
+
+def check_impacts(tick_size, mid, depth, impact_volumes):
+    """
+    Both books give the same impacts, also after deletes of levels which do not
+    exist inside the spread and beyond the last level.
+    """
+    bids = {mid - k * tick_size: 1.0 for k in range(1, depth + 1)}
+    asks = {mid + k * tick_size: 1.0 for k in range(1, depth + 1)}
+    sorted_book = OrderBook("deribit", "BTC-PERPETUAL", dict(bids), dict(asks))
+    array_book = ArrayOrderBook("deribit", "BTC-PERPETUAL", tick_size, dict(bids), dict(asks))
+    deletes = [
+        (mid, 0.0, True), (mid, 0.0, False),
+        (mid - (depth + 1) * tick_size, 0.0, True), (mid + (depth + 1) * tick_size, 0.0, False),
+    ]
+    for price, amount, is_bid in deletes:
+        for book in (sorted_book, array_book):
+            book.impacts(impact_volumes, True)
+            book.impacts(impact_volumes, False)
+            book.update(price, amount, is_bid)
+        for is_bid in (True, False):
+            assert sorted_book.impacts(impact_volumes, is_bid) == array_book.impacts(impact_volumes, is_bid)
+
+
+def check_empty_book(tick_size, mid):
+    """
+    Deletes outside the arrays and the first levels of an empty book do not grow the arrays.
+    """
+    book = ArrayOrderBook("deribit", "BTC-PERPETUAL", tick_size)
+    capacity = book.capacity
+    book.update(mid * 2, 0.0, True)
+    book.update(mid - tick_size, 10.0, True)
+    book.update(mid + tick_size, 10.0, False)
+    book.update(mid * 2, 0.0, False)
+    assert book.capacity == capacity
+    assert book.top_of_book_price == (mid - tick_size, mid + tick_size)
+
+
+def bench(name, book, updates, depth_levels=10):
+    start = time.perf_counter()
+    for price, amount, is_bid in updates:
+        book.update(price, amount, is_bid)
+        book.top_bid_price
+        book.top_ask_price
+    elapsed_update = (time.perf_counter() - start) / len(updates)
+    start = time.perf_counter()
+    for _ in range(1000):
+        book.levels(depth_levels)
+    elapsed_levels = (time.perf_counter() - start) / 1000
+    print(f"{name:<20} update+top {elapsed_update * 1e6:8.3f} us   levels({depth_levels}) {elapsed_levels * 1e6:8.3f} us")
+    return elapsed_update
+
+
+def bench_impact(name, book, updates, impact_volumes, cached):
+    start = time.perf_counter()
+    for price, amount, is_bid in updates:
+        book.update(price, amount, is_bid)
+        if cached:
+            book.impacts(impact_volumes, True)
+            book.impacts(impact_volumes, False)
+        else:
+            bid_levels, ask_levels = book.levels()
+            cum_bids, cum_asks = book.cumulative_levels()
+            price_impact(bid_levels, cum_bids, impact_volumes)
+            price_impact(ask_levels, cum_asks, impact_volumes)
+    elapsed = (time.perf_counter() - start) / len(updates)
+    print(f"{name:<36} update+impacts {elapsed * 1e6:8.3f} us")
+    return elapsed
+
+
+if __name__ == "__main__":
+    tick_size, mid, depth = 0.5, 25000.0, 500
+    bids = {mid - k * tick_size: 10.0 for k in range(1, depth + 1)}
+    asks = {mid + k * tick_size: 10.0 for k in range(1, depth + 1)}
+    updates = make_updates(200000, tick_size, mid, depth)
+
+    sorted_book = OrderBook("deribit", "BTC-PERPETUAL", dict(bids), dict(asks))
+    array_book = ArrayOrderBook("deribit", "BTC-PERPETUAL", tick_size, dict(bids), dict(asks))
+    slow = bench("OrderBook", sorted_book, updates)
+    fast = bench("ArrayOrderBook", array_book, updates)
+    print(f"speedup {slow / fast:.1f}x")
+
+    for expected, actual in zip(sorted_book.levels(), array_book.levels()):
+        assert np.array_equal(expected, actual)
+    assert sorted_book.top_of_book.__str__() == array_book.top_of_book.__str__()
+
+    impact_volumes = [10, 100, 1000, 5000]
+    check_impacts(tick_size, mid, 200, [5, 50, 150, 500])
+    check_empty_book(tick_size, mid)
+    impact_updates = updates[:20000]
+    sorted_book = OrderBook("deribit", "BTC-PERPETUAL", dict(bids), dict(asks))
+    array_book = ArrayOrderBook("deribit", "BTC-PERPETUAL", tick_size, dict(bids), dict(asks))
+    full = bench_impact("OrderBook, full recompute", sorted_book, impact_updates, impact_volumes, False)
+    sorted_book = OrderBook("deribit", "BTC-PERPETUAL", dict(bids), dict(asks))
+    cached = bench_impact("OrderBook, depth cache", sorted_book, impact_updates, impact_volumes, True)
+    bench_impact("ArrayOrderBook, depth cache", array_book, impact_updates, impact_volumes, True)
+    print(f"speedup {full / cached:.1f}x")
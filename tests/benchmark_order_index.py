@@ -0,0 +1,67 @@
+import logging
+import random
+import time
+from datetime import datetime
+
+import quickfix as fix
+
+from phx.fix_base.fix.model import ExecReport
+from phx.fix_base.fix.tracker import OrderTracker, PositionTracker
+from phx.fix_base.utils import setup_logger
+
+EXCHANGE = "deribit"
+
+
+def make_report(i, symbol, side, price, ord_status, exec_type):
+    return ExecReport(
+        EXCHANGE, symbol, "A1", datetime(2024, 1, 1), f"e{i}", exec_type, f"c{i}", f"o{i}", side,
+        price, 0.0, 0.0, fix.OrdType_LIMIT, ord_status, 10.0, 0, 0.0, 10.0, None,
+    )
+
+
+def make_tracker(num_orders, symbols, logger, seed=7):
+    rng = random.Random(seed)
+    tracker = OrderTracker("local", logger, PositionTracker("local", True, logger), print_reports=False)
+    start = time.perf_counter()
+    for i in range(num_orders):
+        symbol = rng.choice(symbols)
+        side = rng.choice([fix.Side_BUY, fix.Side_SELL])
+        price = 25000.0 + (-1 if side == fix.Side_BUY else 1) * rng.randint(1, 200) * 0.5
+        tracker.process(make_report(i, symbol, side, price, fix.OrdStatus_PENDING_NEW, fix.ExecType_PENDING_NEW), None)
+        tracker.process(make_report(i, symbol, side, price, fix.OrdStatus_NEW, fix.ExecType_NEW), None)
+    elapsed = (time.perf_counter() - start) / (2 * num_orders)
+    return tracker, elapsed
+
+
+def scan_orders(tracker, ticker, side):
+    orders = [o for o in tracker.open_orders.values() if o.key() == ticker and o.side == side]
+    return sorted(orders, key=lambda o: -o.price if side == fix.Side_BUY else o.price)
+
+
+def scan_best_price(tracker, ticker, side):
+    prices = [o.price for o in tracker.open_orders.values() if o.key() == ticker and o.side == side]
+    if not prices:
+        return None
+    return max(prices) if side == fix.Side_BUY else min(prices)
+
+
+def bench(name, fn, tracker, queries):
+    start = time.perf_counter()
+    for ticker, side in queries:
+        fn(tracker, ticker, side)
+    elapsed = (time.perf_counter() - start) / len(queries)
+    print(f"    {name:<28} {elapsed * 1e6:10,.2f} us/query")
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_order_index", level=logging.WARNING)
+    symbols = [f"SYM{i}-PERPETUAL" for i in range(20)]
+    rng = random.Random(11)
+    queries = [((EXCHANGE, rng.choice(symbols)), rng.choice([fix.Side_BUY, fix.Side_SELL])) for _ in range(2000)]
+    for num_orders in [100, 1000, 10000]:
+        tracker, process_elapsed = make_tracker(num_orders, symbols, logger)
+        print(f"  {num_orders:,} open orders over {len(symbols)} symbols, process {process_elapsed * 1e6:.2f} us/report")
+        bench("scan open_orders_for", scan_orders, tracker, queries)
+        bench("index open_orders_for", OrderTracker.open_orders_for, tracker, queries)
+        bench("scan best_own_price", scan_best_price, tracker, queries)
+        bench("index best_own_price", OrderTracker.best_own_price, tracker, queries)
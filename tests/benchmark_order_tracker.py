@@ -0,0 +1,353 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from itertools import zip_longest
+from typing import Optional, Tuple
+
+import quickfix as fix
+
+from phx.fix_base.fix.model import ExecReport, Order
+from phx.fix_base.fix.tracker import OrderTracker, PositionTracker
+from phx.fix_base.fix.tracker.order_tracker import OrderTrackerBase
+from phx.fix_base.utils import setup_logger
+
+EXCHANGE = "deribit"
+SYMBOLS = [f"SYM{i}-PERPETUAL" for i in range(20)]
+START = datetime(2024, 1, 1)
+
+
+class ChainOrderTracker(OrderTrackerBase):
+    """
+    Order tracker applying execution reports with the if/elif chain the transition table replaced,
+    kept as the reference the table has to agree with.
+    """
+
+    def __init__(self, name, logger, position_tracker, print_reports=True):
+        OrderTrackerBase.__init__(self, name, logger)
+        self.position_tracker = position_tracker
+        self.print_reports = print_reports
+
+    def process(self, report: ExecReport, sending_time) -> Tuple[Optional[Order], Optional[str]]:
+        order = None
+        error = None
+
+        if report.exec_type == "I":
+            error = f"{self.__class__.__name__}: execution report cannot be of type 'I'"
+
+        elif report.cl_ord_id is None:
+            error = f"{self.__class__.__name__}: cl_ord_id is None"
+
+        elif report.exec_type == fix.ExecType_REJECTED:
+            error = f"{self.__class__.__name__}: ExecType_REJECTED {report.text}"
+
+        elif report.exec_type == fix.ExecType_REPLACED:
+            order = self.open_orders.get(report.ord_id, None)
+            if order:
+                order.update(
+                    cl_ord_id=report.cl_ord_id,
+                    ord_status=report.ord_status,
+                    ord_type=report.ord_type,
+                    tif=report.tif,
+                    order_qty=report.order_qty,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    transact_time=report.tx_time,
+                    price=report.price
+                )
+            else:
+                error = f"on_execution_report (Cancel Replace) : {report.ord_id} not found in open orders!"
+
+        elif report.ord_status == fix.OrdStatus_REJECTED:
+            if report.cl_ord_id in self.pending_orders:
+                order = self.pending_orders[report.cl_ord_id]
+                order.ord_status = report.ord_status
+                self.rejected_pending_orders[report.cl_ord_id] = order
+                del self.pending_orders[report.cl_ord_id]
+
+            elif report.ord_id in self.open_orders:
+                order = self.open_orders[report.ord_id]
+                order.update(
+                    ord_status=report.ord_status,
+                    tif=report.tif,
+                    ord_type=report.ord_type,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    avg_px=report.avg_px,
+                    last_px=report.last_px,
+                    transact_time=report.tx_time
+                )
+                self.rejected_open_orders[report.ord_id] = order
+                if order.ord_status == fix.OrdStatus_PENDING_NEW:
+                    del self.open_orders[report.cl_ord_id]
+
+            if order is None:
+                error = f"{self.__class__.__name__}: OrdStatus_REJECTED {report.cl_ord_id} not found"
+
+        elif report.ord_status == fix.OrdStatus_PENDING_NEW:
+            self.logger.info(
+                f"{self.__class__.__name__}: process fix.OrdStatus_PENDING_NEW "
+                f"{str(report)}"
+            )
+            pending = self.pending_orders.get(report.cl_ord_id, None)
+            if pending:
+                del self.pending_orders[report.cl_ord_id]
+
+            order = report.to_order(self.logger.error)
+            self.open_orders[report.ord_id] = order
+
+        elif report.ord_status == fix.OrdStatus_NEW:
+            order = self.open_orders.get(report.ord_id, None)
+            if order:
+                order.update(
+                    ord_id=report.ord_id,
+                    ord_status=report.ord_status,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    transact_time=report.tx_time
+                )
+                self.open_orders[order.ord_id] = order
+            else:
+                error = f"{self.__class__.__name__}: OrdStatus_NEW {report.ord_id} not found in open orders!"
+
+        elif (report.ord_status == fix.OrdStatus_PENDING_CANCEL
+              or report.ord_status == fix.OrdStatus_PENDING_REPLACE
+              or report.ord_status == fix.OrdStatus_PENDING_CANCEL_REPLACE):
+            order = self.open_orders.get(report.ord_id, None)
+            if order:
+                order.update(
+                    ord_status=report.ord_status,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    transact_time=report.tx_time
+                )
+            else:
+                error = f"{self.__class__.__name__}: pending {report.ord_id} not found in open orders!"
+
+        elif (report.ord_status == fix.OrdStatus_CANCELED
+              or report.ord_status == fix.OrdStatus_DONE_FOR_DAY):
+            order = self.open_orders.get(report.ord_id, None)
+            if order:
+                order.update(
+                    ord_status=report.ord_status,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    avg_px=report.avg_px,
+                    last_px=report.last_px,
+                    transact_time=report.tx_time
+                )
+                self.history_orders[report.ord_id] = order
+                del self.open_orders[report.ord_id]
+            else:
+                error = f"{self.__class__.__name__}: done {report.ord_id} not found in open orders!"
+
+        elif (report.ord_status == fix.OrdStatus_PARTIALLY_FILLED
+              or report.ord_status == fix.OrdStatus_FILLED):
+            order = self.open_orders.get(report.ord_id, None)
+            if order:
+                order.update(
+                    ord_status=report.ord_status,
+                    leaves_qty=report.leaves_qty,
+                    cum_qty=report.cum_qty,
+                    last_qty=report.last_qty,
+                    avg_px=report.avg_px,
+                    last_px=report.last_px,
+                    transact_time=report.tx_time
+                )
+                report.last_qty = order.last_qty
+
+                if report.ord_status == fix.OrdStatus_FILLED:
+                    self.history_orders[report.ord_id] = order
+                    del self.open_orders[report.ord_id]
+
+                self.position_tracker.add_position(
+                    report.exchange, report.symbol, report.account, report.side, order.last_qty, report.tx_time
+                )
+            else:
+                error = f"{self.__class__.__name__}: fill {report.ord_id} not found in open orders!"
+
+        else:
+            self.exec_reports.append(report)
+            error = f"{self.__class__.__name__}: unexpected exec type / order status combination {report}"
+
+        if error:
+            self.logger.error(error)
+
+        return order, error
+
+
+def make_report(i, step, exec_type, ord_status, cum_qty=0.0, leaves_qty=10.0, cl_ord_id=None, price=25000.0,
+                order_qty=10.0):
+    return ExecReport(
+        EXCHANGE, SYMBOLS[i % len(SYMBOLS)], "A1", START + timedelta(microseconds=i, milliseconds=step),
+        f"e{i}-{step}", exec_type, cl_ord_id or f"c{i}", f"o{i}", fix.Side_BUY if i % 2 == 0 else fix.Side_SELL,
+        price, 25000.0, 25000.0, fix.OrdType_LIMIT, ord_status, order_qty, 0, cum_qty, leaves_qty, None,
+    )
+
+
+def make_pending_order(i):
+    return Order(
+        EXCHANGE, SYMBOLS[i % len(SYMBOLS)], "A1", f"c{i}", fix.Side_BUY if i % 2 == 0 else fix.Side_SELL,
+        fix.OrdType_LIMIT, 10.0, 25000.0, fix.OrdStatus_PENDING_NEW,
+    )
+
+
+def opened(i):
+    return [
+        make_report(i, 0, fix.ExecType_PENDING_NEW, fix.OrdStatus_PENDING_NEW),
+        make_report(i, 1, fix.ExecType_NEW, fix.OrdStatus_NEW),
+    ]
+
+
+def canceled(i, step, cl_ord_id=None, order_qty=10.0):
+    return [
+        make_report(i, step, fix.ExecType_PENDING_CANCEL, fix.OrdStatus_PENDING_CANCEL, leaves_qty=order_qty,
+                    cl_ord_id=cl_ord_id, order_qty=order_qty),
+        make_report(i, step + 1, fix.ExecType_CANCELED, fix.OrdStatus_CANCELED, leaves_qty=0.0,
+                    cl_ord_id=cl_ord_id, order_qty=order_qty),
+    ]
+
+
+# report sequence of order i by scenario, reject_pending needs the order seeded as pending
+SCENARIOS = {
+    "new": lambda i: opened(i),
+    "partial_fill": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_TRADE, fix.OrdStatus_PARTIALLY_FILLED, cum_qty=4.0, leaves_qty=6.0),
+        make_report(i, 3, fix.ExecType_TRADE, fix.OrdStatus_FILLED, cum_qty=10.0, leaves_qty=0.0),
+    ],
+    "fill": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_TRADE, fix.OrdStatus_FILLED, cum_qty=10.0, leaves_qty=0.0),
+    ],
+    "cancel": lambda i: opened(i) + canceled(i, 2),
+    "partial_fill_cancel": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_TRADE, fix.OrdStatus_PARTIALLY_FILLED, cum_qty=4.0, leaves_qty=6.0),
+    ] + canceled(i, 3, order_qty=6.0),
+    "replace": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_PENDING_REPLACE, fix.OrdStatus_PENDING_REPLACE),
+        make_report(i, 3, fix.ExecType_REPLACED, fix.OrdStatus_NEW, leaves_qty=8.0, cl_ord_id=f"c{i}r",
+                    price=25001.0, order_qty=8.0),
+    ] + canceled(i, 4, cl_ord_id=f"c{i}r", order_qty=8.0),
+    "reject_pending": lambda i: [
+        make_report(i, 0, fix.ExecType_NEW, fix.OrdStatus_REJECTED, leaves_qty=0.0),
+    ],
+    "reject_modify": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_PENDING_REPLACE, fix.OrdStatus_PENDING_REPLACE),
+        make_report(i, 3, fix.ExecType_NEW, fix.OrdStatus_REJECTED),
+    ] + canceled(i, 4),
+    "exec_rejected": lambda i: [
+        make_report(i, 0, fix.ExecType_REJECTED, fix.OrdStatus_REJECTED, leaves_qty=0.0),
+    ],
+    "done_for_day": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_DONE_FOR_DAY, fix.OrdStatus_DONE_FOR_DAY, leaves_qty=0.0),
+    ],
+    "unexpected": lambda i: opened(i) + [
+        make_report(i, 2, fix.ExecType_RESTATED, fix.OrdStatus_STOPPED),
+    ] + canceled(i, 3),
+    "not_found": lambda i: [
+        make_report(i, 0, fix.ExecType_TRADE, fix.OrdStatus_FILLED, cum_qty=10.0, leaves_qty=0.0),
+    ],
+    "order_status": lambda i: [
+        make_report(i, 0, fix.ExecType_ORDER_STATUS, fix.OrdStatus_NEW),
+    ],
+}
+
+
+def make_reports(num_orders, interleave=100):
+    """
+    Report sequences of num_orders orders cycling through the scenarios, interleaved
+    across blocks of orders so that many orders are open at a time.
+    """
+    names = list(SCENARIOS.keys())
+    pending = []
+    reports = []
+    for block in range(0, num_orders, interleave):
+        sequences = []
+        for i in range(block, min(block + interleave, num_orders)):
+            name = names[i % len(names)]
+            if name == "reject_pending":
+                pending.append(make_pending_order(i))
+            sequences.append(SCENARIOS[name](i))
+        for step in zip_longest(*sequences):
+            reports.extend(report for report in step if report is not None)
+    return pending, reports
+
+
+def make_trackers(cls, pending, logger):
+    tracker = cls("local", logger, PositionTracker("local", True, logger), print_reports=False)
+    for order in pending:
+        tracker.pending_orders[order.cl_ord_id] = order.copy()
+    return tracker
+
+
+def order_dicts(tracker):
+    return {name: dict(orders) for name, orders in tracker.get_orders().items()}
+
+
+def check_equivalence(num_orders, logger):
+    pending, chain_reports = make_reports(num_orders)
+    _, table_reports = make_reports(num_orders)
+    chain = make_trackers(ChainOrderTracker, pending, logger)
+    table = make_trackers(OrderTracker, pending, logger)
+    for chain_report, table_report in zip(chain_reports, table_reports):
+        chain_order, chain_error = chain.process(chain_report, None)
+        table_order, table_error = table.process(table_report, None)
+        assert chain_order == table_order, f"{chain_report}: {chain_order} != {table_order}"
+        assert (chain_error is None) == (table_error is None), f"{chain_report}: {chain_error} != {table_error}"
+    assert order_dicts(chain) == order_dicts(table)
+    assert len(chain.exec_reports) == len(table.exec_reports)
+    chain_positions = dict(chain.position_tracker.get_positions()["open_net_positions"])
+    table_positions = dict(table.position_tracker.get_positions()["open_net_positions"])
+    assert chain_positions == table_positions
+    num_open = len(table.open_orders)
+    num_history = len(table.history_orders)
+    print(f"    {len(table_reports):,} reports of {num_orders:,} orders agree, "
+          f"{num_open:,} open, {num_history:,} history, {len(table.transition_counts)} transitions")
+
+
+def check_invalid_transitions(logger):
+    """
+    The table rejects reports moving an open order back to an earlier state, the chain applied them.
+    """
+    for name, back in [
+        ("pending new", make_report(0, 3, fix.ExecType_PENDING_NEW, fix.OrdStatus_PENDING_NEW)),
+        ("new", make_report(0, 3, fix.ExecType_NEW, fix.OrdStatus_NEW, cum_qty=4.0, leaves_qty=6.0)),
+    ]:
+        table = make_trackers(OrderTracker, [], logger)
+        for report in opened(0) + [
+            make_report(0, 2, fix.ExecType_TRADE, fix.OrdStatus_PARTIALLY_FILLED, cum_qty=4.0, leaves_qty=6.0),
+        ]:
+            table.process(report, None)
+        order, error = table.process(back, None)
+        assert order is None and error is not None
+        assert table.open_orders["o0"].ord_status == fix.OrdStatus_PARTIALLY_FILLED
+        print(f"    partially filled back to {name:<12} rejected")
+
+
+def bench_process(cls, num_orders, logger, with_stores=True):
+    pending, reports = make_reports(num_orders)
+    tracker = make_trackers(cls, pending, logger)
+    if not with_stores:
+        tracker.report_store.append_report = lambda report: None
+        tracker.fill_store.append_report = lambda report: None
+    start = time.perf_counter()
+    for report in reports:
+        tracker.process(report, None)
+    elapsed = time.perf_counter() - start
+    name = cls.__name__ if with_stores else f"{cls.__name__} without stores"
+    print(f"    {name:<32} {elapsed / len(reports) * 1e6:8.2f} us/report")
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_order_tracker", level=logging.CRITICAL)
+    print(f"  equivalence of the transition table and the if/elif chain")
+    check_equivalence(10_000, logger)
+    check_invalid_transitions(logger)
+    for num_orders in [10_000, 100_000]:
+        print(f"  {num_orders:,} orders, {len(SCENARIOS)} scenarios")
+        bench_process(ChainOrderTracker, num_orders, logger)
+        bench_process(OrderTracker, num_orders, logger, with_stores=False)
+        bench_process(OrderTracker, num_orders, logger)
@@ -0,0 +1,105 @@
+import logging
+import os
+import queue
+import random
+import tempfile
+import time
+
+import quickfix as fix
+
+from phx.fix_base.api import PhxApi
+from phx.fix_base.fix.app import App
+from phx.fix_base.fix.app.capture import ADMIN, CaptureWriter
+from phx.fix_base.fix.app.replay import ReplayRunner, capture_records
+from phx.fix_base.fix.model import Logon, OrderBookUpdate
+from phx.fix_base.utils import setup_logger
+
+SESSION = "FIX.4.4:test->phoenix-prime"
+
+
+def fix_string(msg_type, body, seq_num):
+    header = f"35={msg_type}\x0134={seq_num}\x0149=phoenix-prime\x0152=20230913-14:15:47.278\x0156=test\x01"
+    content = header + "".join(f"{tag}={value}\x01" for tag, value in body)
+    head = f"8=FIX.4.4\x019={len(content)}\x01"
+    checksum = sum((head + content).encode()) % 256
+    return f"{head}{content}10={checksum:03d}\x01".encode()
+
+
+def md_entry(entry_type, price, size):
+    return [(269, entry_type), (270, price), (271, size), (272, "20230913"), (273, "14:15:47.102"), (336, "deribit")]
+
+
+def write_capture(filename, symbols, n, seed=7):
+    rng = random.Random(seed)
+    writer = CaptureWriter(filename)
+    seq_num = 1
+    writer.write(ADMIN, SESSION, fix_string("A", [(98, 0), (108, 30)], seq_num), monotonic_ns=0)
+    for symbol in symbols:
+        seq_num += 1
+        body = [(55, symbol), (207, "deribit"), (262, "req_id_1"), (268, 40)]
+        for i in range(20):
+            body += md_entry(0, 25000 - i * 0.5, 10)
+            body += md_entry(1, 25000.5 + i * 0.5, 10)
+        writer.write(0, SESSION, fix_string("W", body, seq_num), monotonic_ns=seq_num * 1000)
+    for _ in range(n):
+        seq_num += 1
+        symbol = rng.choice(symbols)
+        body = [(262, "req_id_1"), (268, 2)]
+        for _ in range(2):
+            is_bid = rng.random() < 0.5
+            price = 25000 - rng.randint(0, 19) * 0.5 if is_bid else 25000.5 + rng.randint(0, 19) * 0.5
+            body += [
+                (279, 1), (269, 0 if is_bid else 1), (55, symbol), (207, "deribit"), (270, price),
+                (271, rng.randint(1, 100)), (272, "20230913"), (273, "14:15:48.108"), (336, "deribit"),
+            ]
+        writer.write(0, SESSION, fix_string("X", body, seq_num), monotonic_ns=seq_num * 1000)
+    writer.close()
+    return n
+
+
+class ReplayApi(PhxApi):
+
+    def on_timer(self):
+        pass
+
+    def stop_timer_thread(self):
+        pass
+
+    def on_logon(self, msg: Logon):
+        # no session to subscribe on, the capture contains the market data already
+        self.logged_in = True
+        self.subscribed = True
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_replay", level=logging.WARNING)
+    symbols = ["BTC-PERPETUAL", "ETH-PERPETUAL"]
+    export_dir = tempfile.mkdtemp()
+    filename = os.path.join(export_dir, "benchmark.phxcap")
+    num_updates = write_capture(filename, symbols, 20000)
+
+    for fast_md_parsing in [False, True]:
+        app = App(queue.Queue(), fix.SessionSettings(), logger, export_dir, fast_md_parsing=fast_md_parsing)
+        runner = ReplayRunner(app, capture_records(filename), logger)
+        updates = []
+        start = time.perf_counter()
+        api = ReplayApi(
+            runner,
+            {"queue_timeout": "00:00:01"},
+            "deribit",
+            symbols,
+            symbols,
+            logger,
+            callbacks={OrderBookUpdate: lambda msg, _logger: updates.append(msg)},
+        )
+        runner.wait()
+        while len(updates) < num_updates and time.perf_counter() - start < 60:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        api.to_stop = True
+        api.run_thread.join()
+        books = {symbol: str(api.order_books[("deribit", symbol)].top_of_book) for symbol in symbols}
+        print(f"fast_md_parsing={fast_md_parsing}")
+        print(f"  replay into App          {runner.num_replayed / runner.elapsed:12,.0f} msgs/s")
+        print(f"  end to end through api   {len(updates) / elapsed:12,.0f} updates/s")
+        print(f"  {books}")
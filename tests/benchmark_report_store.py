@@ -0,0 +1,87 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+import quickfix as fix
+
+from phx.fix_base.fix.model import ExecReport
+from phx.fix_base.fix.tracker import OrderTracker, PositionTracker
+from phx.fix_base.fix.tracker.report_store import FILL_COLUMNS, ReportStore
+from phx.fix_base.utils import setup_logger
+
+EXCHANGE = "deribit"
+SYMBOLS = [f"SYM{i}-PERPETUAL" for i in range(20)]
+
+
+def make_fills(n):
+    start = datetime(2024, 1, 1)
+    return [
+        ExecReport(
+            EXCHANGE, SYMBOLS[i % len(SYMBOLS)], "A1", start + timedelta(microseconds=i), f"e{i}", fix.ExecType_TRADE,
+            f"c{i}", f"o{i}", fix.Side_BUY, 25000.0, 25000.0, 25000.0, fix.OrdType_LIMIT, fix.OrdStatus_FILLED,
+            1.0, 0, 1.0, 0.0, 1.0,
+        )
+        for i in range(n)
+    ]
+
+
+def bench_store(fills):
+    n = len(fills)
+    store = ReportStore(FILL_COLUMNS)
+    start = time.perf_counter()
+    for report in fills:
+        store.append_report(report)
+    elapsed_append = time.perf_counter() - start
+    start = time.perf_counter()
+    df = store.to_df()
+    elapsed_df = time.perf_counter() - start
+    start = time.perf_counter()
+    store.to_df()
+    elapsed_df_again = time.perf_counter() - start
+    print(f"    report store   append {elapsed_append / n * 1e9:8,.0f} ns/report   "
+          f"to_df {elapsed_df:8.3f} s, again {elapsed_df_again:8.4f} s   {len(df):,} rows")
+
+
+def bench_objects(fills):
+    start = time.perf_counter()
+    df = ExecReport.to_df(fills)
+    elapsed_df = time.perf_counter() - start
+    print(f"    ExecReport.to_df {'':27} to_df {elapsed_df:8.3f} s   {len(df):,} rows")
+
+
+def bench_process(n, logger, with_stores):
+    tracker = OrderTracker("local", logger, PositionTracker("local", True, logger), print_reports=False)
+    if not with_stores:
+        tracker.report_store.append_report = lambda report: None
+        tracker.fill_store.append_report = lambda report: None
+    start = datetime(2024, 1, 1)
+    reports = []
+    for i in range(n):
+        for ord_status, exec_type, leaves_qty, cum_qty in [
+            (fix.OrdStatus_PENDING_NEW, fix.ExecType_PENDING_NEW, 1.0, 0.0),
+            (fix.OrdStatus_NEW, fix.ExecType_NEW, 1.0, 0.0),
+            (fix.OrdStatus_FILLED, fix.ExecType_TRADE, 0.0, 1.0),
+        ]:
+            reports.append(ExecReport(
+                EXCHANGE, SYMBOLS[i % len(SYMBOLS)], "A1", start, f"e{i}", exec_type, f"c{i}", f"o{i}",
+                fix.Side_BUY, 25000.0, 25000.0, 25000.0, fix.OrdType_LIMIT, ord_status, 1.0, 0,
+                cum_qty, leaves_qty, 1.0,
+            ))
+    t0 = time.perf_counter()
+    for report in reports:
+        tracker.process(report, None)
+    elapsed = time.perf_counter() - t0
+    name = "with stores" if with_stores else "without stores"
+    print(f"    process {name:<16} {elapsed / len(reports) * 1e6:8.2f} us/report")
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_report_store", level=logging.WARNING)
+    for n in [100_000, 1_000_000]:
+        print(f"  {n:,} fills")
+        fills = make_fills(n)
+        bench_store(fills)
+        bench_objects(fills)
+    print(f"  100,000 orders, pending new, new and filled")
+    bench_process(100_000, logger, False)
+    bench_process(100_000, logger, True)
@@ -0,0 +1,117 @@
+import logging
+import queue
+import tempfile
+import time
+
+import quickfix as fix
+
+from phx.fix_base.api import PhxApi
+from phx.fix_base.fix.app import App, AppRunner, FixSessionConfig
+from phx.fix_base.fix.model import ExecReport, FixAuthenticationMethod, OrderBookUpdate
+from phx.fix_base.fix.simulator import ExchangeSimulator
+from phx.fix_base.utils import setup_logger
+from phx.fix_base.utils.prometheus import message_latency
+
+EXCHANGE = "deribit"
+USER = "trader"
+SECRET = "secret"
+PORT = 1239
+
+
+class LoadTestApi(PhxApi):
+    """
+    Records the time from sending an order until its first execution report arrives at the strategy.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.order_sent = {}
+        self.round_trips = []
+        super().__init__(*args, **kwargs)
+
+    def on_fast_timer(self):
+        pass
+
+    def send_order(self, symbol: str, side: str, price: float):
+        order, _ = self.fix_interface.new_order_single(EXCHANGE, symbol, side, 1, price=price)
+        self.order_sent[order.cl_ord_id] = time.perf_counter()
+
+    def on_exec_report(self, msg: ExecReport):
+        sent = self.order_sent.pop(msg.cl_ord_id, None)
+        if sent is not None:
+            self.round_trips.append(time.perf_counter() - sent)
+        super().on_exec_report(msg)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_simulator", level=logging.WARNING)
+    symbols = ["BTC-PERPETUAL", "ETH-PERPETUAL"]
+    root = tempfile.mkdtemp()
+    duration = 10
+
+    for updates_per_second in [100, 1000]:
+        simulator = ExchangeSimulator(
+            EXCHANGE,
+            symbols,
+            {USER: SECRET},
+            logger,
+            port=PORT,
+            updates_per_second=updates_per_second,
+            seed=7,
+            data_dir=f"{root}/simulator_{updates_per_second}",
+        )
+        simulator.start()
+
+        fix_configs = FixSessionConfig(
+            sender_comp_id="test",
+            target_comp_id="phoenix-prime",
+            user_name=USER,
+            password=SECRET,
+            fix_auth_method=FixAuthenticationMethod.HMAC_SHA256,
+            account="T1",
+            socket_connect_port=str(PORT),
+            socket_connect_host="127.0.0.1",
+            sub_dir=f"benchmark_simulator_{updates_per_second}",
+            root=root,
+        )
+        fix_session_settings = fix_configs.get_fix_session_settings()
+        app = App(queue.Queue(), fix_session_settings, logger, root, stamp_latency=True)
+        app_runner = AppRunner(app, fix_session_settings, fix_configs.get_session_id(), logger)
+        updates = []
+        api = LoadTestApi(
+            app_runner,
+            {"queue_timeout": "00:00:01", "print_reports": False, "rate_limit_for_period": [(1000, "1s")]},
+            EXCHANGE,
+            symbols,
+            symbols,
+            logger,
+            callbacks={OrderBookUpdate: lambda msg, _logger: updates.append(msg)},
+        )
+        while not api.subscribed or len(api.order_books) < len(symbols):
+            time.sleep(0.01)
+
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            for symbol in symbols:
+                book = api.order_books[(EXCHANGE, symbol)]
+                # far away from the touch so that the orders rest until cancelled on exit
+                api.send_order(symbol, fix.Side_BUY, book.top_of_book.bid_price * 0.9)
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        num_updates = len(updates)
+
+        api.to_stop = True
+        api.run_thread.join()
+        simulator.stop()
+        print(f"updates_per_second={updates_per_second} per symbol")
+        print(f"  book updates through api {num_updates / elapsed:12,.0f} updates/s")
+        print(f"  order round trips        {len(api.round_trips):12,d}")
+        print(f"  round trip p50           {percentile(api.round_trips, 0.5) * 1e6:12,.0f} us")
+        print(f"  round trip p99           {percentile(api.round_trips, 0.99) * 1e6:12,.0f} us")
+        print(f"  {simulator}")
+        print(app.order_latency.to_frame().to_string())
+    print(message_latency().to_frame().to_string())
@@ -0,0 +1,88 @@
+import copy
+import logging
+import time
+from datetime import datetime, timedelta
+
+import quickfix as fix
+
+from phx.fix_base.fix.model import ExecReport
+from phx.fix_base.fix.tracker import OrderTracker, PositionTracker
+from phx.fix_base.utils import setup_logger
+
+EXCHANGE = "deribit"
+SYMBOL = "BTC-PERPETUAL"
+ACCOUNT = "A1"
+
+
+def make_report(i, ord_status, exec_type, leaves_qty, cum_qty, tx_time):
+    return ExecReport(
+        EXCHANGE, SYMBOL, ACCOUNT, tx_time, f"e{i}", exec_type, f"c{i}", f"o{i}", fix.Side_BUY,
+        25000.0, 25000.0, 25000.0, fix.OrdType_LIMIT, ord_status, 10.0, 0, cum_qty, leaves_qty, None,
+    )
+
+
+def make_tracker(num_open, num_history, logger):
+    position_tracker = PositionTracker("local", True, logger)
+    tracker = OrderTracker("local", logger, position_tracker, print_reports=False)
+    start = datetime(2024, 1, 1)
+    for i in range(num_open + num_history):
+        tx_time = start + timedelta(milliseconds=i)
+        tracker.process(make_report(i, fix.OrdStatus_PENDING_NEW, fix.ExecType_PENDING_NEW, 10.0, 0.0, tx_time), None)
+        tracker.process(make_report(i, fix.OrdStatus_NEW, fix.ExecType_NEW, 10.0, 0.0, tx_time), None)
+        if i >= num_open:
+            tracker.process(make_report(i, fix.OrdStatus_FILLED, fix.ExecType_TRADE, 0.0, 10.0, tx_time), None)
+        tracker.exec_reports.append(make_report(i, fix.OrdStatus_NEW, fix.ExecType_NEW, 10.0, 0.0, tx_time))
+    return tracker
+
+
+def deepcopy_orders(tracker):
+    """
+    Previous get_orders, get_exec_reports and get_positions, as reference.
+    """
+    return (
+        {
+            "pending_orders": copy.deepcopy(dict(tracker.pending_orders)),
+            "rejected_pending_orders": copy.deepcopy(dict(tracker.rejected_pending_orders)),
+            "open_orders": copy.deepcopy(dict(tracker.open_orders)),
+            "rejected_open_orders": copy.deepcopy(dict(tracker.rejected_open_orders)),
+            "history_orders": copy.deepcopy(dict(tracker.history_orders)),
+        },
+        copy.deepcopy(tracker.exec_reports),
+        copy.deepcopy(dict(tracker.position_tracker.open_net_positions)),
+        copy.deepcopy(tracker.position_tracker.position_updates),
+    )
+
+
+def snapshot_orders(tracker):
+    return tracker.get_orders(), tracker.get_exec_reports(), tracker.position_tracker.get_positions()
+
+
+def bench(name, fn, tracker, num_open, repeat):
+    """
+    Reads interleaved with one fill per read so that each snapshot is followed by a copy on write.
+    """
+    start = datetime(2024, 1, 2)
+    elapsed_read = 0.0
+    elapsed_update = 0.0
+    for k in range(repeat):
+        t0 = time.perf_counter()
+        fn(tracker)
+        t1 = time.perf_counter()
+        i = k % num_open
+        report = make_report(i, fix.OrdStatus_PARTIALLY_FILLED, fix.ExecType_TRADE, 10.0 - 0.001 * (k // num_open + 1),
+                             0.001 * (k // num_open + 1), start + timedelta(milliseconds=k))
+        tracker.process(report, None)
+        t2 = time.perf_counter()
+        elapsed_read += t1 - t0
+        elapsed_update += t2 - t1
+    print(f"    {name:<12} read {elapsed_read / repeat * 1e6:12,.1f} us   "
+          f"update after read {elapsed_update / repeat * 1e6:10,.1f} us")
+
+
+if __name__ == "__main__":
+    logger = setup_logger("benchmark_snapshot", level=logging.WARNING)
+    for num_open, num_history in [(100, 1000), (1000, 10000)]:
+        print(f"  {num_open:,} open orders, {num_history:,} historical orders")
+        repeat = 20 if num_history > 1000 else 100
+        bench("deepcopy", deepcopy_orders, make_tracker(num_open, num_history, logger), num_open, repeat)
+        bench("snapshot", snapshot_orders, make_tracker(num_open, num_history, logger), num_open, repeat)